@@ -1,8 +1,35 @@
+import time
+STARTUP_T0 = time.perf_counter()  # Referência para o relatório de inicialização
+
 import pygame
 import numpy as np
+import itertools
 import math
+import threading
 from enum import Enum
-import colorsys
+from cgcore import RenderStats, StartupTimer
+from cgcore.autosave import Autosaver, read_snapshot
+from cgcore.clip import EDGE_COUNTERS, cohen_sutherland, cohen_sutherland_segments
+from cgcore.color import load_color_wheel
+from cgcore.fill import EVEN_ODD, NONZERO, circle_spans, polygon_spans
+from cgcore.floodfill import flood_fill
+from cgcore.geometry import ShapeGeometry
+from cgcore.hittest import HitScene
+from cgcore.journal import replay_journal
+from cgcore.parallel import RasterPool
+from cgcore.raster import (box_coverage, box_spans, circle_points, circle_to_ellipse, ellipse_points, ellipse_polyline, ellipse_spans,
+                            line_points, line_points_dda, preserves_axes, preserves_circles, transform_mask)
+from cgcore.selection import SelectionSet
+from cgcore.simplify import LodPyramid
+from cgcore.transform import (REFLECT_X, REFLECT_XY, REFLECT_Y, apply_matrix, reflection_matrix, rotation_matrix,
+                              scale_matrix, translation_matrix)
+from cgui.events import coalesce_motion
+from cgui.panel import PanelCache, PanelSection
+from cgui.patch import RasterPatch
+from cgui.recorder import EventRecorder
+from cgui.scheduler import FrameScheduler
+from cgui.spans import SpanWriter
+from cgui.text import TextCache
 
 class DrawMode(Enum):
     """Modos de desenho disponíveis no programa"""
@@ -12,6 +39,7 @@ class DrawMode(Enum):
     CIRCLE = 3    # Desenhar círculos
     POLYGON = 4   # Desenhar polígonos
     FREEHAND = 5  # Desenho livre
+    FILL = 6      # Balde de tinta
 
 class TransformMode(Enum):
     """Tipos de transformações geométricas 2D"""
@@ -24,70 +52,124 @@ class TransformMode(Enum):
 
 class Shape:
     """Classe para representar formas geométricas"""
+    LOD_MIN_POINTS = 64  # Polígonos a partir deste tamanho também ganham níveis de detalhe
+    uids = itertools.count(1)  # Identificadores das formas (referência do diário de alterações)
+    
     def __init__(self, shape_type, points, color=(0, 0, 0), thickness=2):
+        self.uid = next(Shape.uids)     # Identificador estável da forma
+        self.version = 0                # Incrementada a cada troca dos pontos
         self.type = shape_type          # Tipo da forma
         self.points = points            # Lista de pontos da forma
         self.color = color              # Cor da forma
         self.thickness = thickness      # Espessura da forma
-        self.selected = False           # Se a forma está selecionada
+        self.selected = False           # Se a forma está selecionada (mantido pelo SelectionSet)
+        self.filled = False             # Preenchimento (polígonos, círculos e elipses)
+        self.fill_rule = EVEN_ODD       # Regra de preenchimento: par-ímpar ou não-zero
+        self.patch = None               # RasterPatch das formas 'fill' (balde de tinta)
         self.original_points = points.copy()  # Backup dos pontos originais
+        self._lod = None                # Pirâmide de níveis de detalhe (criada sob demanda)
+        self._lod_version = None        # Versão dos pontos usada na pirâmide
+        self._lod_tuples = {}           # Níveis já convertidos em listas de tuplas, por índice
+        self._geometry = None           # ShapeGeometry da versão atual dos pontos (criada sob demanda)
+    
+    @property
+    def points(self):
+        return self._points
+    
+    @points.setter
+    def points(self, value):
+        self._points = value
+        self.version += 1
+    
+    @property
+    def geometry(self):
+        """Caixa, centroide e número de vértices, refeitos só quando os pontos (ou o tipo) mudam"""
+        geometry = self._geometry
+        if geometry is None or geometry.version != self.version or geometry.type != self.type:
+            geometry = self._geometry = ShapeGeometry(self.type, self._points, version=self.version)
+        return geometry
+    
+    def lod_points(self, tolerance):
+        """Pontos simplificados com erro de até `tolerance` (mundo); os originais se não houver nível"""
+        if self.type != 'freehand' and (self.type != 'polygon' or len(self._points) < self.LOD_MIN_POINTS):
+            return self._points
+        if tolerance < LodPyramid.BASE:  # Zoom alto: nenhum nível serve, nem monta a pirâmide
+            return self._points
+        if self._lod_version != self.version:
+            if self._lod is None:
+                self._lod = LodPyramid(self._points, closed=self.type == 'polygon')
+            else:
+                self._lod.update(self._points)
+            self._lod_version = self.version
+            self._lod_tuples = {}
+        index = self._lod.level_index(tolerance)
+        if index is None:
+            return self._points
+        level = self._lod_tuples.get(index)
+        if level is None:  # Convertido uma vez por nível, não a cada quadro
+            level = self._lod_tuples[index] = [tuple(p) for p in self._lod.levels[index].tolist()]
+        return level
 
 class ColorWheel:
     """Classe para criar e gerenciar roda cromática"""
-    def __init__(self, center, radius):
+    def __init__(self, center, radius, background=False):
         self.center = center
         self.radius = radius
         self.inner_radius = radius * 0.3  # Raio interno para saturação
         self.wheel_surface = None
-        self.create_wheel()
+        self.wheel_colors = None  # Cores pré-calculadas, indexadas por [x, y]
+        self.wheel_mask = None    # Pixels que pertencem ao anel
+        self.loader = None
+        
+        if background:
+            # Calcula o campo de cores em segundo plano; a superfície é criada no primeiro uso
+            self.loader = threading.Thread(target=self.load_field, daemon=True)
+            self.loader.start()
+        else:
+            self.create_wheel()
+    
+    def load_field(self):
+        """Calcula (ou lê do cache em disco) o campo HSV com NumPy"""
+        self.wheel_colors, self.wheel_mask = load_color_wheel(self.radius, self.inner_radius)
+    
+    def ensure_ready(self):
+        """Garante que a roda esteja pronta (espera o carregamento em segundo plano)"""
+        if self.wheel_surface is None:
+            self.create_wheel()
     
     def create_wheel(self):
         """Cria a superfície da roda cromática"""
+        if self.loader is not None:
+            self.loader.join()
+            self.loader = None
+        if self.wheel_colors is None:
+            self.load_field()
+        
         size = self.radius * 2
         self.wheel_surface = pygame.Surface((size, size), pygame.SRCALPHA)
-        
-        # Cria a roda cromática pixel por pixel
-        for x in range(size):
-            for y in range(size):
-                # Calcula distância do centro
-                dx = x - self.radius
-                dy = y - self.radius
-                distance = math.sqrt(dx * dx + dy * dy)
-                
-                if self.inner_radius <= distance <= self.radius:
-                    # Calcula ângulo (hue)
-                    angle = math.atan2(dy, dx)
-                    hue = (angle + math.pi) / (2 * math.pi)  # 0 a 1
-                    
-                    # Calcula saturação baseada na distância
-                    saturation = (distance - self.inner_radius) / (self.radius - self.inner_radius)
-                    
-                    # Converte HSV para RGB
-                    rgb = colorsys.hsv_to_rgb(hue, saturation, 1.0)
-                    color = (int(rgb[0] * 255), int(rgb[1] * 255), int(rgb[2] * 255))
-                    
-                    self.wheel_surface.set_at((x, y), color)
+        rgb = pygame.surfarray.pixels3d(self.wheel_surface)
+        rgb[:] = self.wheel_colors[:size, :size]
+        del rgb  # Libera o lock da superfície
+        alpha = pygame.surfarray.pixels_alpha(self.wheel_surface)
+        alpha[:] = self.wheel_mask[:size, :size] * 255
+        del alpha
     
     def get_color_at_pos(self, pos):
         """Retorna a cor na posição clicada"""
-        dx = pos[0] - self.center[0]
-        dy = pos[1] - self.center[1]
-        distance = math.sqrt(dx * dx + dy * dy)
-        
-        if self.inner_radius <= distance <= self.radius:
-            # Calcula hue e saturação
-            angle = math.atan2(dy, dx)
-            hue = (angle + math.pi) / (2 * math.pi)
-            saturation = (distance - self.inner_radius) / (self.radius - self.inner_radius)
-            
-            # Converte para RGB
-            rgb = colorsys.hsv_to_rgb(hue, saturation, 1.0)
-            return (int(rgb[0] * 255), int(rgb[1] * 255), int(rgb[2] * 255))
+        self.ensure_ready()
+        
+        # Índice no campo pré-calculado (o centro da roda fica em [radius, radius])
+        x = int(round(pos[0] - self.center[0])) + self.radius
+        y = int(round(pos[1] - self.center[1])) + self.radius
+        
+        if 0 <= x <= 2 * self.radius and 0 <= y <= 2 * self.radius and self.wheel_mask[x, y]:
+            return tuple(int(c) for c in self.wheel_colors[x, y])
         
         return None
     
     def draw(self, screen):
         """Desenha a roda cromática"""
+        self.ensure_ready()
         if self.wheel_surface:
             wheel_rect = self.wheel_surface.get_rect(center=self.center)
             screen.blit(self.wheel_surface, wheel_rect)
@@ -101,6 +183,7 @@ class PaintCG:
     
     def __init__(self):
         """Inicializa o programa e configura a interface"""
+        self.startup = StartupTimer(STARTUP_T0)
         pygame.init()
         
         # Configurações da janela
@@ -108,6 +191,7 @@ class PaintCG:
         self.height = 900
         self.screen = pygame.display.set_mode((self.width, self.height))
         pygame.display.set_caption("Paint Pro - Computação Gráfica")
+        self.startup.mark('janela')
         
         # Paleta de cores moderna
         self.WHITE = (255, 255, 255)
@@ -125,9 +209,12 @@ class PaintCG:
         
         # Estado do programa
         self.shapes = []                # Lista de formas desenhadas
+        self.selection = SelectionSet() # Formas selecionadas, com a soma dos vértices (centroide) e a caixa
         self.current_polygon = []       # Polígono em construção
         self.current_freehand = []      # Desenho livre em construção
         self.drawing_freehand = False   # Se está desenhando à mão livre
+        self.mouse_pressed = False      # Botão esquerdo pressionado na área de desenho
+        self.canvas_snapshot = None     # Cópia do canvas renderizado (lida pelo balde de tinta)
         self.draw_mode = DrawMode.SELECT
         self.transform_mode = TransformMode.TRANSLATE
         self.selecting = False          # Se está fazendo seleção
@@ -135,9 +222,12 @@ class PaintCG:
         self.selection_rect = None      # Retângulo de seleção
         
         # Configurações da interface (painel mais largo)
-        self.font_title = pygame.font.Font(None, 28)
-        self.font_button = pygame.font.Font(None, 20)
-        self.font_small = pygame.font.Font(None, 18)
+        # Fontes, roda cromática e áreas dos botões são carregadas depois do
+        # primeiro quadro (ver load_ui_assets), para a janela aparecer na hora
+        self.ui_ready = False
+        self.font_title = None
+        self.font_button = None
+        self.font_small = None
         self.panel_width = 320          # Painel ainda mais largo
         self.draw_area = pygame.Rect(self.panel_width, 0, self.width - self.panel_width, self.height)
         
@@ -162,13 +252,15 @@ class PaintCG:
         self.min_zoom = 0.1
         self.max_zoom = 5.0
         
-        # Roda cromática
-        self.color_wheel = ColorWheel((150, 300), 80)
+        # Roda cromática (campo de cores calculado em segundo plano)
+        self.color_wheel = ColorWheel((150, 300), 80, background=True)
         self.current_draw_color = self.BLACK
         
         # Configurações para fluidez
         self.clock = pygame.time.Clock()
         self.fps = 120                  # FPS alto para fluidez
+        self.hit_tolerance = 6          # Tolerância do clique de seleção (pixels de tela)
+        self.lod_error = 0.5            # Erro máximo da simplificação de traços (pixels de tela)
         self.original_size = (self.width, self.height)
         self.fullscreen = False
         
@@ -176,6 +268,47 @@ class PaintCG:
         self.button_areas = []
         self.transform_button_areas = []
         
+        # Contadores de desempenho (pixels, recorte, descarte de formas)
+        self.stats = RenderStats()
+        self.show_stats = False
+        
+        # Cache LRU dos textos renderizados (rótulos, botões, números de vértices)
+        self.text = TextCache(stats=self.stats)
+        
+        # Taxa cheia só com interação/animação; parado, espera por eventos
+        self.scheduler = FrameScheduler(self.clock, self.fps, stats=self.stats)
+        
+        # Threads da rasterização (PAINTCG_RASTER_WORKERS; 1 = tudo na thread principal)
+        self.raster_pool = RasterPool()
+        
+        # Salvamento automático em segundo plano (PAINTCG_AUTOSAVE_INTERVAL / PAINTCG_AUTOSAVE_KEEP)
+        self.autosave = Autosaver(stats=self.stats, app='tp1')  # Pasta própria: o Tp1_alt grava formas que este não desenha
+        self.journal = self.autosave.journal  # Diário das alterações entre dois autosaves
+        
+        # Gravação da sessão para repetição (PAINTCG_RECORD=arquivo; python -m cgui.replay)
+        self.recorder = EventRecorder.from_env('TP1', self.screen.get_size())
+        self.startup.mark('estado')
+        
+    def load_ui_assets(self):
+        """Carrega fontes, roda cromática e geometria dos botões (chamado após o primeiro quadro)"""
+        if self.ui_ready:
+            return
+        self.font_title = self.text.font(28)
+        self.font_button = self.text.font(20)
+        self.font_small = self.text.font(18)
+        self.color_wheel.ensure_ready()
+        self.create_button_areas()
+        # Painel pré-renderizado (ver draw_interface)
+        self.panel_cache = PanelCache((self.panel_width, self.height), self.LIGHT_GRAY, self.stats)
+        self.ui_ready = True
+    
+    def finish_startup(self):
+        """Marca o primeiro quadro, carrega o restante da interface e publica o relatório"""
+        self.startup.mark('primeiro_quadro')
+        self.load_ui_assets()
+        self.startup.mark('interface')
+        self.startup.publish()
+    
     def create_button_areas(self):
         """Cria as áreas clicáveis dos botões (corrige problema de clique)"""
         self.button_areas = []
@@ -183,8 +316,8 @@ class PaintCG:
         
         # Botões de desenho
         y_start = 280
-        for i in range(6):  # Agora temos 6 modos (incluindo freehand)
-            rect = pygame.Rect(15, y_start + i * 30, 290, 26)
+        for i in range(len(DrawMode)):  # 7 modos (incluindo o balde de tinta)
+            rect = pygame.Rect(15, y_start + i * 27, 290, 24)
             self.button_areas.append(rect)
         
         # Botões de transformação
@@ -195,30 +328,72 @@ class PaintCG:
     
     def draw_interface(self):
         """Desenha toda a interface do programa"""
-        # Recria áreas dos botões
-        self.create_button_areas()
-        
         # Painel lateral com gradiente sutil
         panel_rect = pygame.Rect(0, 0, self.panel_width, self.height)
-        pygame.draw.rect(self.screen, self.LIGHT_GRAY, panel_rect)
         
-        # Linha separadora elegante com efeito 3D
-        pygame.draw.line(self.screen, (200, 200, 200), 
-                        (self.panel_width - 4, 0), (self.panel_width - 4, self.height), 2)
-        pygame.draw.line(self.screen, self.DARK_GRAY, 
-                        (self.panel_width - 2, 0), (self.panel_width - 2, self.height), 2)
+        # Primeiro quadro: só o fundo do painel, o resto ainda está carregando
+        if not self.ui_ready:
+            pygame.draw.rect(self.screen, self.LIGHT_GRAY, panel_rect)
+            return
+        
+        # O painel fica pré-renderizado; só as seções cujo estado mudou são refeitas
+        if self.panel_cache.surface.get_height() != self.height:
+            self.panel_cache.resize((self.panel_width, self.height))
+        blink = pygame.time.get_ticks() % 1000 < 500
+        width = self.panel_width - 5
+        self.panel_cache.update([
+            PanelSection('cabecalho', (0, 0, width, 50), None, self.draw_panel_header),
+            PanelSection('divisoria', (self.panel_width - 5, 0, 5, self.height), None, self.draw_panel_divider),
+            PanelSection('cor', (0, 55, width, 170), self.current_draw_color, self.draw_color_section),
+            PanelSection('espessura', (0, 225, width, 45),
+                         (self.brush_thickness, self.current_draw_color, self.thickness_input_active,
+                          self.thickness_input_text, self.thickness_input_active and blink),
+                         self.draw_thickness_section),
+            PanelSection('ferramentas', (0, 262, width, 205), self.draw_mode, self.draw_tool_buttons),
+            PanelSection('transformacoes', (0, 467, width, 198), self.transform_mode, self.draw_transform_buttons),
+            PanelSection('controles', (0, 668, width, 145),
+                         (self.transform_mode, int(self.rotation_angle), round(self.transform_factor, 2),
+                          self.rotating, self.rotation_input_active, self.rotation_input_text,
+                          self.rotation_input_active and blink),
+                         self.draw_controls_section),
+            PanelSection('zoom', (0, 815, width, 60), f"{self.zoom_factor:.1f}", self.draw_zoom_section),
+            PanelSection('rodape', (0, 876, width, 24), None, self.draw_panel_footer),
+        ])
+        self.panel_cache.blit(self.screen, (0, 0), height=self.height)
         
+        # Botões superiores
+        fullscreen_btn = pygame.Rect(self.width - 60, 10, 40, 25)
+        help_btn = pygame.Rect(self.width - 110, 10, 25, 25)
+        pygame.draw.rect(self.screen, self.BLUE, fullscreen_btn, border_radius=5)
+        pygame.draw.rect(self.screen, self.GREEN, help_btn, border_radius=12)
+        fs_text = self.text.render(self.font_small, "⛶", self.WHITE)
+        help_text = self.text.render(self.font_button, "?", self.WHITE)
+        self.screen.blit(fs_text, (fullscreen_btn.centerx - 6, fullscreen_btn.centery - 8))
+        self.screen.blit(help_text, (help_btn.centerx - 6, help_btn.centery - 8))
+    
+    # --- Seções do painel (desenhadas na Surface do cache, em coordenadas do painel) ---
+    def draw_panel_header(self, surface):
+        """Título principal"""
         # Título principal com estilo
-        title = self.font_title.render("Paint PRO", True, self.DARK_BLUE)
-        self.screen.blit(title, (20, 15))
+        title = self.text.render(self.font_title, "Paint PRO", self.DARK_BLUE)
+        surface.blit(title, (20, 15))
         
         # Linha decorativa abaixo do título
-        pygame.draw.line(self.screen, self.DARK_BLUE, (20, 45), (self.panel_width - 30, 45), 2)
-        
-        # Seção de ferramentas de desenho
+        pygame.draw.line(surface, self.DARK_BLUE, (20, 45), (self.panel_width - 30, 45), 2)
+    
+    def draw_panel_divider(self, surface):
+        """Linha separadora entre painel e área de desenho"""
+        # Linha separadora elegante com efeito 3D
+        pygame.draw.line(surface, (200, 200, 200), 
+                        (self.panel_width - 4, 0), (self.panel_width - 4, self.height), 2)
+        pygame.draw.line(surface, self.DARK_GRAY, 
+                        (self.panel_width - 2, 0), (self.panel_width - 2, self.height), 2)
+    
+    def draw_tool_buttons(self, surface):
+        """Seção de ferramentas de desenho"""
         y_offset = 270
-        section_title = self.font_button.render("Ferramentas:", True, self.DARK_GRAY)
-        self.screen.blit(section_title, (20, y_offset - 5))
+        section_title = self.text.render(self.font_button, "Ferramentas:", self.DARK_GRAY)
+        surface.blit(section_title, (20, y_offset - 5))
         
         # Botões de desenho 
         buttons = [
@@ -227,7 +402,8 @@ class PaintCG:
             ("Linha", DrawMode.LINE, self.GREEN),
             ("Círculo", DrawMode.CIRCLE, self.RED),
             ("Polígono", DrawMode.POLYGON, self.PURPLE),
-            ("Desenho Livre", DrawMode.FREEHAND, self.ORANGE)
+            ("Desenho Livre", DrawMode.FREEHAND, self.ORANGE),
+            ("Preencher", DrawMode.FILL, self.DARK_BLUE)
         ]
         
         for i, (text, mode, color) in enumerate(buttons):
@@ -238,55 +414,57 @@ class PaintCG:
             if is_active:
                 shadow_rect = pygame.Rect(button_rect.x + 3, button_rect.y + 3, 
                                         button_rect.width, button_rect.height)
-                pygame.draw.rect(self.screen, (180, 180, 180), shadow_rect, border_radius=10)
+                pygame.draw.rect(surface, (180, 180, 180), shadow_rect, border_radius=10)
             
             # Cor do botão
             btn_color = color if is_active else self.WHITE
-            pygame.draw.rect(self.screen, btn_color, button_rect, border_radius=10)
+            pygame.draw.rect(surface, btn_color, button_rect, border_radius=10)
             
             # Borda com espessura variável
             border_width = 3 if is_active else 2
-            pygame.draw.rect(self.screen, color, button_rect, border_width, border_radius=10)
+            pygame.draw.rect(surface, color, button_rect, border_width, border_radius=10)
             
             # Texto do botão
             text_color = self.WHITE if is_active else color
-            text_surf = self.font_button.render(text, True, text_color)
+            text_surf = self.text.render(self.font_button, text, text_color)
             text_rect = text_surf.get_rect(center=button_rect.center)
-            self.screen.blit(text_surf, text_rect)
-        
-        # Roda cromática
+            surface.blit(text_surf, text_rect)
+    
+    def draw_color_section(self, surface):
+        """Roda cromática e cor atual"""
         y_offset = 60
-        color_title = self.font_button.render("Cor:", True, self.DARK_GRAY)
-        self.screen.blit(color_title, (15, y_offset))
+        color_title = self.text.render(self.font_button, "Cor:", self.DARK_GRAY)
+        surface.blit(color_title, (15, y_offset))
 
         # Desenha roda cromática
         self.color_wheel.center = (140, y_offset + 80)  # Mover para cima
-        self.color_wheel.draw(self.screen)
+        self.color_wheel.draw(surface)
 
         # Mostra cor atual
         color_preview = pygame.Rect(250, y_offset + 60, 40, 40)
-        pygame.draw.rect(self.screen, self.current_draw_color, color_preview, border_radius=8)
-        pygame.draw.rect(self.screen, self.DARK_GRAY, color_preview, 3, border_radius=8)
-        
-        # Controle de espessura
-        thickness_title = self.font_button.render("Espessura:", True, self.DARK_GRAY)
-        self.screen.blit(thickness_title, (20, 230))
+        pygame.draw.rect(surface, self.current_draw_color, color_preview, border_radius=8)
+        pygame.draw.rect(surface, self.DARK_GRAY, color_preview, 3, border_radius=8)
+    
+    def draw_thickness_section(self, surface):
+        """Controle de espessura"""
+        thickness_title = self.text.render(self.font_button, "Espessura:", self.DARK_GRAY)
+        surface.blit(thickness_title, (20, 230))
         
         # Campo de input de espessura
         thickness_input_rect = pygame.Rect(150, 235, 80, 25)
         input_color = self.ACCENT if self.thickness_input_active else self.WHITE
-        pygame.draw.rect(self.screen, input_color, thickness_input_rect, border_radius=5)
-        pygame.draw.rect(self.screen, self.DARK_GRAY, thickness_input_rect, 2, border_radius=5)
+        pygame.draw.rect(surface, input_color, thickness_input_rect, border_radius=5)
+        pygame.draw.rect(surface, self.DARK_GRAY, thickness_input_rect, 2, border_radius=5)
         
         # Texto do input de espessura
         display_text = self.thickness_input_text if self.thickness_input_active else str(self.brush_thickness)
-        thickness_text = self.font_small.render(display_text, True, self.BLACK)
-        self.screen.blit(thickness_text, (thickness_input_rect.x + 5, thickness_input_rect.y + 5))
+        thickness_text = self.text.render(self.font_small, display_text, self.BLACK)
+        surface.blit(thickness_text, (thickness_input_rect.x + 5, thickness_input_rect.y + 5))
         
         # Cursor piscando para espessura
         if self.thickness_input_active and pygame.time.get_ticks() % 1000 < 500:
             cursor_x = thickness_input_rect.x + 5 + thickness_text.get_width()
-            pygame.draw.line(self.screen, self.BLACK, 
+            pygame.draw.line(surface, self.BLACK, 
                            (cursor_x, thickness_input_rect.y + 3), 
                            (cursor_x, thickness_input_rect.y + 22), 2)
         
@@ -294,26 +472,27 @@ class PaintCG:
         thickness_inc_rect = pygame.Rect(125, 235, 20, 12)
         thickness_dec_rect = pygame.Rect(125, 248, 20, 12)
         
-        pygame.draw.rect(self.screen, self.GREEN, thickness_inc_rect, border_radius=3)
-        pygame.draw.rect(self.screen, self.RED, thickness_dec_rect, border_radius=3)
+        pygame.draw.rect(surface, self.GREEN, thickness_inc_rect, border_radius=3)
+        pygame.draw.rect(surface, self.RED, thickness_dec_rect, border_radius=3)
         
         # Símbolos + e -
-        plus_text = pygame.font.Font(None, 16).render("+", True, self.WHITE)
-        minus_text = pygame.font.Font(None, 16).render("-", True, self.WHITE)
-        self.screen.blit(plus_text, (thickness_inc_rect.centerx - 4, thickness_inc_rect.centery - 6))
-        self.screen.blit(minus_text, (thickness_dec_rect.centerx - 4, thickness_dec_rect.centery - 6))
+        plus_text = self.text.render(self.text.font(16), "+", self.WHITE)
+        minus_text = self.text.render(self.text.font(16), "-", self.WHITE)
+        surface.blit(plus_text, (thickness_inc_rect.centerx - 4, thickness_inc_rect.centery - 6))
+        surface.blit(minus_text, (thickness_dec_rect.centerx - 4, thickness_dec_rect.centery - 6))
         
         # Preview da espessura
         preview_center = (280, 250)
-        pygame.draw.circle(self.screen, self.current_draw_color, preview_center, 
+        pygame.draw.circle(surface, self.current_draw_color, preview_center, 
                          max(1, min(15, self.brush_thickness)))
-        pygame.draw.circle(self.screen, self.DARK_GRAY, preview_center, 
+        pygame.draw.circle(surface, self.DARK_GRAY, preview_center, 
                          max(3, min(17, self.brush_thickness + 2)), 2)
-        
-        # Seção de transformações
+    
+    def draw_transform_buttons(self, surface):
+        """Seção de transformações"""
         y_offset = 475
-        section_title = self.font_button.render("Transformações:", True, self.DARK_GRAY)
-        self.screen.blit(section_title, (20, y_offset - 5))
+        section_title = self.text.render(self.font_button, "Transformações:", self.DARK_GRAY)
+        surface.blit(section_title, (20, y_offset - 5))
         
         transforms = [
             ("Translação", TransformMode.TRANSLATE, self.BLUE),
@@ -330,82 +509,83 @@ class PaintCG:
             
             # Cor do botão
             btn_color = color if is_active else self.WHITE
-            pygame.draw.rect(self.screen, btn_color, button_rect, border_radius=8)
-            pygame.draw.rect(self.screen, color, button_rect, 2 if not is_active else 3, border_radius=8)
+            pygame.draw.rect(surface, btn_color, button_rect, border_radius=8)
+            pygame.draw.rect(surface, color, button_rect, 2 if not is_active else 3, border_radius=8)
             
             # Texto do botão
             text_color = self.WHITE if is_active else color
-            text_surf = self.font_small.render(text, True, text_color)
+            text_surf = self.text.render(self.font_small, text, text_color)
             text_rect = text_surf.get_rect(center=button_rect.center)
-            self.screen.blit(text_surf, text_rect)
-        
-        # Painel de controle de valores
+            surface.blit(text_surf, text_rect)
+    
+    def draw_controls_section(self, surface):
+        """Painel de controle de valores (muda com o tipo de transformação)"""
         y_offset = 670
         control_bg = pygame.Rect(15, y_offset, 290, 140)
-        pygame.draw.rect(self.screen, self.WHITE, control_bg, border_radius=12)
-        pygame.draw.rect(self.screen, self.DARK_BLUE, control_bg, 3, border_radius=12)
+        pygame.draw.rect(surface, self.WHITE, control_bg, border_radius=12)
+        pygame.draw.rect(surface, self.DARK_BLUE, control_bg, 3, border_radius=12)
         
         # Título do painel de controle
-        control_title = self.font_button.render("🎛 Controles:", True, self.DARK_BLUE)
-        self.screen.blit(control_title, (25, y_offset + 10))
+        control_title = self.text.render(self.font_button, "🎛 Controles:", self.DARK_BLUE)
+        surface.blit(control_title, (25, y_offset + 10))
         
         # Controles específicos por tipo de transformação
         if self.transform_mode == TransformMode.ROTATE:
             # Campo de input para ângulo
-            angle_label = self.font_small.render("Ângulo (graus):", True, self.DARK_GRAY)
-            self.screen.blit(angle_label, (25, y_offset + 35))
+            angle_label = self.text.render(self.font_small, "Ângulo (graus):", self.DARK_GRAY)
+            surface.blit(angle_label, (25, y_offset + 35))
             
             # Caixa de input
             input_rect = pygame.Rect(25, y_offset + 55, 200, 25)
             input_color = self.ACCENT if self.rotation_input_active else self.LIGHT_GRAY
-            pygame.draw.rect(self.screen, input_color, input_rect, border_radius=5)
-            pygame.draw.rect(self.screen, self.DARK_GRAY, input_rect, 2, border_radius=5)
+            pygame.draw.rect(surface, input_color, input_rect, border_radius=5)
+            pygame.draw.rect(surface, self.DARK_GRAY, input_rect, 2, border_radius=5)
             
             # Texto do input
             display_text = self.rotation_input_text if self.rotation_input_active else str(int(self.rotation_angle))
-            input_text = self.font_small.render(display_text, True, self.BLACK)
-            self.screen.blit(input_text, (input_rect.x + 5, input_rect.y + 5))
+            input_text = self.text.render(self.font_small, display_text, self.BLACK)
+            surface.blit(input_text, (input_rect.x + 5, input_rect.y + 5))
             
             # Cursor piscando
             if self.rotation_input_active and pygame.time.get_ticks() % 1000 < 500:
                 cursor_x = input_rect.x + 5 + input_text.get_width()
-                pygame.draw.line(self.screen, self.BLACK, 
+                pygame.draw.line(surface, self.BLACK, 
                                (cursor_x, input_rect.y + 3), (cursor_x, input_rect.y + 22), 2)
             
             # Botões de incremento/decremento
             inc_rect = pygame.Rect(235, y_offset + 55, 20, 12)
             dec_rect = pygame.Rect(235, y_offset + 68, 20, 12)
             
-            pygame.draw.rect(self.screen, self.GREEN, inc_rect, border_radius=3)
-            pygame.draw.rect(self.screen, self.RED, dec_rect, border_radius=3)
+            pygame.draw.rect(surface, self.GREEN, inc_rect, border_radius=3)
+            pygame.draw.rect(surface, self.RED, dec_rect, border_radius=3)
             
             # Símbolos + e -
-            plus_text = pygame.font.Font(None, 16).render("+", True, self.WHITE)
-            minus_text = pygame.font.Font(None, 16).render("-", True, self.WHITE)
-            self.screen.blit(plus_text, (inc_rect.centerx - 4, inc_rect.centery - 6))
-            self.screen.blit(minus_text, (dec_rect.centerx - 4, dec_rect.centery - 6))
+            plus_text = self.text.render(self.text.font(16), "+", self.WHITE)
+            minus_text = self.text.render(self.text.font(16), "-", self.WHITE)
+            surface.blit(plus_text, (inc_rect.centerx - 4, inc_rect.centery - 6))
+            surface.blit(minus_text, (dec_rect.centerx - 4, dec_rect.centery - 6))
             
             # Instruções para rotação
             if self.rotating:
                 rotate_info = "🔄 Arrastando..."
-                rotate_surf = self.font_small.render(rotate_info, True, self.GREEN)
-                self.screen.blit(rotate_surf, (25, y_offset + 90))
+                rotate_surf = self.text.render(self.font_small, rotate_info, self.GREEN)
+                surface.blit(rotate_surf, (25, y_offset + 90))
             else:
                 info1 = "• Clique no campo para editar"
                 info2 = "• Use +/- para ajustar"
                 info3 = "• Arraste objetos para rotacionar"
                 
-                self.screen.blit(self.font_small.render(info1, True, self.DARK_GRAY), (25, y_offset + 90))
-                self.screen.blit(pygame.font.Font(None, 16).render(info2, True, self.DARK_GRAY), (25, y_offset + 105))
-                self.screen.blit(pygame.font.Font(None, 16).render(info3, True, self.DARK_GRAY), (25, y_offset + 120))
+                surface.blit(self.text.render(self.font_small, info1, self.DARK_GRAY), (25, y_offset + 90))
+                surface.blit(self.text.render(self.text.font(16), info2, self.DARK_GRAY), (25, y_offset + 105))
+                surface.blit(self.text.render(self.text.font(16), info3, self.DARK_GRAY), (25, y_offset + 120))
         else:
             # Controles para outras transformações
-            factor_label = self.font_small.render(f"Fator: {self.transform_factor:.2f}", True, self.DARK_GRAY)
-            self.screen.blit(factor_label, (25, y_offset + 35))
+            factor_label = self.text.render(self.font_small, f"Fator: {self.transform_factor:.2f}", self.DARK_GRAY)
+            surface.blit(factor_label, (25, y_offset + 35))
             
             # Barra de progresso visual para o fator (ajustada para valores menores)
             progress_bg = pygame.Rect(25, y_offset + 55, 200, 12)
-            pygame.draw.rect(self.screen, self.LIGHT_GRAY, progress_bg, border_radius=6)
+            pygame.draw.rect(surface, self.LIGHT_GRAY, progress_bg, border_radius=6)
             
             # Calcula progresso (fator de 0.1 a 3.0)
             progress = (self.transform_factor - 0.1) / 2.9
@@ -420,24 +600,24 @@ class PaintCG:
             else:
                 bar_color = self.BLUE  # Normal
             
-            pygame.draw.rect(self.screen, bar_color, progress_rect, border_radius=6)
+            pygame.draw.rect(surface, bar_color, progress_rect, border_radius=6)
             
             # Linha de referência em 1.0 (valor neutro)
             neutral_pos = int((1.0 - 0.1) / 2.9 * 200) + 25
-            pygame.draw.line(self.screen, self.DARK_GRAY, 
+            pygame.draw.line(surface, self.DARK_GRAY, 
                            (neutral_pos, y_offset + 53), (neutral_pos, y_offset + 69), 2)
             
             # Botões de ajuste fino
             dec_button = pygame.Rect(235, y_offset + 55, 25, 12)
             inc_button = pygame.Rect(265, y_offset + 55, 25, 12)
             
-            pygame.draw.rect(self.screen, self.RED, dec_button, border_radius=3)
-            pygame.draw.rect(self.screen, self.GREEN, inc_button, border_radius=3)
+            pygame.draw.rect(surface, self.RED, dec_button, border_radius=3)
+            pygame.draw.rect(surface, self.GREEN, inc_button, border_radius=3)
             
-            dec_text = pygame.font.Font(None, 14).render("−", True, self.WHITE)
-            inc_text = pygame.font.Font(None, 14).render("+", True, self.WHITE)
-            self.screen.blit(dec_text, (dec_button.centerx - 3, dec_button.centery - 5))
-            self.screen.blit(inc_text, (inc_button.centerx - 3, inc_button.centery - 5))
+            dec_text = self.text.render(self.text.font(14), "−", self.WHITE)
+            inc_text = self.text.render(self.text.font(14), "+", self.WHITE)
+            surface.blit(dec_text, (dec_button.centerx - 3, dec_button.centery - 5))
+            surface.blit(inc_text, (inc_button.centerx - 3, inc_button.centery - 5))
             
             # Instruções
             info_lines = [
@@ -447,54 +627,47 @@ class PaintCG:
             ]
             
             for i, info in enumerate(info_lines):
-                info_surf = pygame.font.Font(None, 15).render(info, True, self.DARK_GRAY)
-                self.screen.blit(info_surf, (25, y_offset + 75 + i * 15))
-        
-        # Controles de Zoom (nova seção)
-        zoom_title = self.font_button.render("🔍 Zoom da Tela:", True, self.DARK_GRAY)
-        self.screen.blit(zoom_title, (20, y_offset + 150))
+                info_surf = self.text.render(self.text.font(15), info, self.DARK_GRAY)
+                surface.blit(info_surf, (25, y_offset + 75 + i * 15))
+    
+    def draw_zoom_section(self, surface):
+        """Controles de Zoom"""
+        y_offset = 670
+        zoom_title = self.text.render(self.font_button, "🔍 Zoom da Tela:", self.DARK_GRAY)
+        surface.blit(zoom_title, (20, y_offset + 150))
         
         # Botões de zoom
         zoom_out_btn = pygame.Rect(20, y_offset + 175, 60, 25)
         zoom_reset_btn = pygame.Rect(90, y_offset + 175, 60, 25)
         zoom_in_btn = pygame.Rect(160, y_offset + 175, 60, 25)
         
-        pygame.draw.rect(self.screen, self.RED, zoom_out_btn, border_radius=5)
-        pygame.draw.rect(self.screen, self.BLUE, zoom_reset_btn, border_radius=5)
-        pygame.draw.rect(self.screen, self.GREEN, zoom_in_btn, border_radius=5)
+        pygame.draw.rect(surface, self.RED, zoom_out_btn, border_radius=5)
+        pygame.draw.rect(surface, self.BLUE, zoom_reset_btn, border_radius=5)
+        pygame.draw.rect(surface, self.GREEN, zoom_in_btn, border_radius=5)
         
-        zoom_out_text = self.font_small.render("−", True, self.WHITE)
-        zoom_reset_text = pygame.font.Font(None, 16).render("1:1", True, self.WHITE)
-        zoom_in_text = self.font_small.render("+", True, self.WHITE)
+        zoom_out_text = self.text.render(self.font_small, "−", self.WHITE)
+        zoom_reset_text = self.text.render(self.text.font(16), "1:1", self.WHITE)
+        zoom_in_text = self.text.render(self.font_small, "+", self.WHITE)
         
-        self.screen.blit(zoom_out_text, (zoom_out_btn.centerx - 4, zoom_out_btn.centery - 8))
-        self.screen.blit(zoom_reset_text, (zoom_reset_btn.centerx - 8, zoom_reset_btn.centery - 8))
-        self.screen.blit(zoom_in_text, (zoom_in_btn.centerx - 4, zoom_in_btn.centery - 8))
+        surface.blit(zoom_out_text, (zoom_out_btn.centerx - 4, zoom_out_btn.centery - 8))
+        surface.blit(zoom_reset_text, (zoom_reset_btn.centerx - 8, zoom_reset_btn.centery - 8))
+        surface.blit(zoom_in_text, (zoom_in_btn.centerx - 4, zoom_in_btn.centery - 8))
         
         # Mostra nível de zoom atual
         zoom_level_text = f"Zoom: {self.zoom_factor:.1f}x"
-        zoom_surf = pygame.font.Font(None, 16).render(zoom_level_text, True, self.DARK_GRAY)
-        self.screen.blit(zoom_surf, (230, y_offset + 182))
-        
-        # Botões superiores
-        fullscreen_btn = pygame.Rect(self.width - 60, 10, 40, 25)
-        help_btn = pygame.Rect(self.width - 110, 10, 25, 25)
-        pygame.draw.rect(self.screen, self.BLUE, fullscreen_btn, border_radius=5)
-        pygame.draw.rect(self.screen, self.GREEN, help_btn, border_radius=12)
-        fs_text = self.font_small.render("⛶", True, self.WHITE)
-        help_text = self.font_button.render("?", True, self.WHITE)
-        self.screen.blit(fs_text, (fullscreen_btn.centerx - 6, fullscreen_btn.centery - 8))
-        self.screen.blit(help_text, (help_btn.centerx - 6, help_btn.centery - 8))
-        
-        # Instruções gerais na parte inferior
+        zoom_surf = self.text.render(self.text.font(16), zoom_level_text, self.DARK_GRAY)
+        surface.blit(zoom_surf, (230, y_offset + 182))
+    
+    def draw_panel_footer(self, surface):
+        """Instruções gerais na parte inferior"""
         y_offset = 880
         general_info = [
-            "Atalhos: C (limpar) • Esc (finalizar)"
+            "Atalhos: C (limpar) • Esc (finalizar) • F3 (estatísticas)"
         ]
         
         for i, text in enumerate(general_info):
-            text_surf = pygame.font.Font(None, 15).render(text, True, self.DARK_BLUE)
-            self.screen.blit(text_surf, (20, y_offset + i * 18))
+            text_surf = self.text.render(self.text.font(15), text, self.DARK_BLUE)
+            surface.blit(text_surf, (20, y_offset + i * 18))
     
     def handle_panel_click(self, pos):
         """Gerencia cliques no painel lateral (corrigido)"""
@@ -743,20 +916,10 @@ class PaintCG:
         if not self.rotation_start_pos:
             return
         
-        # Calcula centroide das formas selecionadas
-        selected_shapes = [s for s in self.shapes if s.selected]
-        if not selected_shapes:
+        # Centroide das formas selecionadas (somas mantidas pela seleção)
+        if not self.selection.vertex_count:
             return
-        
-        all_points = []
-        for shape in selected_shapes:
-            all_points.extend(shape.points)
-        
-        if not all_points:
-            return
-        
-        cx = sum(p[0] for p in all_points) // len(all_points)
-        cy = sum(p[1] for p in all_points) // len(all_points)
+        cx, cy = self.selection_centroid()
         
         # Converte centroide para coordenadas da tela
         center_screen = self.world_to_screen((cx, cy))
@@ -775,223 +938,169 @@ class PaintCG:
         angle_diff = current_angle - start_angle
         self.rotation_angle = angle_diff % 360
     
+    def selection_centroid(self):
+        """Centroide dos vértices selecionados, truncado para pixels (as somas são exatas: pontos inteiros)"""
+        count = self.selection.vertex_count
+        return tuple(int(total) // count for total in self.selection.sum)
+    
     def point_in_rect(self, point, rect):
         """Verifica se um ponto está dentro de um retângulo"""
         return rect[0] <= point[0] <= rect[2] and rect[1] <= point[1] <= rect[3]
     
     def select_shapes(self, rect):
-        """Seleciona formas dentro de um retângulo"""
-        # Desmarca todas as formas
-        for shape in self.shapes:
-            shape.selected = False
-        
-        # Marca formas dentro do retângulo
-        for shape in self.shapes:
-            for point in shape.points:
-                if self.point_in_rect(point, rect):
-                    shape.selected = True
-                    break
+        """Seleciona formas dentro de um retângulo (as que têm algum ponto nele)"""
+        self.selection.replace(shape for shape in self.shapes if self.shape_touches_rect(shape, rect))
+    
+    def shape_touches_rect(self, shape, rect):
+        """Se algum ponto da forma está no retângulo; a caixa em cache descarta as formas distantes sem percorrê-las"""
+        lo, hi = shape.geometry.lo, shape.geometry.hi
+        if hi[0] < rect[0] or lo[0] > rect[2] or hi[1] < rect[1] or lo[1] > rect[3]:
+            return False
+        return any(self.point_in_rect(point, rect) for point in shape.points)
+    
+    def toggle_fill(self):
+        """Alterna o preenchimento das formas selecionadas: vazio → par-ímpar → não-zero → vazio"""
+        changed = []
+        for shape in self.selection:
+            if shape.type in ('polygon', 'circle', 'ellipse'):
+                if not shape.filled:
+                    shape.filled, shape.fill_rule = True, EVEN_ODD
+                elif shape.fill_rule == EVEN_ODD and shape.type == 'polygon':
+                    shape.fill_rule = NONZERO
+                else:
+                    shape.filled = False
+                changed.append(shape)
+        self.journal.fill(changed)
+    
+    def fill_at(self, pos):
+        """Balde de tinta: inunda a região sob o cursor e guarda o resultado como forma 'fill'"""
+        area = self.draw_area
+        if self.canvas_snapshot is None or self.canvas_snapshot.get_size() != area.size:
+            # Sem cópia do último quadro: renderiza só o canvas, sem sobreposições da interface
+            self.screen.fill(self.WHITE, area)
+            self.draw_shapes()
+            self.canvas_snapshot = self.screen.subsurface(area).copy()
+        pixels = pygame.surfarray.array2d(self.canvas_snapshot)
+        mask = flood_fill(pixels, (pos[0] - area.x, pos[1] - area.y))
+        self.canvas_snapshot = None  # A nova forma invalida a cópia
+        
+        # Guarda só o retângulo que contém a região preenchida
+        cols, rows = np.flatnonzero(mask.any(axis=1)), np.flatnonzero(mask.any(axis=0))
+        if not len(cols):
+            return
+        x0, x1, y0, y1 = cols[0], cols[-1] + 1, rows[0], rows[-1] + 1
+        top_left = self.screen_to_world((area.x + x0, area.y + y0))
+        bottom_right = self.screen_to_world((area.x + x1, area.y + y1))
+        shape = Shape('fill', [top_left, bottom_right], self.current_draw_color, 1)
+        shape.patch = RasterPatch(mask[x0:x1, y0:y1])
+        self.add_shape(shape)
+    
+    def add_shape(self, shape):
+        """Acrescenta uma forma à cena (e ao diário de alterações)"""
+        self.shapes.append(shape)
+        self.journal.add(shape)
+    
+    def build_hit_scene(self, near=None, tolerance=0):
+        """Monta a cena do teste de clique (coordenadas do mundo)
+        
+        Com `near`, só entram as formas cuja extensão em cache, alargada pela tolerância
+        e pela tinta, contém o ponto: as outras não podem ser escolhidas por esse clique.
+        """
+        scene = HitScene()
+        for i, shape in enumerate(self.shapes):
+            if near is not None and not shape.geometry.near(near, tolerance + max(shape.thickness, 10)):
+                continue
+            if shape.type == 'point':
+                scene.add_point(i, shape.points[0], 10)  # Pontos são desenhados com raio 5
+            elif shape.type == 'circle':
+                radius = math.dist(shape.points[0], shape.points[1])
+                scene.add_circle(i, shape.points[0], radius, shape.thickness)
+            elif shape.type == 'ellipse':
+                center, u, v = np.asarray(shape.points, dtype=float)
+                scene.add_polyline(i, ellipse_polyline(center, u - center, v - center), shape.thickness)
+            elif shape.type == 'fill':
+                (x0, y0), (x1, y1) = shape.points
+                scene.add_polyline(i, [(x0, y0), (x1, y0), (x1, y1), (x0, y1)], 0, closed=True)
+            else:
+                scene.add_polyline(i, shape.points, shape.thickness, closed=shape.type == 'polygon')
+        return scene
+    
+    def pick_shape(self, screen_pos):
+        """Índice da forma mais próxima do clique (dentro da tolerância) ou None"""
+        if not self.shapes:
+            return None
+        world_pos, tolerance = self.screen_to_world(screen_pos), self.hit_tolerance / self.zoom_factor
+        return self.build_hit_scene(world_pos, tolerance).pick(world_pos, tolerance)
+    
+    def select_at(self, screen_pos):
+        """Seleciona apenas a forma sob o cursor (clique vazio limpa a seleção)"""
+        picked = self.pick_shape(screen_pos)
+        self.selection.replace([] if picked is None else [self.shapes[picked]])
     
     def draw_line_dda(self, x1, y1, x2, y2, color):
-        """Algoritmo DDA para rasterização de linhas"""
-        dx = x2 - x1
-        dy = y2 - y1
-        steps = max(abs(dx), abs(dy))
-        
-        if steps == 0:
-            return [(x1, y1)]
-        
-        x_inc = dx / steps
-        y_inc = dy / steps
-        
-        points = []
-        x, y = float(x1), float(y1)
-        
-        for _ in range(int(steps) + 1):
-            points.append((int(round(x)), int(round(y))))
-            x += x_inc
-            y += y_inc
-        
+        """Algoritmo DDA para rasterização de linhas (vetorizado, array (N, 2))"""
+        points = line_points_dda(x1, y1, x2, y2)
+        self.stats.add('pixels_dda', len(points))
         return points
     
     def draw_line_bresenham(self, x1, y1, x2, y2, color):
-        """Algoritmo de Bresenham para rasterização de linhas (otimizado)"""
-        points = []
-        dx = abs(x2 - x1)
-        dy = abs(y2 - y1)
-        sx = 1 if x1 < x2 else -1
-        sy = 1 if y1 < y2 else -1
-        err = dx - dy
-        
-        x, y = x1, y1
-        
-        while True:
-            points.append((x, y))
-            if x == x2 and y == y2:
-                break
-            
-            e2 = 2 * err
-            if e2 > -dy:
-                err -= dy
-                x += sx
-            if e2 < dx:
-                err += dx
-                y += sy
-        
+        """Algoritmo de Bresenham para rasterização de linhas (vetorizado, array (N, 2))"""
+        points = line_points(x1, y1, x2, y2)
+        self.stats.add('pixels_bresenham', len(points))
         return points
     
     def draw_circle_bresenham(self, cx, cy, radius, color):
-        """Algoritmo de Bresenham para círculos (otimizado)"""
-        points = []
-        x = 0
-        y = radius
-        d = 3 - 2 * radius
-        
-        while y >= x:
-            # Desenha os 8 octantes
-            octants = [
-                (cx + x, cy + y), (cx - x, cy + y),
-                (cx + x, cy - y), (cx - x, cy - y),
-                (cx + y, cy + x), (cx - y, cy + x),
-                (cx + y, cy - x), (cx - y, cy - x)
-            ]
-            points.extend(octants)
-            
-            x += 1
-            if d > 0:
-                y -= 1
-                d = d + 4 * (x - y) + 10
-            else:
-                d = d + 4 * x + 6
-        
+        """Algoritmo de Bresenham para círculos (octante gerado com NumPy, array (N, 2))"""
+        points = circle_points(cx, cy, radius)
+        self.stats.add('pixels_circle', len(points))
+        return points
+    
+    def draw_ellipse(self, center, axis_u, axis_v):
+        """Contorno da elipse pela equação implícita (semieixos conjugados, array (N, 2))"""
+        points = ellipse_points(center, axis_u, axis_v)
+        self.stats.add('pixels_circle', len(points))
         return points
     
     def apply_transformation_matrix(self, points, matrix):
-        """Aplica matriz de transformação aos pontos (otimizado)"""
-        result = []
-        for x, y in points:
-            # Converte para coordenadas homogêneas
-            point = np.array([x, y, 1])
-            # Aplica transformação
-            transformed = np.dot(matrix, point)
-            result.append((int(transformed[0]), int(transformed[1])))
-        return result
+        """Aplica matriz de transformação aos pontos (todos de uma vez, truncando para pixels)"""
+        if not points:
+            return []
+        transformed = np.trunc(apply_matrix(points, matrix)).astype(int)
+        return list(map(tuple, transformed.tolist()))
     
     def get_translation_matrix(self, dx, dy):
         """Cria matriz de translação"""
-        return np.array([
-            [1, 0, dx],
-            [0, 1, dy],
-            [0, 0, 1]
-        ])
+        return translation_matrix(dx, dy)
     
     def get_rotation_matrix(self, angle, cx=0, cy=0):
         """Cria matriz de rotação em torno de um ponto"""
-        cos_a = math.cos(math.radians(angle))
-        sin_a = math.sin(math.radians(angle))
-        return np.array([
-            [cos_a, -sin_a, -cx*cos_a + cy*sin_a + cx],
-            [sin_a, cos_a, -cx*sin_a - cy*cos_a + cy],
-            [0, 0, 1]
-        ])
+        return rotation_matrix(angle, cx, cy)
     
     def get_scale_matrix(self, sx, sy, cx=0, cy=0):
         """Cria matriz de escala em torno de um ponto"""
-        return np.array([
-            [sx, 0, cx*(1-sx)],
-            [0, sy, cy*(1-sy)],
-            [0, 0, 1]
-        ])
+        return scale_matrix(sx, sy, cx, cy)
     
     def get_reflection_matrix(self, mode):
-        """Cria matriz de reflexão (corrigida)"""
-        if mode == TransformMode.REFLECT_X:
-            # Reflexão no eixo X (espelha verticalmente)
-            return np.array([
-                [1, 0, 0],
-                [0, -1, self.draw_area.height],  # Usa altura da área de desenho
-                [0, 0, 1]
-            ])
-        elif mode == TransformMode.REFLECT_Y:
-            # Reflexão no eixo Y (espelha horizontalmente) 
-            return np.array([
-                [-1, 0, self.draw_area.width],   # Usa largura da área de desenho
-                [0, 1, 0],
-                [0, 0, 1]
-            ])
-        else:  # REFLECT_XY
-            # Reflexão nos dois eixos
-            return np.array([
-                [-1, 0, self.draw_area.width],
-                [0, -1, self.draw_area.height],
-                [0, 0, 1]
-            ])
+        """Cria matriz de reflexão em torno do centro da área de desenho"""
+        axis = {TransformMode.REFLECT_X: REFLECT_X, TransformMode.REFLECT_Y: REFLECT_Y}.get(mode, REFLECT_XY)
+        return reflection_matrix(axis, self.draw_area.width / 2, self.draw_area.height / 2)
             
     def cohen_sutherland_clip(self, x1, y1, x2, y2):
         """Algoritmo Cohen-Sutherland para recorte de linhas"""
-        # Códigos de região
-        INSIDE, LEFT, RIGHT, BOTTOM, TOP = 0, 1, 2, 4, 8
-        
-        def compute_code(x, y):
-            code = INSIDE
-            if x < self.draw_area.left: code |= LEFT
-            elif x > self.draw_area.right: code |= RIGHT
-            if y < self.draw_area.top: code |= BOTTOM
-            elif y > self.draw_area.bottom: code |= TOP
-            return code
-        
-        code1 = compute_code(x1, y1)
-        code2 = compute_code(x2, y2)
-        accept = False
-        
-        while True:
-            if code1 == 0 and code2 == 0:  # Ambos dentro
-                accept = True
-                break
-            elif code1 & code2:  # Ambos do mesmo lado externo
-                break
-            else:
-                # Ponto fora da janela
-                code_out = code1 if code1 != 0 else code2
-                
-                if code_out & TOP:
-                    x = x1 + (x2 - x1) * (self.draw_area.bottom - y1) / (y2 - y1)
-                    y = self.draw_area.bottom
-                elif code_out & BOTTOM:
-                    x = x1 + (x2 - x1) * (self.draw_area.top - y1) / (y2 - y1)
-                    y = self.draw_area.top
-                elif code_out & RIGHT:
-                    y = y1 + (y2 - y1) * (self.draw_area.right - x1) / (x2 - x1)
-                    x = self.draw_area.right
-                elif code_out & LEFT:
-                    y = y1 + (y2 - y1) * (self.draw_area.left - x1) / (x2 - x1)
-                    x = self.draw_area.left
-                
-                if code_out == code1:
-                    x1, y1 = x, y
-                    code1 = compute_code(x1, y1)
-                else:
-                    x2, y2 = x, y
-                    code2 = compute_code(x2, y2)
-        
-        return (int(x1), int(y1), int(x2), int(y2)) if accept else None
+        rect = (self.draw_area.left, self.draw_area.top, self.draw_area.right, self.draw_area.bottom)
+        clipped, kind = cohen_sutherland(x1, y1, x2, y2, rect)
+        # Classificação para as estatísticas (aceite/rejeição trivial ou recorte)
+        self.stats.add(EDGE_COUNTERS[kind])
+        return clipped
     
     def apply_transformations(self):
         """Aplica transformações às formas selecionadas"""
-        selected_shapes = [s for s in self.shapes if s.selected]
-        if not selected_shapes:
+        if not self.selection.vertex_count:
             return
+        selected_shapes = self.selection.shapes
         
-        # Calcula centroide das formas selecionadas
-        all_points = []
-        for shape in selected_shapes:
-            all_points.extend(shape.points)
-        
-        if not all_points:
-            return
-        
-        cx = sum(p[0] for p in all_points) // len(all_points)
-        cy = sum(p[1] for p in all_points) // len(all_points)
+        # Centroide das formas selecionadas
+        cx, cy = self.selection_centroid()
         
         # Cria matriz de transformação
         matrix = np.eye(3)
@@ -1015,96 +1124,154 @@ class PaintCG:
             matrix = self.get_rotation_matrix(self.rotation_angle, cx, cy)
             
         elif self.transform_mode == TransformMode.SCALE:
-            matrix = self.get_scale_matrix(self.transform_factor, self.transform_factor, cx, cy)
+            # Com Shift a escala age só no eixo X
+            keys = pygame.key.get_pressed()
+            sy = 1 if keys[pygame.K_LSHIFT] or keys[pygame.K_RSHIFT] else self.transform_factor
+            matrix = self.get_scale_matrix(self.transform_factor, sy, cx, cy)
             
         else:  # Reflexões
             matrix = self.get_reflection_matrix(self.transform_mode)
         
         # Aplica transformação
-        for shape in selected_shapes:
+        self.transform_shapes(selected_shapes, matrix)
+        self.journal.transform(selected_shapes, matrix)
+    
+    def transform_shapes(self, shapes, matrix):
+        """Aplica a matriz homogênea às formas (também usado ao reaplicar o diário)"""
+        for shape in shapes:
+            if shape.type == 'circle' and not preserves_circles(matrix):
+                # Escala não uniforme: o círculo vira elipse (centro + semieixos)
+                shape.type = 'ellipse'
+                shape.points = circle_to_ellipse(shape.points[0], shape.points[1])
+            elif shape.type == 'fill' and not preserves_axes(matrix):
+                # Rotação ou cisalhamento: a máscara é reamostrada na caixa dos cantos transformados
+                resampled = transform_mask(shape.patch.mask, shape.points[0], shape.points[1], matrix)
+                if resampled is not None:
+                    mask, q0, q1 = resampled
+                    shape.patch = RasterPatch(mask)
+                    shape.points = [tuple(p) for p in np.trunc([q0, q1]).astype(int).tolist()]
+                    continue
             shape.points = self.apply_transformation_matrix(shape.points, matrix)
     
-    def draw_shapes(self):
-        """Desenha todas as formas na tela usando algoritmos de rasterização"""
-        for shape in self.shapes:
-            color = self.RED if shape.selected else shape.color
-            thickness = max(1, int(shape.thickness * self.zoom_factor))
-            
-            if shape.type == 'point':
-                screen_pos = self.world_to_screen(shape.points[0])
-                if self.draw_area.collidepoint(screen_pos):
-                    point_size = max(2, int(5 * self.zoom_factor))
-                    # Usar algoritmo de círculo para o ponto
-                    circle_points = self.draw_circle_bresenham(screen_pos[0], screen_pos[1], point_size, color)
-                    for px, py in circle_points:
-                        if 0 <= px < self.width and 0 <= py < self.height:
-                            self.screen.set_at((px, py), color)
-            
-            elif shape.type == 'line':
-                if len(shape.points) >= 2:
-                    start_pos = self.world_to_screen(shape.points[0])
-                    end_pos = self.world_to_screen(shape.points[1])
-                    
-                    # Aplicar recorte Cohen-Sutherland
-                    clipped_line = self.cohen_sutherland_clip(start_pos[0], start_pos[1], end_pos[0], end_pos[1])
-                    if clipped_line:
-                        x1, y1, x2, y2 = clipped_line
-                        # Usar Bresenham para linha
-                        line_points = self.draw_line_bresenham(x1, y1, x2, y2, color)
-                        for px, py in line_points:
-                            if 0 <= px < self.width and 0 <= py < self.height:
-                                for dy in range(-thickness//2, thickness//2 + 1):
-                                    for dx in range(-thickness//2, thickness//2 + 1):
-                                        if 0 <= px+dx < self.width and 0 <= py+dy < self.height:
-                                            self.screen.set_at((px+dx, py+dy), color)
-            
-            elif shape.type == 'circle':
-                if len(shape.points) >= 2:
-                    center_pos = self.world_to_screen(shape.points[0])
-                    world_radius = math.sqrt((shape.points[1][0] - shape.points[0][0])**2 + 
-                                        (shape.points[1][1] - shape.points[0][1])**2)
-                    screen_radius = int(world_radius * self.zoom_factor)
-                    
-                    if screen_radius > 0:
-                        # Usar Bresenham para círculo
-                        circle_points = self.draw_circle_bresenham(center_pos[0], center_pos[1], screen_radius, color)
-                        for px, py in circle_points:
-                            if self.draw_area.collidepoint((px, py)):
-                                for i in range(thickness):
-                                    # Desenha círculos concêntricos para espessura
-                                    thick_points = self.draw_circle_bresenham(center_pos[0], center_pos[1], screen_radius + i - thickness//2, color)
-                                    for tpx, tpy in thick_points:
-                                        if 0 <= tpx < self.width and 0 <= tpy < self.height:
-                                            self.screen.set_at((tpx, tpy), color)
-            
-            elif shape.type == 'polygon':
-                if len(shape.points) > 2:
-                    screen_points = [self.world_to_screen(p) for p in shape.points]
-                    # Desenha arestas do polígono usando Bresenham
-                    for i in range(len(screen_points)):
-                        start = screen_points[i]
-                        end = screen_points[(i + 1) % len(screen_points)]
-                        
-                        clipped_line = self.cohen_sutherland_clip(start[0], start[1], end[0], end[1])
-                        if clipped_line:
-                            x1, y1, x2, y2 = clipped_line
-                            line_points = self.draw_line_bresenham(x1, y1, x2, y2, color)
-                            for px, py in line_points:
-                                if 0 <= px < self.width and 0 <= py < self.height:
-                                    for dy in range(-thickness//2, thickness//2 + 1):
-                                        for dx in range(-thickness//2, thickness//2 + 1):
-                                            if 0 <= px+dx < self.width and 0 <= py+dy < self.height:
-                                                self.screen.set_at((px+dx, py+dy), color)
-            
-            elif shape.type == 'freehand':
-                if len(shape.points) > 1:
-                    screen_points = []
-                    for point in shape.points:
-                        screen_pos = self.world_to_screen(point)
-                        if self.draw_area.collidepoint(screen_pos):
-                            screen_points.append(screen_pos)
+    def rasterize_shape(self, shape):
+        """Rasteriza uma forma em operações de desenho, sem tocar no framebuffer
+        
+        Roda nas threads do pool; retorna (desenhada, operações), aplicadas depois
+        por composite_shape na ordem das formas.
+        """
+        color = self.RED if shape.selected else shape.color
+        thickness = max(1, int(shape.thickness * self.zoom_factor))
+        lo, hi = -thickness // 2, thickness // 2  # Alcance do carimbo quadrado de espessura
+        screen = (0, 0, self.width, self.height)  # Recorte do traço: (esquerda, topo, direita, base)
+        drawn = False  # Se a forma produziu algum pixel visível
+        ops = []
+        
+        def stroke(pixels, bounds):
+            """Carimba os pixels dentro de `bounds`; os de fora só contam como descartados"""
+            left, top, right, bottom = bounds
+            inside = ((pixels[:, 0] >= left) & (pixels[:, 0] < right) &
+                      (pixels[:, 1] >= top) & (pixels[:, 1] < bottom))
+            centers = pixels[inside]
+            written, rejected = box_coverage(centers, lo, hi, screen)
+            ops.append(('count', written, rejected + len(pixels) - len(centers)))
+            # Os carimbos viram trechos disjuntos: cada pixel é escrito uma vez só
+            ops.append(('fill', box_spans(centers, lo, hi, screen), color))
+            return len(centers) > 0
+        
+        if shape.type == 'point':
+            screen_pos = self.world_to_screen(shape.points[0])
+            if self.draw_area.collidepoint(screen_pos):
+                drawn = True
+                point_size = max(2, int(5 * self.zoom_factor))
+                # Usar algoritmo de círculo para o ponto
+                ops.append(('pixels', self.draw_circle_bresenham(screen_pos[0], screen_pos[1], point_size, color), color))
+        
+        elif shape.type == 'line':
+            if len(shape.points) >= 2:
+                start_pos = self.world_to_screen(shape.points[0])
+                end_pos = self.world_to_screen(shape.points[1])
+                
+                # Aplicar recorte Cohen-Sutherland
+                clipped_line = self.cohen_sutherland_clip(start_pos[0], start_pos[1], end_pos[0], end_pos[1])
+                if clipped_line:
+                    drawn = True
+                    # Usar Bresenham para linha
+                    stroke(self.draw_line_bresenham(*clipped_line, color), screen)
+        
+        elif shape.type == 'circle':
+            if len(shape.points) >= 2:
+                center_pos = self.world_to_screen(shape.points[0])
+                world_radius = math.sqrt((shape.points[1][0] - shape.points[0][0])**2 + 
+                                    (shape.points[1][1] - shape.points[0][1])**2)
+                screen_radius = int(world_radius * self.zoom_factor)
+                
+                if screen_radius > 0 and shape.filled:
+                    # Disco limitado pelos extremos do Bresenham de cada linha
+                    ops.append(('spans', circle_spans(center_pos[0], center_pos[1], screen_radius), color, self.draw_area))
+                
+                if screen_radius > 0:
+                    # Usar Bresenham para círculo
+                    outline = self.draw_circle_bresenham(center_pos[0], center_pos[1], screen_radius, color)
+                    area = self.draw_area
+                    visible = int(np.count_nonzero((outline[:, 0] >= area.left) & (outline[:, 0] < area.right) &
+                                                   (outline[:, 1] >= area.top) & (outline[:, 1] < area.bottom)))
+                    ops.append(('count', 0, len(outline) - visible))
+                    if visible:
+                        drawn = True
+                        for i in range(thickness):
+                            # Desenha círculos concêntricos para espessura (uma vez cada)
+                            ring = self.draw_circle_bresenham(center_pos[0], center_pos[1], screen_radius + i - thickness//2, color)
+                            ops.append(('pixels', ring, color))
+        
+        elif shape.type == 'ellipse':
+            # Centro e dois semieixos conjugados: escalas não uniformes mantêm a forma analítica
+            center_pos = self.world_to_screen(shape.points[0])
+            axes = [np.subtract(self.world_to_screen(p), center_pos) for p in shape.points[1:3]]
+            if shape.filled:
+                ops.append(('spans', ellipse_spans(center_pos, *axes), color, self.draw_area))
+            area = self.draw_area
+            if stroke(self.draw_ellipse(center_pos, *axes), (area.left, area.top, area.right, area.bottom)):
+                drawn = True
+        
+        elif shape.type == 'polygon':
+            if len(shape.points) > 2:
+                # Polígonos grandes usam o nível de detalhe adequado ao zoom
+                points = shape.lod_points(self.lod_error / self.zoom_factor)
+                self.stats.add('vertices_simplified', len(shape.points) - len(points))
+                screen_points = [self.world_to_screen(p) for p in points]
+                if shape.filled:
+                    # Preenchimento por linhas de varredura, só nas linhas da área de desenho
+                    spans = polygon_spans(screen_points, shape.fill_rule,
+                                          self.draw_area.top, self.draw_area.bottom)
+                    ops.append(('spans', spans, color, self.draw_area))
+                
+                # Desenha arestas do polígono usando Bresenham, recortadas em lote (Cohen-Sutherland)
+                starts = np.asarray(screen_points)
+                area = self.draw_area
+                accepted, clipped, classes = cohen_sutherland_segments(
+                    np.concatenate([starts, np.roll(starts, -1, axis=0)], axis=1),
+                    (area.left, area.top, area.right, area.bottom))
+                for name, count in zip(EDGE_COUNTERS, np.bincount(classes, minlength=3).tolist()):
+                    self.stats.add(name, count)
+                edges = [self.draw_line_bresenham(*segment, color) for segment in clipped[accepted].tolist()]
+                if edges:
+                    drawn = True
+                    stroke(np.concatenate(edges), screen)
+        
+        elif shape.type == 'freehand':
+            if len(shape.points) > 1:
+                points = shape.lod_points(self.lod_error / self.zoom_factor)
+                self.stats.add('vertices_simplified', len(shape.points) - len(points))
+                screen_points = []
+                for point in points:
+                    screen_pos = self.world_to_screen(point)
+                    if self.draw_area.collidepoint(screen_pos):
+                        screen_points.append(screen_pos)
+                
+                if len(screen_points) > 1:
+                    drawn = True
                     
-                    if len(screen_points) > 1:
+                    def draw_freehand(screen_points=screen_points):
                         # Desenha linha suave conectando pontos
                         for i in range(len(screen_points) - 1):
                             pygame.draw.line(self.screen, color, 
@@ -1113,6 +1280,44 @@ class PaintCG:
                         # Desenha pontos para suavizar
                         for point in screen_points:
                             pygame.draw.circle(self.screen, color, point, thickness // 2)
+                    ops.append(('call', draw_freehand))
+        
+        elif shape.type == 'fill':
+            # Recorte raster do balde de tinta (Surface em cache, refeita só no zoom)
+            p0, p1 = self.world_to_screen(shape.points[0]), self.world_to_screen(shape.points[1])
+            ops.append(('call', lambda: shape.patch.draw(self.screen, p0, p1, color, self.draw_area)))
+        
+        return drawn, ops
+    
+    def composite_shape(self, writer, ops):
+        """Aplica no framebuffer as operações de uma forma; retorna se algo ficou visível"""
+        drawn = False
+        for op in ops:
+            if op[0] == 'pixels':
+                writer.points(op[1][:, 0], op[1][:, 1], op[2])
+            elif op[0] == 'fill':
+                writer.fill_spans(*op[1], op[2])
+            elif op[0] == 'spans':
+                drawn = writer.spans(*op[1], op[2], clip=op[3]) > 0 or drawn
+            elif op[0] == 'count':
+                writer.written += op[1]
+                writer.rejected += op[2]
+            else:  # 'call': desenho feito pelo pygame
+                drawn = bool(op[1]()) or drawn
+        return drawn
+    
+    def draw_shapes(self):
+        """Desenha todas as formas na tela usando algoritmos de rasterização"""
+        # Traços e preenchimentos passam pelo mesmo escritor de trechos (conta os pixels)
+        writer = SpanWriter(self.screen, (0, 0, self.width, self.height))
+        
+        # As formas são rasterizadas em paralelo e compostas em ordem (a última fica por cima)
+        for drawn, ops in self.raster_pool.map(self.rasterize_shape, self.shapes):
+            drawn = self.composite_shape(writer, ops) or drawn
+            self.stats.add('shapes_drawn' if drawn else 'shapes_culled')
+        
+        self.stats.add('pixels_written', writer.written)
+        self.stats.add('pixels_rejected', writer.rejected)
         
         # Desenha polígono em construção
         if self.current_polygon:
@@ -1126,10 +1331,11 @@ class PaintCG:
                     pygame.draw.circle(self.screen, self.WHITE, point, 8, 2)
                     
                     # Número do vértice
-                    num_text = self.font_small.render(str(i + 1), True, self.WHITE)
-                    num_bg = pygame.Rect(point[0] - 8, point[1] - 20, 16, 16)
-                    pygame.draw.rect(self.screen, self.ACCENT, num_bg, border_radius=8)
-                    self.screen.blit(num_text, (point[0] - 4, point[1] - 18))
+                    if self.ui_ready:
+                        num_text = self.text.render(self.font_small, str(i + 1), self.WHITE)
+                        num_bg = pygame.Rect(point[0] - 8, point[1] - 20, 16, 16)
+                        pygame.draw.rect(self.screen, self.ACCENT, num_bg, border_radius=8)
+                        self.screen.blit(num_text, (point[0] - 4, point[1] - 18))
             
             # Conecta pontos
             for i in range(len(screen_polygon) - 1):
@@ -1172,226 +1378,314 @@ class PaintCG:
             pygame.draw.rect(self.screen, self.ACCENT, animated_rect, 3)
             pygame.draw.rect(self.screen, self.WHITE, self.selection_rect, 1)
     
-    def run(self):
-        """Loop principal do programa (otimizado para fluidez)"""
+    def draw_stats_overlay(self):
+        """Mostra os contadores do último quadro no canto da área de desenho (F3)"""
+        if not self.ui_ready:
+            return
+        lines = (self.stats.report_lines() or ["(sem contadores)"]) + [self.scheduler.report()]
+        x, y = self.draw_area.x + 10, self.draw_area.y + 10
+        bg = pygame.Rect(x - 5, y - 5, 260, 16 * len(lines) + 10)
+        pygame.draw.rect(self.screen, self.LIGHT_GRAY, bg, border_radius=5)
+        pygame.draw.rect(self.screen, self.DARK_GRAY, bg, 1, border_radius=5)
+        for i, line in enumerate(lines):
+            self.screen.blit(self.text.render(self.font_small, line, self.DARK_GRAY), (x, y + i * 16))
+    
+    def is_animating(self):
+        """Indica se algo na tela muda sem eventos (bordas pulsantes, cursor piscando)"""
+        return bool(not self.ui_ready or self.current_polygon or self.selection_rect or
+                    self.rotating or self.drawing_freehand or
+                    self.rotation_input_active or self.thickness_input_active)
+    
+    def handle_events(self, events):
+        """Processa um lote de eventos; retorna False quando o programa deve fechar"""
+        self.recorder.record(events)
         running = True
-        mouse_pressed = False
-        
-        while running:
-            # Processa eventos
-            for event in pygame.event.get():
-                if event.type == pygame.QUIT:
-                    running = False
+        for event in coalesce_motion(events, self.stats):
+            if not self.handle_event(event):
+                running = False
+        return running
+    
+    def handle_event(self, event):
+        """Trata um único evento; retorna False ao fechar a janela"""
+        if event.type == pygame.QUIT:
+            return False
                 
-                elif event.type == pygame.KEYDOWN:
-                    # Gerencia entrada de texto primeiro
-                    if self.rotation_input_active or self.thickness_input_active:
-                        self.handle_text_input(event)
-                        continue
+        elif event.type == pygame.KEYDOWN:
+            # Gerencia entrada de texto primeiro
+            if self.rotation_input_active or self.thickness_input_active:
+                self.handle_text_input(event)
+                return True
                     
-                    # Atalhos de teclado
-                    if event.key == pygame.K_c:
-                        self.shapes = []
-                        self.current_polygon = []
-                        self.current_freehand = []
-                    elif event.key == pygame.K_ESCAPE:
-                        if self.current_polygon:
-                            if len(self.current_polygon) >= 3:
-                                self.shapes.append(Shape('polygon', self.current_polygon.copy(), 
-                                                       self.current_draw_color, self.brush_thickness))
-                            self.current_polygon = []
-                        elif self.current_freehand:
-                            if len(self.current_freehand) > 1:
-                                self.shapes.append(Shape('freehand', self.current_freehand.copy(), 
-                                                       self.current_draw_color, self.brush_thickness))
-                            self.current_freehand = []
-                            self.drawing_freehand = False
-                    elif event.key == pygame.K_RETURN:
-                        self.apply_transformations()
-                        if self.transform_mode == TransformMode.ROTATE:
-                            self.rotation_angle = 0.0
-                    elif pygame.K_1 <= event.key <= pygame.K_9:
-                        value = event.key - pygame.K_0
-                        if self.transform_mode == TransformMode.ROTATE:
-                            self.rotation_angle = value * 10
-                        else:
-                            self.transform_factor = value * 0.2 + 0.1  # 0.3, 0.5, 0.7, ... 1.9
+            # Atalhos de teclado
+            if event.key == pygame.K_c:
+                self.shapes = []
+                self.selection.clear()
+                self.journal.clear()
+                self.current_polygon = []
+                self.current_freehand = []
+            elif event.key == pygame.K_ESCAPE:
+                if self.current_polygon:
+                    if len(self.current_polygon) >= 3:
+                        self.add_shape(Shape('polygon', self.current_polygon.copy(), 
+                                               self.current_draw_color, self.brush_thickness))
+                    self.current_polygon = []
+                elif self.current_freehand:
+                    if len(self.current_freehand) > 1:
+                        self.add_shape(Shape('freehand', self.current_freehand.copy(), 
+                                               self.current_draw_color, self.brush_thickness))
+                    self.current_freehand = []
+                    self.drawing_freehand = False
+            elif event.key == pygame.K_F3:
+                self.show_stats = not self.show_stats
+            elif event.key == pygame.K_f:
+                self.toggle_fill()
+            elif event.key == pygame.K_RETURN:
+                self.apply_transformations()
+                if self.transform_mode == TransformMode.ROTATE:
+                    self.rotation_angle = 0.0
+            elif pygame.K_1 <= event.key <= pygame.K_9:
+                value = event.key - pygame.K_0
+                if self.transform_mode == TransformMode.ROTATE:
+                    self.rotation_angle = value * 10
+                else:
+                    self.transform_factor = value * 0.2 + 0.1  # 0.3, 0.5, 0.7, ... 1.9
                     
-                    # Atalhos de zoom
-                    keys = pygame.key.get_pressed()
-                    if keys[pygame.K_LCTRL] or keys[pygame.K_RCTRL]:
-                        if event.key == pygame.K_EQUALS or event.key == pygame.K_PLUS:
-                            self.zoom_in()
-                        elif event.key == pygame.K_MINUS:
-                            self.zoom_out()
-                        elif event.key == pygame.K_0:
-                            self.reset_zoom()
+            # Atalhos de zoom
+            keys = pygame.key.get_pressed()
+            if keys[pygame.K_LCTRL] or keys[pygame.K_RCTRL]:
+                if event.key == pygame.K_EQUALS or event.key == pygame.K_PLUS:
+                    self.zoom_in()
+                elif event.key == pygame.K_MINUS:
+                    self.zoom_out()
+                elif event.key == pygame.K_0:
+                    self.reset_zoom()
                 
-                elif event.type == pygame.MOUSEWHEEL:
-                    # Controle de zoom e valores
-                    self.handle_scroll(event.y, pygame.mouse.get_pos())
+        elif event.type == pygame.MOUSEWHEEL:
+            # Controle de zoom e valores
+            self.handle_scroll(event.y, pygame.mouse.get_pos())
                 
-                elif event.type == pygame.MOUSEBUTTONDOWN:
-                    if event.button == 1:  # Botão esquerdo
-                        pos = pygame.mouse.get_pos()
+        elif event.type == pygame.MOUSEBUTTONDOWN:
+            if event.button == 1:  # Botão esquerdo
+                pos = event.pos
                         
-                        # Desativa inputs se clicar fora
-                        if self.rotation_input_active or self.thickness_input_active:
-                            # Verifica se clicou nos campos de input
-                            thickness_input_rect = pygame.Rect(150, 235, 80, 25)
-                            rotation_input_rect = pygame.Rect(25, 655, 200, 25)
+                # Desativa inputs se clicar fora
+                if self.rotation_input_active or self.thickness_input_active:
+                    # Verifica se clicou nos campos de input
+                    thickness_input_rect = pygame.Rect(150, 235, 80, 25)
+                    rotation_input_rect = pygame.Rect(25, 655, 200, 25)
                             
-                            if not (thickness_input_rect.collidepoint(pos) or 
-                                   rotation_input_rect.collidepoint(pos)):
-                                self.rotation_input_active = False
-                                self.thickness_input_active = False
+                    if not (thickness_input_rect.collidepoint(pos) or 
+                           rotation_input_rect.collidepoint(pos)):
+                        self.rotation_input_active = False
+                        self.thickness_input_active = False
                         
-                        # Verifica clique no painel
-                        if self.handle_panel_click(pos):
-                            continue
+                # Verifica clique no painel
+                if self.handle_panel_click(pos):
+                    return True
                         
-                        # Verifica se está na área de desenho
-                        if not self.draw_area.collidepoint(pos):
-                            continue
+                # Verifica se está na área de desenho
+                if not self.draw_area.collidepoint(pos):
+                    return True
                         
-                        # Converte posição para coordenadas do mundo
-                        world_pos = self.screen_to_world(pos)
+                # Converte posição para coordenadas do mundo
+                world_pos = self.screen_to_world(pos)
                         
-                        # Modo seleção
-                        if self.draw_mode == DrawMode.SELECT:
-                            selected_shapes = [s for s in self.shapes if s.selected]
-                            
-                            if self.transform_mode == TransformMode.ROTATE and selected_shapes:
-                                self.rotating = True
-                                self.rotation_start_pos = pos
-                            else:
-                                self.selecting = True
-                                self.selection_start = pos
-                            mouse_pressed = True
+                # Modo seleção
+                if self.draw_mode == DrawMode.SELECT:
+                    if self.transform_mode == TransformMode.ROTATE and self.selection:
+                        self.rotating = True
+                        self.rotation_start_pos = pos
+                    else:
+                        self.selecting = True
+                        self.selection_start = pos
+                    self.mouse_pressed = True
                         
-                        # Desenho de formas
-                        elif self.draw_mode == DrawMode.POINT:
-                            self.shapes.append(Shape('point', [world_pos], self.current_draw_color, self.brush_thickness))
+                # Desenho de formas
+                elif self.draw_mode == DrawMode.POINT:
+                    self.add_shape(Shape('point', [world_pos], self.current_draw_color, self.brush_thickness))
                         
-                        elif self.draw_mode == DrawMode.LINE:
-                            if not hasattr(self, 'line_start'):
-                                self.line_start = world_pos
-                            else:
-                                self.shapes.append(Shape('line', [self.line_start, world_pos], 
-                                                       self.current_draw_color, self.brush_thickness))
-                                delattr(self, 'line_start')
+                elif self.draw_mode == DrawMode.LINE:
+                    if not hasattr(self, 'line_start'):
+                        self.line_start = world_pos
+                    else:
+                        self.add_shape(Shape('line', [self.line_start, world_pos], 
+                                               self.current_draw_color, self.brush_thickness))
+                        delattr(self, 'line_start')
                         
-                        elif self.draw_mode == DrawMode.CIRCLE:
-                            if not hasattr(self, 'circle_center'):
-                                self.circle_center = world_pos
-                            else:
-                                self.shapes.append(Shape('circle', [self.circle_center, world_pos], 
-                                                       self.current_draw_color, self.brush_thickness))
-                                delattr(self, 'circle_center')
+                elif self.draw_mode == DrawMode.CIRCLE:
+                    if not hasattr(self, 'circle_center'):
+                        self.circle_center = world_pos
+                    else:
+                        self.add_shape(Shape('circle', [self.circle_center, world_pos], 
+                                               self.current_draw_color, self.brush_thickness))
+                        delattr(self, 'circle_center')
                         
-                        elif self.draw_mode == DrawMode.POLYGON:
-                            self.current_polygon.append(world_pos)
+                elif self.draw_mode == DrawMode.POLYGON:
+                    self.current_polygon.append(world_pos)
                         
-                        elif self.draw_mode == DrawMode.FREEHAND:
-                            self.drawing_freehand = True
-                            self.current_freehand = [world_pos]
-                            mouse_pressed = True
+                elif self.draw_mode == DrawMode.FREEHAND:
+                    self.drawing_freehand = True
+                    self.current_freehand = [world_pos]
+                    self.mouse_pressed = True
                 
-                elif event.type == pygame.MOUSEBUTTONUP:
-                    if event.button == 1:
-                        if self.rotating:
-                            self.apply_transformations()
-                            self.rotation_angle = 0.0
-                            self.rotating = False
-                            self.rotation_start_pos = None
-                        elif self.selecting:
-                            self.selecting = False
-                            if self.selection_rect:
-                                # Converte retângulo para coordenadas do mundo
-                                world_rect = (
-                                    self.screen_to_world((self.selection_rect.left, self.selection_rect.top))[0],
-                                    self.screen_to_world((self.selection_rect.left, self.selection_rect.top))[1],
-                                    self.screen_to_world((self.selection_rect.right, self.selection_rect.bottom))[0],
-                                    self.screen_to_world((self.selection_rect.right, self.selection_rect.bottom))[1]
-                                )
-                                self.select_shapes(world_rect)
-                                self.selection_rect = None
-                        elif self.drawing_freehand:
-                            if len(self.current_freehand) > 1:
-                                self.shapes.append(Shape('freehand', self.current_freehand.copy(), self.current_draw_color, self.brush_thickness))
-                            self.current_freehand = []
-                            self.drawing_freehand = False
-                        mouse_pressed = False
+                elif self.draw_mode == DrawMode.FILL:
+                    self.fill_at(pos)
                 
-                elif event.type == pygame.MOUSEMOTION:
-                    if mouse_pressed:
-                        current_pos = pygame.mouse.get_pos()
-                        
-                        if self.rotating:
-                            self.handle_rotation_drag(current_pos)
-                        elif self.selecting:
-                            self.selection_rect = pygame.Rect(
-                                min(self.selection_start[0], current_pos[0]),
-                                min(self.selection_start[1], current_pos[1]),
-                                abs(current_pos[0] - self.selection_start[0]),
-                                abs(current_pos[1] - self.selection_start[1])
-                            )
-                        elif self.drawing_freehand:
-                            world_pos = self.screen_to_world(current_pos)
-                            if self.draw_area.collidepoint(current_pos):
-                                # Adiciona ponto apenas se estiver longe o suficiente do último
-                                if (not self.current_freehand or 
-                                    math.sqrt((world_pos[0] - self.current_freehand[-1][0])**2 + 
-                                             (world_pos[1] - self.current_freehand[-1][1])**2) > 3):
-                                    self.current_freehand.append(world_pos)
+        elif event.type == pygame.MOUSEBUTTONUP:
+            if event.button == 1:
+                if self.rotating:
+                    self.apply_transformations()
+                    self.rotation_angle = 0.0
+                    self.rotating = False
+                    self.rotation_start_pos = None
+                elif self.selecting:
+                    self.selecting = False
+                    if self.selection_rect and (self.selection_rect.width > 3 or self.selection_rect.height > 3):
+                        # Converte retângulo para coordenadas do mundo
+                        world_rect = (
+                            self.screen_to_world((self.selection_rect.left, self.selection_rect.top))[0],
+                            self.screen_to_world((self.selection_rect.left, self.selection_rect.top))[1],
+                            self.screen_to_world((self.selection_rect.right, self.selection_rect.bottom))[0],
+                            self.screen_to_world((self.selection_rect.right, self.selection_rect.bottom))[1]
+                        )
+                        self.select_shapes(world_rect)
+                    else:
+                        # Clique simples: seleciona só a forma mais próxima do cursor
+                        self.select_at(event.pos)
+                    self.selection_rect = None
+                elif self.drawing_freehand:
+                    if len(self.current_freehand) > 1:
+                        self.add_shape(Shape('freehand', self.current_freehand.copy(), self.current_draw_color, self.brush_thickness))
+                    self.current_freehand = []
+                    self.drawing_freehand = False
+                self.mouse_pressed = False
+                
+        elif event.type == pygame.MOUSEMOTION:
+            if self.mouse_pressed:
+                current_pos = event.pos
+                
+                if self.rotating:
+                    self.handle_rotation_drag(current_pos)
+                elif self.selecting:
+                    self.selection_rect = pygame.Rect(
+                        min(self.selection_start[0], current_pos[0]),
+                        min(self.selection_start[1], current_pos[1]),
+                        abs(current_pos[0] - self.selection_start[0]),
+                        abs(current_pos[1] - self.selection_start[1])
+                    )
+                elif self.drawing_freehand:
+                    # O traço livre usa todas as amostras do lote agrupado
+                    for sample in getattr(event, 'samples', (current_pos,)):
+                        if not self.draw_area.collidepoint(sample):
+                            continue
+                        world_pos = self.screen_to_world(sample)
+                        # Adiciona ponto apenas se estiver longe o suficiente do último
+                        if (not self.current_freehand or 
+                            math.sqrt((world_pos[0] - self.current_freehand[-1][0])**2 + 
+                                     (world_pos[1] - self.current_freehand[-1][1])**2) > 3):
+                            self.current_freehand.append(world_pos)
+        
+        return True
+    
+    def draw_frame(self):
+        """Renderiza um quadro completo na tela"""
+        self.screen.fill(self.WHITE)
             
-            # Renderização
-            self.screen.fill(self.WHITE)
+        # Área de desenho com sombra e zoom info
+        shadow_rect = pygame.Rect(self.draw_area.x + 3, self.draw_area.y + 3, 
+                                self.draw_area.width, self.draw_area.height)
+        pygame.draw.rect(self.screen, (230, 230, 230), shadow_rect)
+        pygame.draw.rect(self.screen, self.WHITE, self.draw_area)
+        pygame.draw.rect(self.screen, self.DARK_GRAY, self.draw_area, 3)
             
-            # Área de desenho com sombra e zoom info
-            shadow_rect = pygame.Rect(self.draw_area.x + 3, self.draw_area.y + 3, 
-                                    self.draw_area.width, self.draw_area.height)
-            pygame.draw.rect(self.screen, (230, 230, 230), shadow_rect)
-            pygame.draw.rect(self.screen, self.WHITE, self.draw_area)
-            pygame.draw.rect(self.screen, self.DARK_GRAY, self.draw_area, 3)
+        # Desenha formas e interface
+        self.draw_shapes()
+        if self.draw_mode == DrawMode.FILL:
+            # Guarda o canvas antes das sobreposições, para o balde não precisar re-renderizar
+            self.canvas_snapshot = self.screen.subsurface(self.draw_area).copy()
+        
+        # Mostra informações de zoom na área de desenho (depois da cópia: não vira borda do balde)
+        if self.zoom_factor != 1.0 and self.ui_ready:
+            zoom_info = f"Zoom: {self.zoom_factor:.1f}x"
+            zoom_text = self.text.render(self.font_small, zoom_info, self.DARK_GRAY)
+            zoom_bg = pygame.Rect(self.draw_area.right - 100, self.draw_area.top + 10, 80, 20)
+            pygame.draw.rect(self.screen, (255, 255, 255, 200), zoom_bg, border_radius=5)
+            self.screen.blit(zoom_text, (zoom_bg.x + 5, zoom_bg.y + 3))
             
-            # Mostra informações de zoom na área de desenho
-            if self.zoom_factor != 1.0:
-                zoom_info = f"Zoom: {self.zoom_factor:.1f}x"
-                zoom_text = self.font_small.render(zoom_info, True, self.DARK_GRAY)
-                zoom_bg = pygame.Rect(self.draw_area.right - 100, self.draw_area.top + 10, 80, 20)
-                pygame.draw.rect(self.screen, (255, 255, 255, 200), zoom_bg, border_radius=5)
-                self.screen.blit(zoom_text, (zoom_bg.x + 5, zoom_bg.y + 3))
+        self.draw_interface()
             
-            # Desenha formas e interface
-            self.draw_shapes()
-            self.draw_interface()
+        # Preview de formas em construção
+        if hasattr(self, 'line_start'):
+            mouse_pos = pygame.mouse.get_pos()
+            if self.draw_area.collidepoint(mouse_pos):
+                start_screen = self.world_to_screen(self.line_start)
+                thickness = max(1, int(self.brush_thickness * self.zoom_factor))
+                pygame.draw.line(self.screen, (*self.current_draw_color, 128), 
+                               start_screen, mouse_pos, thickness)
             
-            # Preview de formas em construção
-            if hasattr(self, 'line_start'):
-                mouse_pos = pygame.mouse.get_pos()
-                if self.draw_area.collidepoint(mouse_pos):
-                    start_screen = self.world_to_screen(self.line_start)
-                    thickness = max(1, int(self.brush_thickness * self.zoom_factor))
-                    pygame.draw.line(self.screen, (*self.current_draw_color, 128), 
-                                   start_screen, mouse_pos, thickness)
+        if hasattr(self, 'circle_center'):
+            mouse_pos = pygame.mouse.get_pos()
+            if self.draw_area.collidepoint(mouse_pos):
+                center_screen = self.world_to_screen(self.circle_center)
+                world_mouse = self.screen_to_world(mouse_pos)
+                radius = int(math.sqrt((world_mouse[0] - self.circle_center[0])**2 + 
+                                     (world_mouse[1] - self.circle_center[1])**2) * self.zoom_factor)
+                thickness = max(1, int(self.brush_thickness * self.zoom_factor))
+                if radius > 0:
+                    pygame.draw.circle(self.screen, (*self.current_draw_color, 128), 
+                                     center_screen, radius, thickness)
             
-            if hasattr(self, 'circle_center'):
-                mouse_pos = pygame.mouse.get_pos()
-                if self.draw_area.collidepoint(mouse_pos):
-                    center_screen = self.world_to_screen(self.circle_center)
-                    world_mouse = self.screen_to_world(mouse_pos)
-                    radius = int(math.sqrt((world_mouse[0] - self.circle_center[0])**2 + 
-                                         (world_mouse[1] - self.circle_center[1])**2) * self.zoom_factor)
-                    thickness = max(1, int(self.brush_thickness * self.zoom_factor))
-                    if radius > 0:
-                        pygame.draw.circle(self.screen, (*self.current_draw_color, 128), 
-                                         center_screen, radius, thickness)
+        if self.show_stats:
+            self.draw_stats_overlay()
+    
+    def shape_from_record(self, record):
+        """Recria uma forma gravada no autosave ou no diário (com o mesmo uid)"""
+        # Coordenadas inteiras voltam a ser int, como as geradas pela interface
+        points = [tuple(int(v) if v.is_integer() else v for v in p) for p in record['points'].tolist()]
+        shape = Shape(record['type'], points, record['color'], record['thickness'])
+        shape.uid = record['uid']
+        shape.filled = record['filled']
+        shape.fill_rule = record['fill_rule']
+        if record['mask'] is not None:
+            shape.patch = RasterPatch(record['mask'])
+        return shape
+    
+    def recover(self, snapshot, journals):
+        """Recupera a cena: o último autosave e, por cima, as alterações do diário"""
+        shapes = []
+        if snapshot:
+            try:
+                shapes = [self.shape_from_record(r) for r in read_snapshot(snapshot, self.autosave.app)]
+            except (OSError, KeyError, ValueError):
+                pass  # Autosave ilegível (ou de outro aplicativo): o diário é reaplicado sobre o canvas vazio
+        self.shapes = replay_journal(journals, shapes, self.shape_from_record, self.transform_shapes)
+        # Formas novas não podem reutilizar uids recuperados
+        Shape.uids = itertools.count(max((s.uid for s in self.shapes), default=0) + 1)
+    
+    def run(self):
+        """Loop principal do programa (otimizado para fluidez)"""
+        running = True
+        
+        # Sessão anterior encerrada sem sair normalmente: recupera o último autosave e o diário
+        recovery = self.autosave.start()
+        if recovery and not self.shapes:
+            self.recover(*recovery)
+        self.autosave.checkpoint(self.shapes)
+        
+        while running:
+            running = self.handle_events(self.scheduler.next_events(self.is_animating()))
+            self.draw_frame()
             
             # Atualiza display
             pygame.display.flip()
-            self.clock.tick(self.fps)
-        
+            self.autosave.maybe_save(self.shapes)  # Só tira o retrato; a gravação é em outra thread
+            self.stats.end_frame()
+            if not self.ui_ready:
+                self.finish_startup()
+        
+        self.autosave.close()
+        self.recorder.close()
+        self.raster_pool.shutdown()
         pygame.quit()
 
 if __name__ == "__main__":
@@ -1,8 +1,36 @@
+import time
+STARTUP_T0 = time.perf_counter()  # Referência para o relatório de inicialização
+
 import pygame
 import numpy as np
-import math
+import itertools
+import threading
 from enum import Enum
-import colorsys
+from cgcore import RenderStats, StartupTimer
+from cgcore.autosave import Autosaver, read_snapshot
+from cgcore.backends import BackendSelector
+from cgcore.color import load_color_wheel
+from cgcore.clip import (CROSSING, EDGE_COUNTERS, INSIDE, OUTSIDE, bounds_window_relation, circle_window_relation, clip_mask,
+                         clip_polyline, points_in_window, split_at_window, sutherland_hodgman, visible_runs)
+from cgcore.fill import EVEN_ODD, NONZERO, circle_spans
+from cgcore.floodfill import flood_fill
+from cgcore.geometry import ShapeGeometry
+from cgcore.hittest import HitScene
+from cgcore.journal import replay_journal
+from cgcore.parallel import RasterPool
+from cgcore.raster import (circle_to_ellipse, curve_segments, ellipse_points, ellipse_polyline, ellipse_radius,
+                            ellipse_spans, preserves_axes, preserves_circles, transform_mask)
+from cgcore.selection import SelectionSet
+from cgcore.simplify import LodPyramid
+from cgcore.transform import REFLECT_X, REFLECT_XY, REFLECT_Y, apply_matrix, reflection_matrix, rotation_matrix, scale_matrix
+import cgui.backends  # Registra o backend de pré-visualização 'pygame'
+from cgui.events import coalesce_motion
+from cgui.panel import PanelCache, PanelSection
+from cgui.patch import RasterPatch
+from cgui.recorder import EventRecorder
+from cgui.scheduler import FrameScheduler
+from cgui.spans import SpanWriter, disc_stamp
+from cgui.text import TextCache
 
 # ---- ENUMS para Modos e Algoritmos ----
 # Enums são usados para criar conjuntos de constantes nomeadas, tornando o código mais legível.
@@ -16,6 +44,7 @@ class DrawMode(Enum):
     FREEHAND = 5
     CUT = 6 
     CROP = 7
+    FILL = 8
 
 class TransformMode(Enum):
     """Define os tipos de transformações geométricas 2D."""
@@ -34,51 +63,117 @@ class LineAlgorithm(Enum):
 # --- Classe para Formas Geométricas ---
 class Shape:
     """Representa uma forma geométrica desenhada no canvas."""
-    def __init__(self, shape_type, points, color=(0, 0, 0), thickness=2):
+    LOD_MIN_POINTS = 64  # Polígonos a partir deste tamanho também ganham níveis de detalhe
+    uids = itertools.count(1)  # Identificadores das formas (referência do diário de alterações)
+
+    def __init__(self, shape_type, points, color=(0, 0, 0), thickness=2, parts=None):
+        self.uid = next(Shape.uids)  # Identificador estável da forma
+        self.version = 0  # Incrementada a cada troca dos pontos (o array é trocado, nunca alterado no lugar)
         self.type = shape_type  # Tipo da forma (ex: 'line', 'circle')
         self.points = np.array(points, dtype=float)  # Pontos que definem a forma, usando numpy para operações vetoriais
         self.color = color  # Cor da forma
         self.thickness = thickness  # Espessura da linha/ponto
-        self.selected = False  # Flag para indicar se a forma está selecionada
+        self.selected = False  # Se a forma está selecionada (mantido pelo SelectionSet do aplicativo)
+        self.filled = False  # Preenchimento por linhas de varredura (polígonos, círculos e elipses)
+        self.fill_rule = EVEN_ODD  # Regra de preenchimento: par-ímpar ou não-zero
+        self.patch = None  # RasterPatch das formas 'fill' (balde de tinta)
+        self.parts = None if parts is None else np.asarray(parts, dtype=int)  # Offsets [0, ..., N] das partes de uma 'polyline'
+        self.visible_edges = None  # Arestas desenhadas de um 'polygon' recortado (aresta i: vértice i → i+1; None = todas)
+        self._lod, self._lod_version = None, None  # Pirâmide de níveis de detalhe, criada sob demanda
+        self._geometry = None  # ShapeGeometry da versão atual dos pontos, criada sob demanda
+
+    @property
+    def points(self): return self._points
+
+    @points.setter
+    def points(self, value): self._points = value; self.version += 1
+
+    @property
+    def geometry(self):
+        """Caixa, centroide e número de vértices, refeitos só quando os pontos (ou o tipo) mudam."""
+        geometry = self._geometry
+        if geometry is None or geometry.version != self.version or geometry.type != self.type:
+            geometry = self._geometry = ShapeGeometry(self.type, self._points, self.version)
+        return geometry
+
+    def lod_points(self, tolerance):
+        """Pontos simplificados com erro de até `tolerance` (unidades do mundo), ou os originais."""
+        if self.type != 'freehand' and (self.type != 'polygon' or len(self._points) < self.LOD_MIN_POINTS): return self._points
+        if self.visible_edges is not None: return self._points  # A simplificação não acompanha as arestas escondidas
+        if tolerance < LodPyramid.BASE: return self._points  # Zoom alto: nenhum nível serve, nem monta a pirâmide
+        if self._lod_version != self.version:
+            if self._lod is None: self._lod = LodPyramid(self._points, closed=self.type == 'polygon')
+            else: self._lod.update(self._points)
+            self._lod_version = self.version
+        level = self._lod.select(tolerance)
+        return self._points if level is None else level
+
+    def part_points(self):
+        """Pontos de cada parte de uma 'polyline' (as outras formas têm uma parte só)."""
+        if self.parts is None: return [self._points]
+        return np.split(self._points, self.parts[1:-1])
+
+    def lod_parts(self, tolerance):
+        """Partes de uma 'polyline' simplificadas com erro de até `tolerance` (uma pirâmide por parte)."""
+        parts = self.part_points()
+        if tolerance < LodPyramid.BASE: return parts
+        if self._lod_version != self.version:
+            if self._lod is None or len(self._lod) != len(parts): self._lod = [LodPyramid(p) for p in parts]
+            else:
+                for lod, p in zip(self._lod, parts): lod.update(p)
+            self._lod_version = self.version
+        levels = [lod.select(tolerance) for lod in self._lod]
+        return [p if level is None else level for p, level in zip(parts, levels)]
 
 # --- Classe da Roda de Cores ---
 class ColorWheel:
     """Cria e gerencia uma roda de cores interativa para seleção de cor."""
-    def __init__(self, center, radius):
+    def __init__(self, center, radius, background=False):
         self.center = center
         self.radius = radius
         # A roda de cores é pré-renderizada em uma Surface para otimização
-        self.wheel_surface = pygame.Surface((radius * 2, radius * 2), pygame.SRCALPHA)
-        self.create_wheel()
+        self.wheel_surface = None
+        self.wheel_colors = self.wheel_mask = None  # Indexados por [x, y], como o surfarray
+        self.loader = None
+        if background:
+            # O campo de cores é calculado em segundo plano; a Surface nasce no primeiro uso
+            self.loader = threading.Thread(target=self.load_field, daemon=True); self.loader.start()
+        else:
+            self.create_wheel()
+
+    def load_field(self):
+        """Calcula (ou lê do cache em disco) o campo HSV da roda."""
+        self.wheel_colors, self.wheel_mask = load_color_wheel(self.radius)
+
+    def ensure_ready(self):
+        """Garante que a Surface da roda exista (espera o carregamento em segundo plano)."""
+        if self.wheel_surface is None: self.create_wheel()
 
     def create_wheel(self):
-        """Desenha a roda de cores pixel por pixel, baseada no sistema de cores HSV."""
-        for x in range(self.radius * 2):
-            for y in range(self.radius * 2):
-                dx, dy = x - self.radius, y - self.radius
-                distance = math.sqrt(dx**2 + dy**2)
-                if distance <= self.radius:
-                    angle = math.atan2(dy, dx)  # Calcula o ângulo (Hue)
-                    hue = (angle + math.pi) / (2 * math.pi)
-                    saturation = distance / self.radius  # Saturação baseada na distância do centro
-                    rgb = colorsys.hsv_to_rgb(hue, saturation, 1.0)  # Converte HSV para RGB
-                    color = tuple(int(c * 255) for c in rgb)
-                    self.wheel_surface.set_at((x, y), color)
+        """Gera a roda de cores (HSV) de uma vez com NumPy e copia para a Surface via surfarray."""
+        if self.loader is not None: self.loader.join(); self.loader = None
+        if self.wheel_colors is None: self.load_field()
+        size = self.radius * 2
+        self.wheel_surface = pygame.Surface((size, size), pygame.SRCALPHA)
+        rgb = pygame.surfarray.pixels3d(self.wheel_surface)
+        rgb[:] = self.wheel_colors[:size, :size]
+        del rgb  # Libera o lock da Surface
+        alpha = pygame.surfarray.pixels_alpha(self.wheel_surface)
+        alpha[:] = self.wheel_mask[:size, :size] * 255
+        del alpha
 
     def get_color_at_pos(self, pos):
         """Retorna a cor na posição do clique do mouse, se estiver dentro da roda."""
-        dx, dy = pos[0] - self.center[0], pos[1] - self.center[1]
-        distance = math.sqrt(dx**2 + dy**2)
-        if distance <= self.radius:
-            angle = math.atan2(dy, dx)
-            hue = (angle + math.pi) / (2 * math.pi)
-            saturation = distance / self.radius
-            rgb = colorsys.hsv_to_rgb(hue, saturation, 1.0)
-            return tuple(int(c * 255) for c in rgb)
+        self.ensure_ready()
+        x = int(round(pos[0] - self.center[0])) + self.radius
+        y = int(round(pos[1] - self.center[1])) + self.radius
+        if 0 <= x <= 2 * self.radius and 0 <= y <= 2 * self.radius and self.wheel_mask[x, y]:
+            return tuple(int(c) for c in self.wheel_colors[x, y])
         return None
 
     def draw(self, screen):
         """Desenha a roda de cores pré-renderizada na tela."""
+        self.ensure_ready()
         screen.blit(self.wheel_surface, (self.center[0] - self.radius, self.center[1] - self.radius))
         pygame.draw.circle(screen, (100, 100, 100), self.center, self.radius, 2)
 
@@ -87,10 +182,12 @@ class PaintCG:
     """Classe principal que gerencia toda a lógica do programa, UI e interações."""
     def __init__(self):
         """Inicializa o Pygame, a janela e todas as variáveis de estado do programa."""
+        self.startup = StartupTimer(STARTUP_T0)
         pygame.init()
         self.width, self.height = 1300, 900
         self.screen = pygame.display.set_mode((self.width, self.height), pygame.RESIZABLE)
         pygame.display.set_caption("Paint Pro - Computação Gráfica")
+        self.startup.mark('janela')
 
         # Paleta de Cores para a interface
         self.WHITE = (255, 255, 255)
@@ -108,6 +205,7 @@ class PaintCG:
         
         # Variáveis de estado do programa
         self.shapes = []  # Lista principal de todas as formas desenhadas
+        self.selection = SelectionSet()  # Formas selecionadas (mantém o `selected` de cada uma), com centroide e caixa
         self.current_polygon = []  # Pontos do polígono em construção
         self.temp_points = []  # Pontos temporários para pré-visualização de desenhos
         self.draw_mode = DrawMode.SELECT  # Modo de desenho atual
@@ -115,10 +213,9 @@ class PaintCG:
         self.line_algorithm = LineAlgorithm.BRESENHAM  # Algoritmo de rasterização atual
         
         # Configurações da Interface (UI)
-        self.font_title = pygame.font.Font(None, 28)
-        self.font_button = pygame.font.Font(None, 20)
-        self.font_small = pygame.font.Font(None, 18)
-        self.font_tiny = pygame.font.Font(None, 15)
+        # Fontes e roda de cores só são carregadas depois do primeiro quadro (load_ui_assets)
+        self.ui_ready = False
+        self.font_title = self.font_button = self.font_small = self.font_tiny = None
         self.panel_width = 320  # Largura do painel de ferramentas
         self.update_draw_area()
         self.ui_elements = {}  # Dicionário para armazenar as áreas clicáveis da UI
@@ -126,6 +223,7 @@ class PaintCG:
         # Variáveis de interação do usuário
         self.mouse_pressed = False
         self.action_in_progress = False  # Indica se uma ação de desenho (arrastar) está ocorrendo
+        self.canvas_snapshot = None  # Cópia do canvas renderizado, lida pelo balde de tinta
         self.drag_start_pos = None  # Posição inicial do clique do mouse para arrastar
 
         # Variáveis de controle de transformação
@@ -145,14 +243,49 @@ class PaintCG:
         self.pan_offset = np.array([0.0, 0.0])
         self.panning = False  # Indica se o usuário está arrastando o canvas (pan)
         
-        self.color_wheel = ColorWheel((100, 110), 60)
+        self.color_wheel = ColorWheel((100, 110), 60, background=True)
         self.clock = pygame.time.Clock()
+        self.hit_tolerance = 6  # Tolerância do clique de seleção, em pixels de tela
+        self.lod_error = 0.5  # Erro máximo da simplificação de traços longos, em pixels de tela
+        self.max_chord_error = 0.25  # Afastamento máximo entre curva e corda no corte/crop, em pixels de tela
+
+        # Contadores de desempenho por quadro (F3 mostra no canvas)
+        self.stats = RenderStats()
+        self.show_stats = False
+        self.text = TextCache(stats=self.stats)  # Cache LRU de textos renderizados
+        self.scheduler = FrameScheduler(self.clock, 60, stats=self.stats)  # Espera eventos quando parado
+        self.raster_pool = RasterPool()  # Threads da rasterização (PAINTCG_RASTER_WORKERS; 1 = sem threads)
+        self.backends = BackendSelector.from_env(stamp=disc_stamp)  # PAINTCG_BACKEND / PAINTCG_BACKEND_ZOOM; F4 troca
+        self.backend = self.backends.select(self.zoom_factor)  # Kernels usados no quadro atual
+        self.autosave = Autosaver(stats=self.stats, app='tp1_alt')  # Autosave em segundo plano (PAINTCG_AUTOSAVE_INTERVAL / _KEEP)
+        self.journal = self.autosave.journal  # Diário das alterações entre dois autosaves
+        self.recorder = EventRecorder.from_env('Tp1_alt', self.screen.get_size())  # PAINTCG_RECORD=arquivo grava a sessão
 
         # Variáveis para a barra de rolagem do painel
         self.panel_scroll_y = 0
         self.panel_content_height = self.height 
         self.dragging_scrollbar = False
         self.scrollbar_grabber_offset_y = 0
+        self.startup.mark('estado')
+
+    def load_ui_assets(self):
+        """Carrega fontes e a roda de cores (chamado logo após o primeiro quadro)."""
+        if self.ui_ready: return
+        self.font_title = self.text.font(28)
+        self.font_button = self.text.font(20)
+        self.font_small = self.text.font(18)
+        self.font_tiny = self.text.font(15)
+        self.color_wheel.ensure_ready()
+        # Painel pré-renderizado numa Surface alta, rolada com panel_scroll_y (ver draw_ui)
+        self.panel_cache = PanelCache((self.panel_width, self.height), self.LIGHT_GRAY, self.stats)
+        self.ui_ready = True
+
+    def finish_startup(self):
+        """Marca o primeiro quadro, completa a interface e publica o relatório de inicialização."""
+        self.startup.mark('primeiro_quadro')
+        self.load_ui_assets()
+        self.startup.mark('interface')
+        self.startup.publish()
 
     def update_draw_area(self):
         """Atualiza as dimensões da área de desenho quando a janela é redimensionada."""
@@ -172,265 +305,318 @@ class PaintCG:
 
     # --- Algoritmos de Rasterização ---
     def rasterize_line_dda(self, p1, p2):
-        """Implementação do algoritmo DDA para desenhar uma linha."""
-        x1, y1 = p1; x2, y2 = p2
-        dx, dy = x2 - x1, y2 - y1
-        steps = max(abs(dx), abs(dy))
-        if steps == 0: return [(int(x1), int(y1))]
-        x_inc, y_inc = dx / steps, dy / steps
-        x, y = float(x1), float(y1)
-        points = []
-        for _ in range(int(steps) + 1):
-            points.append((round(x), round(y))); x += x_inc; y += y_inc
+        """Algoritmo DDA para desenhar uma linha, pelo kernel de reta do backend do quadro (array (N, 2))."""
+        points = self.backend.line(p1[0], p1[1], p2[0], p2[1], 'dda')
+        self.stats.add('pixels_dda', len(points))
         return points
 
     def rasterize_line_bresenham(self, p1, p2):
-        """Implementação do algoritmo de Bresenham para desenhar uma linha."""
-        x1, y1 = int(p1[0]), int(p1[1]); x2, y2 = int(p2[0]), int(p2[1])
-        points = []
-        dx, dy = abs(x2 - x1), abs(y2 - y1)
-        sx = 1 if x1 < x2 else -1; sy = 1 if y1 < y2 else -1
-        err = dx - dy
-        while True:
-            points.append((x1, y1))
-            if x1 == x2 and y1 == y2: break
-            e2 = 2 * err
-            if e2 > -dy: err -= dy; x1 += sx
-            if e2 < dx: err += dx; y1 += sy
+        """Algoritmo de Bresenham para desenhar uma linha, pelo kernel de reta do backend do quadro (array (N, 2))."""
+        points = self.backend.line(p1[0], p1[1], p2[0], p2[1], 'bresenham')
+        self.stats.add('pixels_bresenham', len(points))
         return points
 
     def rasterize_circle_bresenham(self, center, radius):
-        """Implementação do algoritmo de Bresenham para desenhar um círculo."""
-        cx, cy = int(center[0]), int(center[1]); radius = int(radius)
-        points = []; x, y = 0, radius; d = 3 - 2 * radius
-        while y >= x:
-            points.extend([(cx+x,cy+y),(cx-x,cy+y),(cx+x,cy-y),(cx-x,cy-y),(cx+y,cy+x),(cx-y,cy+x),(cx+y,cy-x),(cx-y,cy-x)])
-            x += 1
-            if d > 0: y -= 1; d += 4 * (x - y) + 10
-            else: d += 4 * x + 6
+        """Algoritmo de Bresenham para círculos, pelo kernel de círculo do backend do quadro (array (N, 2))."""
+        points = self.backend.circle(int(center[0]), int(center[1]), int(radius))
+        self.stats.add('pixels_circle', len(points))
+        return points
+
+    def rasterize_ellipse(self, center, axis_u, axis_v):
+        """Contorno da elipse de semieixos conjugados pela equação implícita, linha a linha e coluna a coluna."""
+        points = ellipse_points(center, axis_u, axis_v)
+        self.stats.add('pixels_circle', len(points))
         return points
 
     # --- Algoritmos de Recorte/Corte ---
-    def liang_barsky_clip_params(self, p1, p2, rect):
-        """Algoritmo de Liang-Barsky: calcula os parâmetros u1 e u2 para o clipe de linha."""
-        x1, y1 = p1; x2, y2 = p2
-        xmin, ymin, xmax, ymax = rect.left, rect.top, rect.right, rect.bottom
-        dx, dy = x2 - x1, y2 - y1
-        p = [-dx, dx, -dy, dy]; q = [x1 - xmin, xmax - x1, y1 - ymin, ymax - y1]
-        u1, u2 = 0.0, 1.0
-        for i in range(4):
-            if abs(p[i]) < 1e-6: # Linha paralela a uma borda do retângulo
-                if q[i] < 0: return None # Paralela e fora
-            else:
-                t = q[i] / p[i]
-                if p[i] < 0: u1 = max(u1, t)
-                else: u2 = min(u2, t)
-        if u1 > u2: return None # Linha completamente fora
-        return u1, u2
-
-    def split_line_with_rect(self, p1, p2, rect):
-        """Usa Liang-Barsky para dividir uma linha, retornando os segmentos que estão FORA do retângulo."""
-        params = self.liang_barsky_clip_params(p1, p2, rect)
-        if params is None: return [np.array([p1, p2])] # Totalmente fora
-        u1, u2 = params
-        if u1 <= 0.0001 and u2 >= 0.9999: return [] # Totalmente dentro
-        segments = []; delta = p2 - p1
-        if u1 > 0.0001: segments.append(np.array([p1, p1 + u1 * delta])) # Segmento antes da entrada
-        if u2 < 0.9999: segments.append(np.array([p1 + u2 * delta, p2])) # Segmento depois da saída
-        return segments
-
-    def clip_line_to_rect(self, p1, p2, rect):
-        """Usa Liang-Barsky para retornar apenas o segmento de linha que está DENTRO do retângulo."""
-        params = self.liang_barsky_clip_params(p1, p2, rect)
-        if params is None: return None
-        u1, u2 = params
-        delta = p2 - p1
-        new_p1 = p1 + u1 * delta
-        new_p2 = p1 + u2 * delta
-        return np.array([new_p1, new_p2])
+    def clip_window(self, rect_world):
+        """Janela de corte/recorte do retângulo arrastado: o próprio retângulo ou, no modo ROTATE, o retângulo girado.
+
+        Girado pelo ângulo de rotação em torno do centro, vira um polígono convexo (4, 2) em coordenadas do mundo.
+        """
+        if self.transform_mode != TransformMode.ROTATE or self.rotation_angle % 360 == 0: return rect_world
+        corners = (rect_world.topleft, rect_world.topright, rect_world.bottomright, rect_world.bottomleft)
+        return apply_matrix(corners, rotation_matrix(self.rotation_angle, *rect_world.center))
+
+    @staticmethod
+    def window_geometry(window):
+        """Janela no formato de cgcore.clip: (esquerda, topo, direita, base) de um pygame.Rect, ou o polígono como está."""
+        if isinstance(window, pygame.Rect): return (window.left, window.top, window.right, window.bottom)
+        return window
+
+    @staticmethod
+    def window_contains(window, point):
+        if isinstance(window, pygame.Rect): return window.collidepoint(point)
+        return bool(points_in_window(point, window)[0])
+
+    def clip_shape(self, shape, window, inside):
+        """Contorno da forma fora (corte) ou dentro (recorte) da janela, como uma 'polyline' de vários trechos.
+
+        Devolve a própria forma se nenhuma aresta perdeu pedaço, e None se nada sobrou.
+        """
+        points, parts, closed = self.shape_outline(shape)
+        # Liang-Barsky (retângulo) ou Cyrus-Beck (janela girada) em todas as arestas
+        result, classes = clip_polyline(points, self.window_geometry(window), parts, closed, inside, shape.visible_edges)
+        for name, count in zip(EDGE_COUNTERS, np.bincount(classes, minlength=3).tolist()): self.stats.add(name, count)
+        if result is None: return shape
+        vertices, offsets = result
+        return Shape('polyline', vertices, shape.color, shape.thickness, parts=offsets) if len(vertices) else None
+
+    def crop_closed_shape(self, shape, window):
+        """Recorte de polígono, círculo ou elipse por Sutherland-Hodgman: continua um único polígono, com o mesmo preenchimento.
+
+        As arestas novas, sobre a borda do recorte, ficam sem contorno. Devolve a própria forma se
+        ela está inteira dentro, e None se nada sobrou.
+        """
+        points, _, _ = self.shape_outline(shape)
+        result, classes = sutherland_hodgman(points, self.window_geometry(window), shape.visible_edges)
+        for name, count in zip(EDGE_COUNTERS, np.bincount(classes, minlength=3).tolist()): self.stats.add(name, count)
+        if result is None: return shape
+        vertices, visible = result
+        if len(vertices) < 3: return None
+        cropped = Shape('polygon', vertices, shape.color, shape.thickness)
+        cropped.filled, cropped.fill_rule = shape.filled, shape.fill_rule
+        cropped.visible_edges = None if visible.all() else visible
+        return cropped
+
+    def clip_fill(self, shape, window, inside):
+        """Balde de tinta cortado (fora) ou recortado (dentro da janela): a máscara fica só com as células do lado pedido.
+
+        Devolve a própria forma se nenhuma célula saiu, e None se nada sobrou.
+        """
+        result = clip_mask(shape.patch.mask, shape.points[0], shape.points[1], self.window_geometry(window), inside)
+        if result is None: return None
+        mask, p0, p1 = result
+        if mask is shape.patch.mask: return shape
+        clipped = Shape('fill', [p0, p1], shape.color, shape.thickness)
+        clipped.patch = RasterPatch(mask)
+        return clipped
+
+    def cut_filled_shape(self, shape, window):
+        """Corte de polígono, círculo ou elipse preenchidos: o contorno que sobra fora da janela e o preenchimento furado.
+
+        O preenchimento vira um polígono sem contorno: o anel da forma e, no sentido contrário, a parte dela dentro da
+        janela (Sutherland-Hodgman), ligados por uma ponte de ida e volta que se anula nas duas regras de preenchimento.
+        O anel leva as interseções com as bordas (`split_at_window`), para que as arestas do recorte que vêm da forma se
+        anulem com as dele mesmo depois do arredondamento para a tela. Devolve a lista de formas que ficam (a própria
+        forma, se a janela não toca o preenchimento).
+        """
+        outline = self.clip_shape(shape, window, inside=False)
+        points, _, _ = self.shape_outline(shape)
+        window = self.window_geometry(window)
+        result, classes = sutherland_hodgman(points, window)
+        for name, count in zip(EDGE_COUNTERS, np.bincount(classes, minlength=3).tolist()): self.stats.add(name, count)
+        if result is None: return []  # Inteira dentro da janela
+        inner = result[0]
+        if len(inner) < 3: return [] if outline is None else [outline]
+        if outline is shape:  # Contorno intocado (janela dentro do preenchimento): segue sem o preenchimento
+            outline = Shape(shape.type, shape.points, shape.color, shape.thickness)
+            outline.visible_edges = shape.visible_edges
+        points = split_at_window(points, window)
+        ring = np.vstack([points, points[:1], inner[:1], inner[:0:-1], inner[:1]])  # ... p0 → q0 → q(m-1) ... q1 → q0 → p0
+        fill = Shape('polygon', ring, shape.color, shape.thickness)
+        fill.filled, fill.fill_rule = True, shape.fill_rule
+        fill.visible_edges = np.zeros(len(ring), dtype=bool)
+        return [fill] if outline is None else [fill, outline]
 
     # --- Funções de Transformação ---
     def get_transform_matrix(self, shape_centroid):
-        """Cria a matriz de transformação 2D homogênea (3x3) apropriada."""
+        """Cria a matriz de transformação 2D homogênea (3x3) apropriada, em torno do centroide."""
         cx, cy = shape_centroid
         sx = sy = self.transform_factor
-        angle_rad = math.radians(self.rotation_angle)
-        cos_a, sin_a = math.cos(angle_rad), math.sin(angle_rad)
-        
-        # Matrizes para transladar o objeto para a origem e de volta
-        to_origin = np.array([[1, 0, -cx], [0, 1, -cy], [0, 0, 1]])
-        from_origin = np.array([[1, 0, cx], [0, 1, cy], [0, 0, 1]])
-        
-        # Aplica a transformação correta (rotação, escala, reflexão) na origem
-        if self.transform_mode == TransformMode.ROTATE:
-            rot = np.array([[cos_a, -sin_a, 0], [sin_a, cos_a, 0], [0, 0, 1]])
-            return from_origin @ rot @ to_origin
-        if self.transform_mode == TransformMode.SCALE:
-            scale = np.array([[sx, 0, 0], [0, sy, 0], [0, 0, 1]])
-            return from_origin @ scale @ to_origin
-        reflect_map = {
-            TransformMode.REFLECT_X: np.array([[1, 0, 0], [0, -1, 0], [0, 0, 1]]),
-            TransformMode.REFLECT_Y: np.array([[-1, 0, 0], [0, 1, 0], [0, 0, 1]]),
-            TransformMode.REFLECT_XY: np.array([[-1, 0, 0], [0, -1, 0], [0, 0, 1]])
-        }
-        if self.transform_mode in reflect_map:
-            return from_origin @ reflect_map[self.transform_mode] @ to_origin
+        if pygame.key.get_mods() & pygame.KMOD_SHIFT: sy = 1  # Shift + Enter escala só no eixo X
+        if self.transform_mode == TransformMode.ROTATE: return rotation_matrix(self.rotation_angle, cx, cy)
+        if self.transform_mode == TransformMode.SCALE: return scale_matrix(sx, sy, cx, cy)
+        reflect_axes = {TransformMode.REFLECT_X: REFLECT_X, TransformMode.REFLECT_Y: REFLECT_Y, TransformMode.REFLECT_XY: REFLECT_XY}
+        if self.transform_mode in reflect_axes: return reflection_matrix(reflect_axes[self.transform_mode], cx, cy)
         return np.identity(3) # Retorna matriz identidade se nenhuma transformação se aplicar
 
     def apply_matrix_to_points(self, points, matrix):
         """Aplica uma matriz de transformação a um conjunto de pontos."""
-        # Converte para coordenadas homogêneas (x, y, 1) para multiplicação da matriz
-        points_h = np.hstack([points, np.ones((points.shape[0], 1))])
-        transformed_h = (matrix @ points_h.T).T
-        return transformed_h[:, :2] # Converte de volta para coordenadas 2D
+        return apply_matrix(points, matrix)
 
     # --- Lógica de UI ---
     def draw_ui(self):
         """Desenha todo o painel de ferramentas e seus componentes."""
-        self.ui_elements.clear()
-        
         # Define uma área de clip para que o conteúdo do painel não vaze para o canvas
         panel_content_clip_rect = pygame.Rect(0, 0, self.panel_width, self.height)
         pygame.draw.rect(self.screen, self.LIGHT_GRAY, panel_content_clip_rect)
-        self.screen.set_clip(panel_content_clip_rect)
+        if not self.ui_ready: return  # Primeiro quadro: só o fundo do painel
 
-        # y_offset leva em conta a rolagem do painel
-        y_offset = -self.panel_scroll_y
+        # O painel inteiro vive numa Surface alta (coordenadas de conteúdo, sem rolagem);
+        # a cada quadro só as seções cujo estado mudou são redesenhadas nela
+        sections = self.build_panel_sections()
+        if self.panel_cache.surface.get_height() != self.panel_content_height:
+            self.panel_cache.resize((self.panel_width, self.panel_content_height))
+        self.panel_cache.update(sections)
+        self.panel_cache.blit(self.screen, (0, 0), self.panel_scroll_y, self.height)
+
+        # Linha divisória
+        pygame.draw.line(self.screen, self.DARK_GRAY, (self.panel_width - 2, 0), (self.panel_width - 2, self.height), 2)
         
+        # Desenha a barra de rolagem se necessário
+        if self.panel_content_height > self.height:
+            self.draw_scrollbar()
+
+    def build_panel_sections(self):
+        """Monta o layout do painel: lista de seções com a chave do estado exibido por cada uma."""
+        w = self.panel_width
+        blink = pygame.time.get_ticks() % 1000 < 500
+        sections = []
         y = 20
         # Título
-        title = self.font_title.render("Paint PRO", True, self.DARK_BLUE)
-        self.screen.blit(title, (20, y + y_offset))
-        pygame.draw.line(self.screen, self.DARK_BLUE, (20, y + 25 + y_offset), (self.panel_width - 20, y + 25 + y_offset), 1)
+        sections.append(PanelSection('titulo', (0, 0, w, y + 30), None, lambda s, y=y: self.draw_title(s, y)))
         y += 40
 
         # Seção de Cor
-        self.screen.blit(self.font_button.render("Cor:", True, self.DARK_GRAY), (20, y + y_offset))
-        self.color_wheel.center = (100, y + 70 + y_offset)
-        self.color_wheel.draw(self.screen)
-        pygame.draw.rect(self.screen, self.current_draw_color, (180, y + 50 + y_offset, 40, 40), border_radius=8)
-        pygame.draw.rect(self.screen, self.DARK_GRAY, (180, y + 50 + y_offset, 40, 40), 2, border_radius=8)
+        self.color_wheel.center = (100, y + 70)
+        sections.append(PanelSection('cor', (0, y - 5, w, 140), self.current_draw_color, lambda s, y=y: self.draw_color_section(s, y)))
         y += 140
 
         # Seção de Espessura
-        self.screen.blit(self.font_button.render("Espessura:", True, self.DARK_GRAY), (20, y + y_offset))
-        self.ui_elements['thickness_dec'] = self.draw_plus_minus_button(125, y, "-", self.RED, y_offset)
-        self.ui_elements['thickness_inc'] = self.draw_plus_minus_button(125, y - 13, "+", self.GREEN, y_offset)
-        self.ui_elements['thickness_input'] = self.draw_text_input(150, y-5, 80, self.thickness_input_text, self.brush_thickness, self.thickness_input_active, y_offset)
+        thickness_key = (self.brush_thickness, self.thickness_input_active, self.thickness_input_text, self.thickness_input_active and blink)
+        sections.append(PanelSection('espessura', (0, y - 15, w, 40), thickness_key, lambda s, y=y: self.draw_thickness_section(s, y)))
         y += 40
         
         # Seções de Botões (Ferramentas, Transformações, etc.)
-        y = self.draw_button_section("Ferramentas:", DrawMode, self.draw_mode, y, {DrawMode.SELECT: self.ACCENT, DrawMode.POINT: self.BLUE, DrawMode.LINE: self.GREEN, DrawMode.CIRCLE: self.RED, DrawMode.POLYGON: self.PURPLE, DrawMode.FREEHAND: self.ORANGE, DrawMode.CUT: self.DARK_GRAY, DrawMode.CROP: self.ORANGE}, y_offset)
-        y = self.draw_button_section("Transformações:", TransformMode, self.transform_mode, y, {TransformMode.TRANSLATE: self.BLUE, TransformMode.ROTATE: self.GREEN, TransformMode.SCALE: self.ORANGE, TransformMode.REFLECT_X: self.RED, TransformMode.REFLECT_Y: self.PURPLE, TransformMode.REFLECT_XY: self.ACCENT}, y_offset)
-        y = self.draw_button_section("Rasterização:", LineAlgorithm, self.line_algorithm, y, {LineAlgorithm.BRESENHAM: self.BLUE, LineAlgorithm.DDA: self.GREEN}, y_offset)
+        button_sections = [
+            ('ferramentas', "Ferramentas:", DrawMode, self.draw_mode, {DrawMode.SELECT: self.ACCENT, DrawMode.POINT: self.BLUE, DrawMode.LINE: self.GREEN, DrawMode.CIRCLE: self.RED, DrawMode.POLYGON: self.PURPLE, DrawMode.FREEHAND: self.ORANGE, DrawMode.CUT: self.DARK_GRAY, DrawMode.CROP: self.ORANGE, DrawMode.FILL: self.DARK_BLUE}),
+            ('transformacoes', "Transformações:", TransformMode, self.transform_mode, {TransformMode.TRANSLATE: self.BLUE, TransformMode.ROTATE: self.GREEN, TransformMode.SCALE: self.ORANGE, TransformMode.REFLECT_X: self.RED, TransformMode.REFLECT_Y: self.PURPLE, TransformMode.REFLECT_XY: self.ACCENT}),
+            ('rasterizacao', "Rasterização:", LineAlgorithm, self.line_algorithm, {LineAlgorithm.BRESENHAM: self.BLUE, LineAlgorithm.DDA: self.GREEN}),
+        ]
+        for name, title, enum_class, active_mode, colors in button_sections:
+            height = 25 + 35 * len(enum_class) + 5
+            draw = lambda s, y=y, t=title, e=enum_class, c=colors: self.draw_button_section(s, t, e, y, c)
+            sections.append(PanelSection(name, (0, y - 2, w, height + 2), active_mode, draw))
+            y += height
 
         # Seção de Controles de Transformação
-        y = self.draw_controls_section(y, y_offset)
+        controls_key = (self.transform_mode, int(self.rotation_angle), round(self.transform_factor, 2),
+                        self.rotation_input_active, self.rotation_input_text, self.rotation_input_active and blink)
+        sections.append(PanelSection('controles', (0, y, w, 145), controls_key, lambda s, y=y: self.draw_controls_section(s, y)))
         y += 150
 
         # Seção de Zoom
-        self.screen.blit(self.font_button.render("Zoom da Tela:", True, self.DARK_GRAY), (20, y + y_offset))
-        self.ui_elements['zoom_out'] = self.draw_zoom_button(20, y+25, "−", self.RED, y_offset)
-        self.ui_elements['zoom_reset'] = self.draw_zoom_button(90, y+25, "1:1", self.BLUE, y_offset)
-        self.ui_elements['zoom_in'] = self.draw_zoom_button(160, y+25, "+", self.GREEN, y_offset)
-        self.screen.blit(self.font_small.render(f"Zoom: {self.zoom_factor:.1f}x", True, self.DARK_GRAY), (230, y + 32 + y_offset))
+        sections.append(PanelSection('zoom', (0, y - 5, w, 62), f"{self.zoom_factor:.1f}", lambda s, y=y: self.draw_zoom_section(s, y)))
         y += 65
 
         # Texto de atalhos no rodapé
-        #self.screen.blit(self.font_tiny.render("Atalhos: C (Limpar) - Esc (Finalizar)", True, self.DARK_BLUE), (20, self.height - 25))
+        #self.screen.blit(self.text.render(self.font_tiny, "Atalhos: C (Limpar) - Esc (Finalizar)", self.DARK_BLUE), (20, self.height - 25))
         
         # Altura total do conteúdo do painel (para a barra de rolagem)
         self.panel_content_height = y
+        return sections
 
-        # Remove a área de clip
-        self.screen.set_clip(None)
+    # --- Funções auxiliares para desenhar componentes da UI ---
+    def draw_title(self, surface, y):
+        """Desenha o título do painel."""
+        title = self.text.render(self.font_title, "Paint PRO", self.DARK_BLUE)
+        surface.blit(title, (20, y))
+        pygame.draw.line(surface, self.DARK_BLUE, (20, y + 25), (self.panel_width - 20, y + 25), 1)
 
-        # Linha divisória
-        pygame.draw.line(self.screen, self.DARK_GRAY, (self.panel_width - 2, 0), (self.panel_width - 2, self.height), 2)
-        
-        # Desenha a barra de rolagem se necessário
-        if self.panel_content_height > self.height:
-            self.draw_scrollbar()
+    def draw_color_section(self, surface, y):
+        """Desenha a roda de cores e a amostra da cor atual."""
+        surface.blit(self.text.render(self.font_button, "Cor:", self.DARK_GRAY), (20, y))
+        self.color_wheel.draw(surface)
+        pygame.draw.rect(surface, self.current_draw_color, (180, y + 50, 40, 40), border_radius=8)
+        pygame.draw.rect(surface, self.DARK_GRAY, (180, y + 50, 40, 40), 2, border_radius=8)
 
-    # --- Funções auxiliares para desenhar componentes da UI ---
-    def draw_button_section(self, title, enum_class, active_mode, y_start, colors, y_offset):
+    def draw_thickness_section(self, surface, y):
+        """Desenha o controle de espessura."""
+        surface.blit(self.text.render(self.font_button, "Espessura:", self.DARK_GRAY), (20, y))
+        self.ui_elements['thickness_dec'] = self.draw_plus_minus_button(surface, 125, y, "-", self.RED)
+        self.ui_elements['thickness_inc'] = self.draw_plus_minus_button(surface, 125, y - 13, "+", self.GREEN)
+        self.ui_elements['thickness_input'] = self.draw_text_input(surface, 150, y-5, 80, self.thickness_input_text, self.brush_thickness, self.thickness_input_active)
+
+    def draw_zoom_section(self, surface, y):
+        """Desenha os controles de zoom."""
+        surface.blit(self.text.render(self.font_button, "Zoom da Tela:", self.DARK_GRAY), (20, y))
+        self.ui_elements['zoom_out'] = self.draw_zoom_button(surface, 20, y+25, "−", self.RED)
+        self.ui_elements['zoom_reset'] = self.draw_zoom_button(surface, 90, y+25, "1:1", self.BLUE)
+        self.ui_elements['zoom_in'] = self.draw_zoom_button(surface, 160, y+25, "+", self.GREEN)
+        surface.blit(self.text.render(self.font_small, f"Zoom: {self.zoom_factor:.1f}x", self.DARK_GRAY), (230, y + 32))
+
+    def draw_button_section(self, surface, title, enum_class, y_start, colors):
         """Desenha uma seção inteira de botões no painel."""
-        self.screen.blit(self.font_button.render(title, True, self.DARK_GRAY), (20, y_start + y_offset))
+        active_mode = {DrawMode: self.draw_mode, TransformMode: self.transform_mode, LineAlgorithm: self.line_algorithm}[enum_class]
+        surface.blit(self.text.render(self.font_button, title, self.DARK_GRAY), (20, y_start))
         y = y_start + 25
         for mode in enum_class:
             is_active = (mode == active_mode)
             color = colors.get(mode, self.BLUE)
-            self.ui_elements[mode] = self.draw_styled_button(y, mode.name.replace('_', ' '), color, is_active, y_offset)
+            self.ui_elements[mode] = self.draw_styled_button(surface, y, mode.name.replace('_', ' '), color, is_active)
             y += 35
         return y + 5
         
-    def draw_styled_button(self, y, text, color, is_active, y_offset):
+    def draw_styled_button(self, surface, y, text, color, is_active):
         """Desenha um botão estilizado individual."""
-        rect_visual = pygame.Rect(20, y + y_offset, self.panel_width - 40, 30)
+        rect = pygame.Rect(20, y, self.panel_width - 40, 30)
         btn_color = color if is_active else self.WHITE
         text_color = self.WHITE if is_active else color
-        pygame.draw.rect(self.screen, btn_color, rect_visual, border_radius=8)
-        pygame.draw.rect(self.screen, color, rect_visual, 2, border_radius=8)
-        text_surf = self.font_button.render(text, True, text_color)
-        self.screen.blit(text_surf, text_surf.get_rect(center=rect_visual.center))
-        return pygame.Rect(20, y, self.panel_width - 40, 30) # Retorna o retângulo de colisão (sem o offset de rolagem)
+        pygame.draw.rect(surface, btn_color, rect, border_radius=8)
+        pygame.draw.rect(surface, color, rect, 2, border_radius=8)
+        text_surf = self.text.render(self.font_button, text, text_color)
+        surface.blit(text_surf, text_surf.get_rect(center=rect.center))
+        return rect # Retorna o retângulo de colisão (coordenadas do conteúdo do painel)
         
-    def draw_plus_minus_button(self, x, y, text, color, y_offset):
+    def draw_plus_minus_button(self, surface, x, y, text, color):
         """Desenha os pequenos botões de '+' e '-'."""
-        rect_visual = pygame.Rect(x, y + y_offset, 20, 12)
-        pygame.draw.rect(self.screen, color, rect_visual, border_radius=3)
-        text_surf = pygame.font.Font(None, 16).render(text, True, self.WHITE)
-        self.screen.blit(text_surf, text_surf.get_rect(center=rect_visual.center))
-        return pygame.Rect(x, y, 20, 12)
+        rect = pygame.Rect(x, y, 20, 12)
+        pygame.draw.rect(surface, color, rect, border_radius=3)
+        text_surf = self.text.render(self.text.font(16), text, self.WHITE)
+        surface.blit(text_surf, text_surf.get_rect(center=rect.center))
+        return rect
 
-    def draw_text_input(self, x, y, w, text, value, is_active, y_offset):
+    def draw_text_input(self, surface, x, y, w, text, value, is_active):
         """Desenha um campo de entrada de texto."""
-        rect_visual = pygame.Rect(x, y + y_offset, w, 25)
+        rect = pygame.Rect(x, y, w, 25)
         input_color = self.ACCENT if is_active else self.WHITE
-        pygame.draw.rect(self.screen, input_color, rect_visual, border_radius=5)
-        pygame.draw.rect(self.screen, self.DARK_GRAY, rect_visual, 2, border_radius=5)
+        pygame.draw.rect(surface, input_color, rect, border_radius=5)
+        pygame.draw.rect(surface, self.DARK_GRAY, rect, 2, border_radius=5)
         display_text = text if is_active else str(value)
-        text_surf = self.font_small.render(display_text, True, self.BLACK)
-        self.screen.blit(text_surf, (rect_visual.x + 5, rect_visual.y + 5))
+        text_surf = self.text.render(self.font_small, display_text, self.BLACK)
+        surface.blit(text_surf, (rect.x + 5, rect.y + 5))
         # Desenha o cursor piscando se o campo estiver ativo
         if is_active and pygame.time.get_ticks() % 1000 < 500:
-            cursor_x = rect_visual.x + 5 + text_surf.get_width()
-            pygame.draw.line(self.screen, self.BLACK, (cursor_x, rect_visual.y + 3), (cursor_x, rect_visual.y + 22), 1)
-        return pygame.Rect(x, y, w, 25)
+            cursor_x = rect.x + 5 + text_surf.get_width()
+            pygame.draw.line(surface, self.BLACK, (cursor_x, rect.y + 3), (cursor_x, rect.y + 22), 1)
+        return rect
 
-    def draw_zoom_button(self, x, y, text, color, y_offset):
+    def draw_zoom_button(self, surface, x, y, text, color):
         """Desenha os botões da seção de zoom."""
-        rect_visual = pygame.Rect(x, y + y_offset, 60, 25)
-        pygame.draw.rect(self.screen, color, rect_visual, border_radius=5)
-        text_surf = self.font_small.render(text, True, self.WHITE)
-        self.screen.blit(text_surf, text_surf.get_rect(center=rect_visual.center))
-        return pygame.Rect(x, y, 60, 25)
+        rect = pygame.Rect(x, y, 60, 25)
+        pygame.draw.rect(surface, color, rect, border_radius=5)
+        text_surf = self.text.render(self.font_small, text, self.WHITE)
+        surface.blit(text_surf, text_surf.get_rect(center=rect.center))
+        return rect
         
-    def draw_controls_section(self, y, y_offset):
+    def draw_controls_section(self, surface, y):
         """Desenha a seção de 'Controles', que muda dependendo da transformação selecionada."""
-        control_bg_visual = pygame.Rect(15, y + y_offset, self.panel_width - 30, 140)
-        pygame.draw.rect(self.screen, self.WHITE, control_bg_visual, border_radius=12)
-        pygame.draw.rect(self.screen, self.DARK_BLUE, control_bg_visual, 2, border_radius=12)
-        self.screen.blit(self.font_button.render("Controles:", True, self.DARK_BLUE), (25, y + 10 + y_offset))
+        # Os campos da outra transformação deixam de ser clicáveis
+        for key in ('rotation_input', 'factor_dec', 'factor_inc'): self.ui_elements.pop(key, None)
+        control_bg = pygame.Rect(15, y, self.panel_width - 30, 140)
+        pygame.draw.rect(surface, self.WHITE, control_bg, border_radius=12)
+        pygame.draw.rect(surface, self.DARK_BLUE, control_bg, 2, border_radius=12)
+        surface.blit(self.text.render(self.font_button, "Controles:", self.DARK_BLUE), (25, y + 10))
         y_inner = y + 25
         if self.transform_mode == TransformMode.ROTATE:
             # Controles para Rotação
-            self.screen.blit(self.font_small.render("Ângulo:", True, self.DARK_GRAY), (25, y_inner + 15 + y_offset))
-            self.ui_elements['rotation_input'] = self.draw_text_input(100, y_inner + 10, 100, self.rotation_input_text, int(self.rotation_angle), self.rotation_input_active, y_offset)
-            self.screen.blit(self.font_tiny.render("Pressione Enter para aplicar", True, self.GRAY), (25, y_inner + 80 + y_offset))
+            surface.blit(self.text.render(self.font_small, "Ângulo:", self.DARK_GRAY), (25, y_inner + 15))
+            self.ui_elements['rotation_input'] = self.draw_text_input(surface, 100, y_inner + 10, 100, self.rotation_input_text, int(self.rotation_angle), self.rotation_input_active)
+            surface.blit(self.text.render(self.font_tiny, "Pressione Enter para aplicar", self.GRAY), (25, y_inner + 80))
         else:
             # Controles para Escala e outras transformações baseadas em fator
-            self.screen.blit(self.font_small.render(f"Fator: {self.transform_factor:.2f}", True, self.DARK_GRAY), (25, y_inner + 15 + y_offset))
-            progress_bg = pygame.Rect(25, y_inner + 40 + y_offset, 200, 12)
-            pygame.draw.rect(self.screen, self.LIGHT_GRAY, progress_bg, border_radius=6)
+            surface.blit(self.text.render(self.font_small, f"Fator: {self.transform_factor:.2f}", self.DARK_GRAY), (25, y_inner + 15))
+            progress_bg = pygame.Rect(25, y_inner + 40, 200, 12)
+            pygame.draw.rect(surface, self.LIGHT_GRAY, progress_bg, border_radius=6)
             progress = np.clip((self.transform_factor - 0.1) / 2.9, 0, 1)
-            progress_rect = pygame.Rect(25, y_inner + 40 + y_offset, int(progress * 200), 12)
+            progress_rect = pygame.Rect(25, y_inner + 40, int(progress * 200), 12)
             bar_color = self.RED if self.transform_factor < 1.0 else (self.GREEN if self.transform_factor > 1.0 else self.BLUE)
-            pygame.draw.rect(self.screen, bar_color, progress_rect, border_radius=6)
-            self.ui_elements['factor_dec'] = self.draw_plus_minus_button(240, y_inner + 40, "-", self.RED, y_offset)
-            self.ui_elements['factor_inc'] = self.draw_plus_minus_button(265, y_inner + 40, "+", self.GREEN, y_offset)
-            self.screen.blit(self.font_tiny.render("Use scroll no painel para ajustar", True, self.GRAY), (25, y_inner + 80 + y_offset))
-            self.screen.blit(self.font_tiny.render("Pressione Enter para aplicar", True, self.GRAY), (25, y_inner + 95 + y_offset))
+            pygame.draw.rect(surface, bar_color, progress_rect, border_radius=6)
+            self.ui_elements['factor_dec'] = self.draw_plus_minus_button(surface, 240, y_inner + 40, "-", self.RED)
+            self.ui_elements['factor_inc'] = self.draw_plus_minus_button(surface, 265, y_inner + 40, "+", self.GREEN)
+            surface.blit(self.text.render(self.font_tiny, "Use scroll no painel para ajustar", self.GRAY), (25, y_inner + 80))
+            surface.blit(self.text.render(self.font_tiny, "Pressione Enter para aplicar", self.GRAY), (25, y_inner + 95))
         return y
 
     def draw_scrollbar(self):
@@ -453,39 +639,9 @@ class PaintCG:
     def draw_canvas(self):
         """Desenha todas as formas e pré-visualizações na área de desenho (canvas)."""
         pygame.draw.rect(self.screen, self.WHITE, self.draw_area)
-        
-        # Desenha cada forma na lista
-        for shape in self.shapes:
-            color = shape.color
-            algo = self.rasterize_line_bresenham if self.line_algorithm == LineAlgorithm.BRESENHAM else self.rasterize_line_dda
-            
-            # Lógica de desenho específica para cada tipo de forma
-            if shape.type == 'point':
-                if self.draw_area.collidepoint(self.world_to_screen(shape.points[0])):
-                    pygame.draw.circle(self.screen, color, self.world_to_screen(shape.points[0]), shape.thickness + 2)
-            elif shape.type == 'line':
-                for p in algo(shape.points[0], shape.points[1]): self.draw_pixel_thick(self.world_to_screen(p), color, shape.thickness)
-            elif shape.type == 'circle':
-                radius = np.linalg.norm(shape.points[1] - shape.points[0])
-                for p in self.rasterize_circle_bresenham(shape.points[0], radius): self.draw_pixel_thick(self.world_to_screen(p), color, shape.thickness)
-            elif shape.type == 'polygon':
-                for i in range(len(shape.points)):
-                    for p in algo(shape.points[i], shape.points[(i+1)%len(shape.points)]): self.draw_pixel_thick(self.world_to_screen(p), color, shape.thickness)
-            elif shape.type == 'freehand':
-                for i in range(len(shape.points) - 1):
-                    for p in algo(shape.points[i], shape.points[i+1]): self.draw_pixel_thick(self.world_to_screen(p), color, shape.thickness)
-
-            # Desenha marcadores nos vértices se a forma estiver selecionada
-            if shape.selected:
-                points_to_mark = shape.points
-                if len(shape.points) > 20: # Otimização para não desenhar muitos pontos em desenhos livres
-                    step = len(shape.points) // 10
-                    points_to_mark = shape.points[::step]
-                
-                for point in points_to_mark:
-                    screen_pos = self.world_to_screen(point)
-                    if self.draw_area.collidepoint(screen_pos):
-                        pygame.draw.circle(self.screen, shape.color, screen_pos, 6)
+        self.draw_shapes()
+        # Guarda o canvas antes das pré-visualizações, para o balde não precisar re-renderizar
+        if self.draw_mode == DrawMode.FILL: self.canvas_snapshot = self.screen.subsurface(self.draw_area).copy()
         
         # Desenha pré-visualizações de formas em construção (arrastando o mouse)
         if self.action_in_progress and self.temp_points:
@@ -512,34 +668,225 @@ class PaintCG:
             preview_color = self.ACCENT
             if self.draw_mode == DrawMode.CUT: preview_color = self.RED
             elif self.draw_mode == DrawMode.CROP: preview_color = self.ORANGE
-            pygame.draw.rect(self.screen, preview_color, rect, 1)
+            window = self.clip_window(rect) if self.draw_mode != DrawMode.SELECT else rect
+            if isinstance(window, pygame.Rect): pygame.draw.rect(self.screen, preview_color, rect, 1)
+            else: pygame.draw.polygon(self.screen, preview_color, window.tolist(), 1)  # Janela girada
             
         # Borda da área de desenho
         pygame.draw.rect(self.screen, self.GRAY, self.draw_area, 1)
 
-    def draw_pixel_thick(self, pos, color, thickness):
-        """Desenha um 'pixel' com espessura, que pode ser um ponto ou um círculo."""
-        if not self.draw_area.collidepoint(pos): return
-        # A espessura visível é ajustada pelo zoom
-        r = int(thickness * self.zoom_factor / 2)
-        if r < 1:
-            # Se for muito pequeno, desenha um único pixel
-            if self.draw_area.collidepoint(pos): self.screen.set_at(pos, color)
-        else:
-            # Senão, desenha um círculo para simular a espessura
-            pygame.draw.circle(self.screen, color, pos, r)
+        if self.show_stats: self.draw_stats_overlay()
+
+    def draw_frame(self):
+        """Desenha um quadro completo: o canvas e, por cima, a interface."""
+        self.draw_canvas()
+        self.draw_ui()
+
+    def draw_shapes(self):
+        """Rasteriza todas as formas da lista no canvas, na ordem em que foram criadas."""
+        self.backend = self.backends.select(self.zoom_factor)  # Um backend por quadro, conforme o zoom
+        fill_writer = SpanWriter(self.screen, self.draw_area)  # Preenchimentos, recortados ao canvas
+        stroke_writer = SpanWriter(self.screen)  # Traços e marcadores: os discos podem passar da borda do canvas
+        # As formas são rasterizadas em paralelo; a composição segue a ordem da lista (a última fica por cima)
+        for ops in self.raster_pool.map(self.rasterize_shape, self.shapes):
+            for op in ops:
+                if op[0] == 'spans': fill_writer.spans(*op[1], op[2])
+                elif op[0] == 'stamps': stroke_writer.fill_spans(*op[1], op[2])
+                else: op[1]()  # 'call': desenho feito pelo pygame
+        self.stats.add('pixels_written', fill_writer.written)
+
+    def rasterize_shape(self, shape):
+        """Operações de desenho de uma forma, sem tocar no framebuffer (roda nas threads do pool)."""
+        color = shape.color
+        # Descarta formas cuja caixa envolvente está fora da área visível
+        if not self.draw_area.colliderect(self.get_shape_screen_bounds(shape)):
+            self.stats.add('shapes_culled'); return []
+        self.stats.add('shapes_drawn')
+        algo = self.rasterize_line_bresenham if self.line_algorithm == LineAlgorithm.BRESENHAM else self.rasterize_line_dda
+        ops = []
+
+        # Lógica de desenho específica para cada tipo de forma
+        if shape.type == 'point':
+            ops.append(self.disc_op(self.world_to_screen(shape.points[:1]), color, shape.thickness + 2))
+        elif shape.type == 'line':
+            ops.append(self.stroke_op(self.world_to_screen(algo(shape.points[0], shape.points[1])), color, shape.thickness))
+        elif shape.type == 'circle':
+            radius = np.linalg.norm(shape.points[1] - shape.points[0])
+            if shape.filled:
+                center = self.world_to_screen(shape.points[0])
+                ops.append(('spans', circle_spans(center[0], center[1], int(radius * self.zoom_factor)), color))
+            ops.append(self.stroke_op(self.world_to_screen(self.rasterize_circle_bresenham(shape.points[0], radius)), color, shape.thickness))
+        elif shape.type == 'ellipse':
+            center, axis_u, axis_v = shape.points[0], shape.points[1] - shape.points[0], shape.points[2] - shape.points[0]
+            if shape.filled:
+                ops.append(('spans', ellipse_spans(self.world_to_screen(center), axis_u * self.zoom_factor, axis_v * self.zoom_factor), color))
+            ops.append(self.stroke_op(self.world_to_screen(self.rasterize_ellipse(center, axis_u, axis_v)), color, shape.thickness, path=False))
+        elif shape.type == 'polygon':
+            points = shape.lod_points(self.lod_error / self.zoom_factor)  # Nível de detalhe conforme o zoom
+            self.stats.add('vertices_simplified', len(shape.points) - len(points))
+            if shape.filled:
+                screen_points = [self.world_to_screen(p) for p in points]
+                ops.append(self.backend.fill(screen_points, shape.fill_rule, color, self.canvas_bounds()))
+            if shape.visible_edges is None: ops.append(self.stroke_op(self.polyline_pixels(points, closed=True), color, shape.thickness))
+            else:  # Polígono recortado: as arestas sobre a borda do recorte não têm contorno
+                ops.extend(self.stroke_op(self.polyline_pixels(run), color, shape.thickness) for run in visible_runs(points, shape.visible_edges))
+        elif shape.type == 'freehand':
+            points = shape.lod_points(self.lod_error / self.zoom_factor)
+            self.stats.add('vertices_simplified', len(shape.points) - len(points))
+            ops.append(self.stroke_op(self.polyline_pixels(points), color, shape.thickness))
+        elif shape.type == 'polyline':
+            # Trechos que sobraram de cortes e recortes: um traço aberto por parte
+            parts = shape.lod_parts(self.lod_error / self.zoom_factor)
+            self.stats.add('vertices_simplified', len(shape.points) - sum(len(p) for p in parts))
+            ops.extend(self.stroke_op(self.polyline_pixels(points), color, shape.thickness) for points in parts)
+        elif shape.type == 'fill':
+            # Recorte raster do balde de tinta (Surface em cache, refeita só quando o zoom muda)
+            corners = self.world_to_screen(shape.points[0]), self.world_to_screen(shape.points[1])
+            ops.append(('call', lambda: shape.patch.draw(self.screen, *corners, color, self.draw_area)))
+
+        # Desenha marcadores nos vértices se a forma estiver selecionada
+        if shape.selected:
+            points_to_mark = shape.points
+            if len(shape.points) > 20: # Otimização para não desenhar muitos pontos em desenhos livres
+                step = len(shape.points) // 10
+                points_to_mark = shape.points[::step]
+            ops.append(self.disc_op(self.world_to_screen(points_to_mark), color, 6))
+        return ops
+
+    def polyline_pixels(self, points, closed=False):
+        """Pixels de tela de uma linha poligonal; com zoom < 1 os segmentos são rasterizados direto em pixels de tela."""
+        algo = self.rasterize_line_bresenham if self.line_algorithm == LineAlgorithm.BRESENHAM else self.rasterize_line_dda
+        count = len(points) if closed else len(points) - 1
+        if count < 1: return np.empty((0, 2), dtype=int)
+        if self.zoom_factor < 1:
+            # Afastado, vários pixels do mundo caem no mesmo pixel de tela: rasterizar na tela evita o retrabalho
+            screen_points = self.world_to_screen(points)
+            return np.concatenate([algo(screen_points[i], screen_points[(i+1)%len(points)]) for i in range(count)])
+        return self.world_to_screen(np.concatenate([algo(points[i], points[(i+1)%len(points)]) for i in range(count)]))
+
+    def stroke_op(self, pixels, color, thickness, path=True):
+        """Traço grosso: um disco por pixel dentro do canvas, fundidos em trechos (cada pixel escrito uma vez).
+
+        `path` indica que os pixels vêm em ordem ao longo do traço (retas e círculos), o que permite
+        ao backend de pré-visualização ligá-los com linhas em vez de carimbar cada um.
+        """
+        inside = len(self.canvas_pixels(pixels))
+        self.stats.add('pixels_written', inside); self.stats.add('pixels_rejected', len(pixels) - inside)
+        # A espessura visível é ajustada pelo zoom; raio < 1 é um único pixel
+        return self.disc_op(pixels, color, int(thickness * self.zoom_factor / 2), path)
+
+    def disc_op(self, centers, color, radius, path=False):
+        """Discos de `pygame.draw.circle` nos centros dentro do canvas, pelo kernel de trechos do backend, recortados à tela."""
+        return self.backend.spans(centers, radius, color, self.canvas_bounds(), (0, 0, self.width, self.height), path)
+
+    def canvas_bounds(self):
+        """Área de desenho como (esquerda, topo, direita, base), a forma de retângulo dos kernels."""
+        area = self.draw_area
+        return area.left, area.top, area.right, area.bottom
+
+    def canvas_pixels(self, pixels):
+        """Linhas de um array (N, 2) de pixels de tela que caem na área de desenho."""
+        area = self.draw_area
+        return pixels[(pixels[:, 0] >= area.left) & (pixels[:, 0] < area.right) & (pixels[:, 1] >= area.top) & (pixels[:, 1] < area.bottom)]
+
+    def draw_stats_overlay(self):
+        """Mostra os contadores do último quadro no canto da área de desenho."""
+        if not self.ui_ready: return
+        lines = (self.stats.report_lines() or ["(sem contadores)"]) + [self.scheduler.report(), f"Backend: {self.backend.name}"]
+        x, y = self.draw_area.x + 10, self.draw_area.y + 10
+        bg = pygame.Rect(x - 5, y - 5, 260, 16 * len(lines) + 10)
+        pygame.draw.rect(self.screen, self.LIGHT_GRAY, bg, border_radius=5)
+        pygame.draw.rect(self.screen, self.DARK_GRAY, bg, 1, border_radius=5)
+        for i, line in enumerate(lines):
+            self.screen.blit(self.text.render(self.font_small, line, self.DARK_GRAY), (x, y + i * 16))
+
+    def is_animating(self):
+        """Indica se algo na tela muda sem eventos (cursor piscando, ação em andamento)."""
+        return bool(not self.ui_ready or self.action_in_progress or self.rotation_input_active or self.thickness_input_active)
+
+    def get_shape_screen_bounds(self, shape):
+        """Retângulo (em coordenadas de tela) que contém todos os pixels que a forma pode gerar."""
+        lo, hi = shape.geometry.extent  # Analítica para círculo e elipse, em cache até os pontos mudarem
+        # Margem de 1 pixel cobre o arredondamento dos algoritmos de rasterização
+        top_left, bottom_right = self.world_to_screen(lo) - 1, self.world_to_screen(hi) + 2
+        return pygame.Rect(top_left, bottom_right - top_left)
+
+    def fill_at(self, pos):
+        """Balde de tinta: inunda a região do canvas sob o cursor e guarda o resultado como forma 'fill'."""
+        area = self.draw_area
+        # Lê os pixels do canvas limpo (sem pré-visualizações); sem cópia do último quadro, re-renderiza
+        if self.canvas_snapshot is None or self.canvas_snapshot.get_size() != area.size:
+            pygame.draw.rect(self.screen, self.WHITE, area); self.draw_shapes()
+            self.canvas_snapshot = self.screen.subsurface(area).copy()
+        mask = flood_fill(pygame.surfarray.array2d(self.canvas_snapshot), (pos[0] - area.x, pos[1] - area.y))
+        self.canvas_snapshot = None  # A nova forma invalida a cópia
+        cols, rows = np.flatnonzero(mask.any(axis=1)), np.flatnonzero(mask.any(axis=0))
+        if not len(cols): return
+        # Guarda só o retângulo que contém a região, com os cantos em coordenadas do mundo
+        x0, x1, y0, y1 = cols[0], cols[-1] + 1, rows[0], rows[-1] + 1
+        corners = [self.screen_to_world((area.x + x0, area.y + y0)), self.screen_to_world((area.x + x1, area.y + y1))]
+        shape = Shape('fill', corners, self.current_draw_color, 1)
+        shape.patch = RasterPatch(mask[x0:x1, y0:y1])
+        self.add_shape(shape)
+
+    def add_shape(self, shape):
+        """Acrescenta uma forma à cena (e ao diário de alterações)."""
+        self.shapes.append(shape); self.journal.add(shape)
+
+    def set_shapes(self, shapes):
+        """Troca a lista de formas (remoção, corte, recorte), registrando a diferença no diário."""
+        self.journal.splice(self.shapes, shapes); self.shapes = shapes; self.selection.retain(shapes)
+
+    def shape_touches_rect(self, shape, rect):
+        """Se algum ponto da forma cai no pygame.Rect; a caixa em cache descarta as formas distantes sem percorrê-las."""
+        lo, hi = np.trunc(shape.geometry.lo), np.trunc(shape.geometry.hi)  # collidepoint trunca as coordenadas
+        if hi[0] < rect.left or lo[0] >= rect.right or hi[1] < rect.top or lo[1] >= rect.bottom: return False
+        return any(rect.collidepoint(p) for p in shape.points)
+
+    def build_hit_scene(self, near=None, tolerance=0.0):
+        """Monta a cena do teste de clique (coordenadas do mundo; a espessura dos traços também, pois cresce com o zoom).
+
+        Os pontos são discos de raio fixo na tela, convertido para o mundo. Com `near`, só entram as formas cuja
+        extensão em cache, alargada pela tolerância e pela tinta, contém o ponto.
+        """
+        scene = HitScene()
+        for i, s in enumerate(self.shapes):
+            width = (2 * s.thickness + 4) / self.zoom_factor if s.type == 'point' else s.thickness
+            if near is not None and not s.geometry.near(near, tolerance + width): continue
+            if s.type == 'point': scene.add_point(i, s.points[0], width)
+            elif s.type == 'circle': scene.add_circle(i, s.points[0], np.linalg.norm(s.points[1] - s.points[0]), width)
+            elif s.type == 'ellipse': scene.add_polyline(i, ellipse_polyline(s.points[0], s.points[1] - s.points[0], s.points[2] - s.points[0]), width)
+            elif s.type == 'fill':
+                (x0, y0), (x1, y1) = s.points
+                scene.add_polyline(i, [(x0, y0), (x1, y0), (x1, y1), (x0, y1)], 0, closed=True)
+            elif s.type == 'polyline':
+                for points in s.part_points(): scene.add_polyline(i, points, width)
+            else: scene.add_polyline(i, s.points, width, closed=s.type == 'polygon')
+        return scene
+
+    def pick_shape(self, screen_pos):
+        """Índice da forma cuja tinta está mais perto do clique (tolerância em pixels de tela), ou None."""
+        if not self.shapes: return None
+        world_pos, tolerance = self.screen_to_world(screen_pos), self.hit_tolerance / self.zoom_factor
+        return self.build_hit_scene(world_pos, tolerance).pick(world_pos, tolerance)
 
     # --- Lógica de Eventos ---
-    def handle_events(self):
-        """Processa todos os eventos de entrada do usuário (mouse, teclado)."""
-        for event in pygame.event.get():
-            if event.type == pygame.QUIT: return False
-            if event.type == pygame.VIDEORESIZE: self.update_draw_area()
-            # Se um campo de texto está ativo, prioriza a entrada de texto
-            if self.rotation_input_active or self.thickness_input_active:
-                 if event.type == pygame.KEYDOWN: self.handle_text_input(event); continue
-            self.handle_mouse_events(event)
-            self.handle_keyboard_events(event)
+    def handle_events(self, events):
+        """Processa um lote de eventos de entrada (mouse, teclado), com movimentos agrupados."""
+        self.recorder.record(events)
+        for event in coalesce_motion(events, self.stats):
+            if not self.handle_event(event): return False
+        return True
+
+    def handle_event(self, event):
+        """Trata um único evento (já agrupado); retorna False ao fechar a janela."""
+        if event.type == pygame.QUIT: return False
+        if event.type == pygame.VIDEORESIZE: self.update_draw_area()
+        # Se um campo de texto está ativo, prioriza a entrada de texto
+        if self.rotation_input_active or self.thickness_input_active:
+             if event.type == pygame.KEYDOWN: self.handle_text_input(event); return True
+        self.handle_mouse_events(event)
+        self.handle_keyboard_events(event)
         return True
 
     def handle_text_input(self, event):
@@ -559,7 +906,7 @@ class PaintCG:
     
     def handle_mouse_events(self, event):
         """Processa todos os eventos relacionados ao mouse."""
-        pos = pygame.mouse.get_pos()
+        pos = getattr(event, 'pos', None) or pygame.mouse.get_pos()  # MOUSEWHEEL não tem posição
         if event.type == pygame.MOUSEBUTTONDOWN:
             # Desativa campos de texto se clicar fora deles
             if self.rotation_input_active and not self.ui_elements.get('rotation_input', pygame.Rect(0,0,0,0)).collidepoint((pos[0], pos[1] + self.panel_scroll_y)): self.rotation_input_active = False
@@ -580,16 +927,17 @@ class PaintCG:
                     self.mouse_pressed = True; self.drag_start_pos = pos
                     world_pos = self.screen_to_world(pos)
                     # Inicia ações de desenho
-                    if self.draw_mode not in [DrawMode.SELECT, DrawMode.CUT, DrawMode.CROP]:
+                    if self.draw_mode == DrawMode.FILL: self.fill_at(pos)
+                    elif self.draw_mode not in [DrawMode.SELECT, DrawMode.CUT, DrawMode.CROP]:
                         self.action_in_progress = True
                         if self.draw_mode in [DrawMode.LINE, DrawMode.CIRCLE, DrawMode.FREEHAND]: self.temp_points = [world_pos]
                         elif self.draw_mode == DrawMode.POLYGON: self.current_polygon.append(world_pos)
                         elif self.draw_mode == DrawMode.POINT:
-                             self.shapes.append(Shape('point', [world_pos], self.current_draw_color, self.brush_thickness)); self.action_in_progress = False
+                             self.add_shape(Shape('point', [world_pos], self.current_draw_color, self.brush_thickness)); self.action_in_progress = False
                 elif event.button == 3: # Botão direito
                      # Finaliza polígono
                      if self.draw_mode == DrawMode.POLYGON and len(self.current_polygon) > 2:
-                         self.shapes.append(Shape('polygon', self.current_polygon, self.current_draw_color, self.brush_thickness)); self.current_polygon = []
+                         self.add_shape(Shape('polygon', self.current_polygon, self.current_draw_color, self.brush_thickness)); self.current_polygon = []
                      # Inicia Pan (arrastar canvas)
                      else: self.panning = True; self.drag_start_pos = pos
         elif event.type == pygame.MOUSEBUTTONUP:
@@ -597,9 +945,9 @@ class PaintCG:
                 world_pos = self.screen_to_world(pos)
                 # Finaliza ações de desenho que dependem de arrastar
                 if self.action_in_progress:
-                    if self.draw_mode == DrawMode.LINE: self.shapes.append(Shape('line', [self.temp_points[0], world_pos], self.current_draw_color, self.brush_thickness))
-                    elif self.draw_mode == DrawMode.CIRCLE: self.shapes.append(Shape('circle', [self.temp_points[0], world_pos], self.current_draw_color, self.brush_thickness))
-                    elif self.draw_mode == DrawMode.FREEHAND: self.shapes.append(Shape('freehand', self.temp_points, self.current_draw_color, self.brush_thickness))
+                    if self.draw_mode == DrawMode.LINE: self.add_shape(Shape('line', [self.temp_points[0], world_pos], self.current_draw_color, self.brush_thickness))
+                    elif self.draw_mode == DrawMode.CIRCLE: self.add_shape(Shape('circle', [self.temp_points[0], world_pos], self.current_draw_color, self.brush_thickness))
+                    elif self.draw_mode == DrawMode.FREEHAND: self.add_shape(Shape('freehand', self.temp_points, self.current_draw_color, self.brush_thickness))
                 
                 # Finaliza ações de seleção/corte
                 if self.drag_start_pos:
@@ -610,16 +958,16 @@ class PaintCG:
                     if self.draw_mode == DrawMode.SELECT:
                         # Seleção por clique ou por retângulo
                         if np.linalg.norm(np.array(pos) - np.array(self.drag_start_pos)) < 5: # Clique
-                            for s in reversed(self.shapes):
-                               if any(pygame.Rect(s.points.min(axis=0), s.points.max(axis=0)-s.points.min(axis=0)).collidepoint(p) for p in [self.screen_to_world(pos)]): s.selected = not s.selected; break
+                            picked = self.pick_shape(pos)
+                            if picked is not None: self.selection.toggle(self.shapes[picked])
                         else: # Retângulo
-                            for s in self.shapes: s.selected = any(rect_world.collidepoint(p) for p in s.points)
+                            self.selection.replace(s for s in self.shapes if self.shape_touches_rect(s, rect_world))
                     
                     # Aplica corte ou crop
                     elif self.draw_mode == DrawMode.CUT and rect_screen.width > 2 and rect_screen.height > 2:
-                        self.cut_shapes_with_rect(rect_world)
+                        self.cut_shapes_with_rect(self.clip_window(rect_world))
                     elif self.draw_mode == DrawMode.CROP and rect_screen.width > 2 and rect_screen.height > 2:
-                        self.crop_shapes_to_rect(rect_world)
+                        self.crop_shapes_to_rect(self.clip_window(rect_world))
 
                 self.mouse_pressed = False; self.action_in_progress = False; self.temp_points = []
             elif event.button == 3: self.panning = False # Soltou botão direito, para o Pan
@@ -639,13 +987,13 @@ class PaintCG:
                 self.pan_offset += np.array(pos) - np.array(self.drag_start_pos); self.drag_start_pos = pos
             elif self.mouse_pressed:
                  if self.draw_mode == DrawMode.FREEHAND: 
-                     # Adiciona pontos ao desenho livre
-                     self.temp_points.append(self.screen_to_world(pos))
-                 elif self.draw_mode == DrawMode.SELECT and self.transform_mode == TransformMode.TRANSLATE and any(s.selected for s in self.shapes):
+                     # Adiciona ao desenho livre todas as amostras do lote agrupado
+                     self.temp_points.extend(self.screen_to_world(p) for p in getattr(event, 'samples', (pos,)))
+                 elif self.draw_mode == DrawMode.SELECT and self.transform_mode == TransformMode.TRANSLATE and self.selection:
                      # Move as formas selecionadas (Translação)
                      delta = self.screen_to_world(pos) - self.screen_to_world(self.drag_start_pos)
-                     for s in self.shapes:
-                         if s.selected: s.points += delta
+                     moved = self.selection.shapes
+                     self.move_shapes(moved, delta); self.journal.move(moved, delta)
                      self.drag_start_pos = pos
         elif event.type == pygame.MOUSEWHEEL:
             # Gerencia a roda de rolagem do mouse
@@ -687,96 +1035,146 @@ class PaintCG:
     def handle_keyboard_events(self, event):
         """Processa todos os eventos de teclado (atalhos)."""
         if event.type == pygame.KEYDOWN:
-            if event.key == pygame.K_DELETE: self.shapes = [s for s in self.shapes if not s.selected]
-            elif event.key == pygame.K_c: self.shapes.clear()
+            if event.key == pygame.K_F3: self.show_stats = not self.show_stats
+            elif event.key == pygame.K_F4: self.backends.cycle_session()  # Próximo backend de rasterização
+            elif event.key == pygame.K_DELETE: self.set_shapes([s for s in self.shapes if not s.selected])
+            elif event.key == pygame.K_f: self.toggle_fill()
+            elif event.key == pygame.K_c: self.shapes.clear(); self.selection.clear(); self.journal.clear()
             elif event.key == pygame.K_ESCAPE: # Cancela ação atual
                 self.current_polygon, self.temp_points = [], []; self.action_in_progress = False
-                for s in self.shapes: s.selected = False
+                self.selection.clear()
             elif event.key == pygame.K_RETURN: # Aplica transformação
-                selected_shapes = [s for s in self.shapes if s.selected]
-                if not selected_shapes: return
-                all_points = np.vstack([s.points for s in selected_shapes])
-                centroid = np.mean(all_points, axis=0)
-                matrix = self.get_transform_matrix(centroid)
-                for s in selected_shapes: s.points = self.apply_matrix_to_points(s.points, matrix)
-
-    def get_shape_edges(self, shape):
-        """Converte uma forma em uma lista de arestas para facilitar o recorte."""
-        edges = []
-        if shape.type == 'line':
-            edges.append((shape.points[0], shape.points[1]))
-        elif shape.type == 'polygon':
-            for i in range(len(shape.points)):
-                edges.append((shape.points[i], shape.points[(i + 1) % len(shape.points)]))
-        elif shape.type == 'freehand':
-            for i in range(len(shape.points) - 1):
-                edges.append((shape.points[i], shape.points[i + 1]))
-        elif shape.type == 'circle':
-            # Aproxima o círculo com um polígono para poder cortar suas arestas
-            center = shape.points[0]
-            radius = np.linalg.norm(shape.points[1] - shape.points[0])
-            num_segments = 36
-            circle_points = [center + np.array([radius * math.cos(2*math.pi*i/num_segments), radius * math.sin(2*math.pi*i/num_segments)]) for i in range(num_segments)]
-            for i in range(num_segments):
-                edges.append((circle_points[i], circle_points[(i + 1) % num_segments]))
-        return edges
+                if not self.selection: return
+                selected_shapes = self.selection.shapes
+                matrix = self.get_transform_matrix(self.selection.centroid())
+                self.transform_shapes(selected_shapes, matrix); self.journal.transform(selected_shapes, matrix)
+
+    def transform_shapes(self, shapes, matrix):
+        """Aplica a matriz homogênea às formas (também usado ao reaplicar o diário)."""
+        for s in shapes:
+            if s.type == 'circle' and not preserves_circles(matrix):
+                # Escala não uniforme: o círculo vira elipse, mantendo a forma analítica
+                s.type, s.points = 'ellipse', np.array(circle_to_ellipse(s.points[0], s.points[1]))
+            elif s.type == 'fill' and not preserves_axes(matrix):
+                # Rotação ou cisalhamento: os dois cantos não bastam, a máscara é reamostrada na caixa transformada
+                resampled = transform_mask(s.patch.mask, s.points[0], s.points[1], matrix)
+                if resampled is not None:
+                    mask, q0, q1 = resampled
+                    s.patch, s.points = RasterPatch(mask), np.array([q0, q1]); continue
+            s.points = self.apply_matrix_to_points(s.points, matrix)
+
+    def move_shapes(self, shapes, delta):
+        """Translada as formas (arrasto no modo seleção; também usado ao reaplicar o diário)."""
+        for s in shapes: s.points = s.points + delta  # Array novo: o retrato do autosave guarda o antigo
+
+    def toggle_fill(self):
+        """Alterna o preenchimento das formas selecionadas: vazio -> par-ímpar -> não-zero -> vazio."""
+        changed = [s for s in self.selection if s.type in ('polygon', 'circle', 'ellipse')]
+        for s in changed:
+            if not s.filled: s.filled, s.fill_rule = True, EVEN_ODD
+            elif s.fill_rule == EVEN_ODD and s.type == 'polygon': s.fill_rule = NONZERO
+            else: s.filled = False
+        self.journal.fill(changed)
+
+    def shape_outline(self, shape):
+        """Contorno de uma forma como linha poligonal para o recorte: (pontos, offsets das partes, fechada)."""
+        if shape.type in ('circle', 'ellipse'):
+            # Aproxima a curva com um polígono para poder cortar suas arestas; o número de
+            # segmentos cresce com o raio até a corda ficar a menos de max_chord_error da curva
+            center, axis_u = shape.points[0], shape.points[1] - shape.points[0]
+            axis_v = np.array([-axis_u[1], axis_u[0]]) if shape.type == 'circle' else shape.points[2] - shape.points[0]
+            segments = curve_segments(ellipse_radius(axis_u, axis_v), self.max_chord_error / self.zoom_factor)
+            self.stats.add('curve_segments', segments)
+            return ellipse_polyline(center, axis_u, axis_v, segments)[:-1], None, True  # O último vértice repete o primeiro
+        return shape.points, shape.parts, shape.type == 'polygon'
+
+    def curve_rect_relation(self, shape, window):
+        """Posição de um círculo/elipse (ou da caixa de um balde de tinta) em relação à janela (OUTSIDE, INSIDE ou CROSSING), sem tesselar."""
+        window = self.window_geometry(window)
+        if shape.type == 'circle':  # Preenchido, o disco que contém a janela inteira também a cruza
+            return circle_window_relation(shape.points[0], np.linalg.norm(shape.points[1] - shape.points[0]), window, shape.filled)
+        if shape.type in ('ellipse', 'fill'): return bounds_window_relation(*shape.geometry.extent, window)  # Balde: caixa dos cantos
+        return CROSSING
 
     def cut_shapes_with_rect(self, clip_rect_world):
-        """Implementação da ferramenta 'CUT'. Remove o que está DENTRO do retângulo."""
+        """Implementação da ferramenta 'CUT'. Remove o que está DENTRO da janela (retângulo, ou girado no modo ROTATE)."""
         new_shapes = []
         for shape in self.shapes:
             if shape.type == 'point':
-                if not clip_rect_world.collidepoint(shape.points[0]): new_shapes.append(shape)
+                if not self.window_contains(clip_rect_world, shape.points[0]): new_shapes.append(shape)
                 continue
-            edges = self.get_shape_edges(shape)
-            if not edges: new_shapes.append(shape); continue
-            
-            is_cut = False; new_edges = []
-            for p1, p2 in edges:
-                segments = self.split_line_with_rect(p1, p2, clip_rect_world) # Pega segmentos FORA do retângulo
-                if len(segments) != 1 or not np.allclose(segments[0], [p1, p2]): is_cut = True
-                new_edges.extend(segments)
-            
-            if not is_cut: new_shapes.append(shape)
-            else:
-                # Se a forma foi cortada, ela é recriada como um conjunto de linhas
-                for edge in new_edges: new_shapes.append(Shape('line', edge, shape.color, shape.thickness))
-        self.shapes = new_shapes
+            relation = self.curve_rect_relation(shape, clip_rect_world)
+            if relation != CROSSING:
+                # Curva intocada segue analítica; curva inteira dentro do corte some
+                if relation == OUTSIDE: new_shapes.append(shape)
+                continue
+            if shape.type == 'fill':
+                clipped = self.clip_fill(shape, clip_rect_world, inside=False)  # Máscara sem a janela
+                if clipped is not None: new_shapes.append(clipped)
+                continue
+            if shape.filled and shape.type in ('polygon', 'circle', 'ellipse'):
+                new_shapes.extend(self.cut_filled_shape(shape, clip_rect_world)); continue  # Preenchimento com o furo da janela
+            # Uma forma cortada vira uma única 'polyline' com os trechos que ficaram fora
+            clipped = self.clip_shape(shape, clip_rect_world, inside=False)
+            if clipped is not None: new_shapes.append(clipped)
+        self.set_shapes(new_shapes)
         
     def crop_shapes_to_rect(self, crop_rect_world):
-        """Implementação da ferramenta 'CROP'. Remove o que está FORA do retângulo."""
+        """Implementação da ferramenta 'CROP'. Remove o que está FORA da janela (retângulo, ou girado no modo ROTATE)."""
         new_shapes = []
         for shape in self.shapes:
             if shape.type == 'point':
-                if crop_rect_world.collidepoint(shape.points[0]): new_shapes.append(shape)
+                if self.window_contains(crop_rect_world, shape.points[0]): new_shapes.append(shape)
                 continue
-            edges = self.get_shape_edges(shape)
-            if not edges: continue
-            
-            for p1, p2 in edges:
-                clipped_edge = self.clip_line_to_rect(p1, p2, crop_rect_world) # Pega o segmento DENTRO do retângulo
-                if clipped_edge is not None:
-                    new_shapes.append(Shape('line', clipped_edge, shape.color, shape.thickness))
-        self.shapes = new_shapes
+            relation = self.curve_rect_relation(shape, crop_rect_world)
+            if relation != CROSSING:
+                if relation == INSIDE: new_shapes.append(shape)
+                continue
+            if shape.type == 'fill': clipped = self.clip_fill(shape, crop_rect_world, inside=True)  # Máscara só na janela
+            elif shape.type in ('polygon', 'circle', 'ellipse'): clipped = self.crop_closed_shape(shape, crop_rect_world)  # Continua fechada
+            else: clipped = self.clip_shape(shape, crop_rect_world, inside=True)  # Trechos DENTRO da janela
+            if clipped is not None: new_shapes.append(clipped)
+        self.set_shapes(new_shapes)
+
+    def shape_from_record(self, record):
+        """Recria uma forma gravada no autosave ou no diário (com o mesmo uid)."""
+        shape = Shape(record['type'], record['points'], record['color'], record['thickness'], record['parts'])
+        shape.uid, shape.filled, shape.fill_rule = record['uid'], record['filled'], record['fill_rule']
+        if record['mask'] is not None: shape.patch = RasterPatch(record['mask'])
+        shape.visible_edges = record['visible_edges']
+        return shape
+
+    def recover(self, snapshot, journals):
+        """Recupera a cena: o último autosave e, por cima, as alterações do diário."""
+        shapes = []
+        if snapshot:
+            try: shapes = [self.shape_from_record(r) for r in read_snapshot(snapshot, self.autosave.app)]
+            except (OSError, KeyError, ValueError): pass  # Autosave ilegível (ou de outro aplicativo): o diário é reaplicado sobre o canvas vazio
+        self.shapes = replay_journal(journals, shapes, self.shape_from_record, self.transform_shapes, self.move_shapes)
+        Shape.uids = itertools.count(max((s.uid for s in self.shapes), default=0) + 1)  # Formas novas não reutilizam uids
 
     def run(self):
         """O loop principal do programa."""
         running = True
+        # Sessão anterior encerrada sem sair normalmente: recupera o último autosave e o diário
+        recovery = self.autosave.start()
+        if recovery and not self.shapes: self.recover(*recovery)
+        self.autosave.checkpoint(self.shapes)
         while running:
-            # 1. Processa eventos de entrada
-            running = self.handle_events()
+            # 1. Espera o próximo quadro (o agendador controla o FPS) e processa os eventos
+            running = self.handle_events(self.scheduler.next_events(self.is_animating()))
             
-            # 2. Desenha o conteúdo do canvas
-            self.draw_canvas()
+            # 2. Desenha o canvas e a interface por cima
+            self.draw_frame()
             
-            # 3. Desenha a interface por cima
-            self.draw_ui()
-            
-            # 4. Atualiza a tela
+            # 3. Atualiza a tela
             pygame.display.flip()
-            
-            # 5. Controla a taxa de quadros por segundo (FPS)
-            self.clock.tick(60)
+            self.autosave.maybe_save(self.shapes)  # Só tira o retrato; a gravação é em outra thread
+            self.stats.end_frame()
+            if not self.ui_ready: self.finish_startup()
+
+        self.autosave.close(); self.recorder.close()
+        self.raster_pool.shutdown()
         pygame.quit()
 
 if __name__ == "__main__":
@@ -0,0 +1,18 @@
+"""Núcleo compartilhado pelos aplicativos Paint (apenas Python/NumPy, sem pygame).
+
+Geometria pura, usada pelos dois aplicativos: `cgcore.raster` (retas, círculos,
+elipses, traços), `cgcore.fill` (preenchimento), `cgcore.clip` (recorte) e
+`cgcore.transform` (matrizes homogêneas). Importar um desses módulos não
+carrega nada além do NumPy; `RenderStats` e `StartupTimer` são carregados só
+quando usados.
+"""
+
+__all__ = ['RenderStats', 'StartupTimer']
+
+
+def __getattr__(name):
+    # Reexportação preguiçosa: `import cgcore.clip` não paga o json/threading de cgcore.stats
+    if name in __all__:
+        from cgcore import stats
+        return getattr(stats, name)
+    raise AttributeError(f"module 'cgcore' has no attribute {name!r}")
@@ -0,0 +1,311 @@
+"""Salvamento automático em segundo plano: retrato barato na thread principal, gravação numa thread.
+
+A thread principal só monta um retrato com *referências* aos pontos das
+formas (os aplicativos trocam a lista/array de pontos a cada alteração, nunca
+a modificam no lugar, então a referência guardada continua válida). A
+conversão para arrays, a serialização e o fsync acontecem na thread de
+gravação; o arquivo final aparece por `os.replace`, nunca pela metade.
+Entre dois retratos, as alterações vão para o diário (`cgcore.journal`).
+"""
+import glob
+import os
+import tempfile
+import threading
+import time
+
+import numpy as np
+
+from cgcore.color import default_cache_dir
+from cgcore.journal import Journal
+
+# Versão do formato gravado em disco
+AUTOSAVE_VERSION = 3
+
+# Campos de cada forma guardados no retrato, além dos pontos
+SHAPE_FIELDS = ('uid', 'type', 'color', 'thickness', 'filled', 'fill_rule')
+# Arrays opcionais de cada forma (gravados como '<nome>_<índice>' quando existem): máscara do balde,
+# offsets das partes de uma 'polyline' e arestas visíveis de um polígono recortado
+SHAPE_ARRAYS = ('mask', 'parts', 'visible_edges')
+
+
+def _shape_arrays(shape):
+    return (shape.patch.mask if getattr(shape, 'patch', None) is not None else None,
+            getattr(shape, 'parts', None), getattr(shape, 'visible_edges', None))
+
+
+def autosave_settings(interval_var='PAINTCG_AUTOSAVE_INTERVAL', keep_var='PAINTCG_AUTOSAVE_KEEP'):
+    """(intervalo em segundos, quantos arquivos manter), das variáveis de ambiente; intervalo 0 desliga."""
+    interval, keep = 60.0, 5
+    try:
+        interval = max(0.0, float(os.environ.get(interval_var, interval)))
+    except ValueError:
+        pass
+    try:
+        keep = max(1, int(os.environ.get(keep_var, keep)))
+    except ValueError:
+        pass
+    return interval, keep
+
+
+def snapshot_shapes(shapes):
+    """Retrato imutável da cena: uma tupla por forma, só com referências (custo O(formas))."""
+    return tuple((tuple(getattr(shape, field) for field in SHAPE_FIELDS), shape.points, _shape_arrays(shape))
+                 for shape in shapes)
+
+
+def same_snapshot(a, b):
+    """Se dois retratos descrevem a mesma cena (pontos e arrays opcionais comparados por identidade)."""
+    if a is None or b is None or len(a) != len(b):
+        return False
+    return all(fa == fb and pa is pb and all(x is y for x, y in zip(ra, rb)) for (fa, pa, ra), (fb, pb, rb) in zip(a, b))
+
+
+def write_snapshot(path, snapshot, app=None):
+    """Grava o retrato em `path` de forma atômica (arquivo temporário, fsync e rename), marcado com o aplicativo `app`."""
+    points = [np.asarray(p, dtype=float).reshape(-1, 2) for _, p, _ in snapshot]
+    offsets = np.cumsum([0] + [len(p) for p in points])
+    fields = {name: [f[i] for f, _, _ in snapshot] for i, name in enumerate(SHAPE_FIELDS)}
+    arrays = {
+        'version': np.array(AUTOSAVE_VERSION),
+        'app': np.array(app or '', dtype=str),
+        'uid': np.array(fields['uid'], dtype=np.uint64),
+        'vertices': np.concatenate(points) if points else np.empty((0, 2)),
+        'offsets': offsets,
+        'type': np.array(fields['type'], dtype=str),
+        'color': np.array([tuple(c)[:3] for c in fields['color']], dtype=np.uint8).reshape(-1, 3),
+        'thickness': np.array(fields['thickness'], dtype=float),
+        'filled': np.array(fields['filled'], dtype=bool),
+        'fill_rule': np.array(fields['fill_rule'], dtype=str),
+    }
+    for i, (_, _, optional) in enumerate(snapshot):
+        for name, array in zip(SHAPE_ARRAYS, optional):
+            if array is not None:
+                arrays[f'{name}_{i}'] = array
+    directory = os.path.dirname(path) or '.'
+    fd, tmp_path = tempfile.mkstemp(dir=directory, suffix='.tmp')
+    try:
+        with os.fdopen(fd, 'wb') as f:
+            np.savez(f, **arrays)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, path)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+    _fsync_directory(directory)
+
+
+def _fsync_directory(directory):
+    """Garante que o rename chegou ao disco (não existe no Windows, onde é ignorado)."""
+    try:
+        fd = os.open(directory, os.O_RDONLY)
+    except OSError:
+        return
+    try:
+        os.fsync(fd)
+    except OSError:
+        pass
+    finally:
+        os.close(fd)
+
+
+def read_snapshot(path, app=None):
+    """Formas de um arquivo gravado, como dicionários (pontos em array (N, 2) de floats).
+
+    Com `app`, recusa (ValueError) o retrato gravado por outro aplicativo, cujas formas ele pode não saber desenhar.
+    """
+    with np.load(path) as data:
+        if int(data['version']) != AUTOSAVE_VERSION:
+            raise ValueError(f"versão de autosave desconhecida em {path}")
+        if app is not None and str(data['app']) != app:
+            raise ValueError(f"autosave de outro aplicativo ({data['app']}) em {path}")
+        vertices, offsets = data['vertices'], data['offsets']
+        shapes = []
+        for i in range(len(data['type'])):
+            thickness = float(data['thickness'][i])
+            record = {
+                'uid': int(data['uid'][i]),
+                'type': str(data['type'][i]),
+                'points': vertices[offsets[i]:offsets[i + 1]],
+                'color': tuple(int(c) for c in data['color'][i]),
+                'thickness': int(thickness) if thickness.is_integer() else thickness,
+                'filled': bool(data['filled'][i]),
+                'fill_rule': str(data['fill_rule'][i]),
+            }
+            for name in SHAPE_ARRAYS:
+                record[name] = data[f'{name}_{i}'] if f'{name}_{i}' in data.files else None
+            shapes.append(record)
+    return shapes
+
+
+class Autosaver:
+    """Salva a cena a cada `interval` segundos numa thread de gravação, mantendo os `keep` arquivos mais novos.
+
+    `maybe_save` é chamado uma vez por quadro: fora do intervalo custa uma
+    comparação de relógio, e no intervalo só tira o retrato. Se a gravação
+    anterior ainda não terminou, o retrato novo substitui o pendente (vale
+    sempre o mais recente). Cada retrato entregue abre um arquivo novo do
+    diário, numerado como ele: a cena é o autosave mais novo gravado mais os
+    diários de número igual ou maior. Um marcador de sessão, criado em
+    `start` e apagado em `close`, indica na próxima execução que a anterior
+    não saiu normalmente. Cada aplicativo (`app`) tem a sua pasta, com seus
+    retratos, diários e marcador, e os retratos levam o seu nome.
+    """
+
+    PREFIX = 'autosave-'
+    MARKER = 'session.lock'
+
+    def __init__(self, directory=None, interval=None, keep=None, stats=None, app=None):
+        default_interval, default_keep = autosave_settings()
+        self.app = app
+        if directory is None:
+            directory = os.path.join(default_cache_dir(), 'autosave')
+            if app:
+                directory = os.path.join(directory, app)
+        self.directory = directory
+        self.interval = default_interval if interval is None else interval
+        self.keep = default_keep if keep is None else keep
+        self.stats = stats
+        self.journal = Journal(self.directory)
+        self.error = None          # Última falha de gravação (a sessão continua sem autosave)
+        self._last_time = None
+        self._last_snapshot = None
+        self._pending = None
+        self._sequence = 0
+        self._condition = threading.Condition()
+        self._thread = None
+        self._closing = False
+
+    @property
+    def enabled(self):
+        return self.interval > 0
+
+    def _numbered(self, prefix, suffix):
+        """(número, caminho) dos arquivos `prefix`NNNNNN`suffix`, em ordem crescente."""
+        found = []
+        for path in glob.glob(os.path.join(self.directory, prefix + '*' + suffix)):
+            try:
+                found.append((int(os.path.basename(path)[len(prefix):-len(suffix)]), path))
+            except ValueError:
+                pass  # Nome fora do padrão: não é nosso
+        return sorted(found)
+
+    def files(self):
+        """Arquivos de autosave existentes, do mais antigo ao mais novo."""
+        return [path for _, path in self._numbered(self.PREFIX, '.npz')]
+
+    def start(self):
+        """Inicia a sessão (sem gravar nada ainda; veja `checkpoint`).
+
+        Se a sessão anterior não terminou normalmente, devolve o que recuperar:
+        (autosave mais novo ou None, diários a reaplicar depois dele).
+        """
+        if not self.enabled:
+            return None
+        recover = None
+        try:
+            os.makedirs(self.directory, exist_ok=True)
+            marker = os.path.join(self.directory, self.MARKER)
+            saves = self._numbered(self.PREFIX, '.npz')
+            journals = self._numbered(Journal.PREFIX, '.bin')
+            if os.path.exists(marker) and (saves or journals):
+                base = saves[-1][0] if saves else -1
+                recover = (saves[-1][1] if saves else None, [path for n, path in journals if n >= base])
+            self._sequence = max([n for n, _ in saves + journals], default=0)
+            with open(marker, 'w') as f:
+                f.write(str(os.getpid()))
+        except OSError as exc:
+            self.error = exc
+            self.interval = 0  # Pasta inacessível: segue sem autosave
+            return None
+        self._last_time = time.monotonic()
+        self._thread = threading.Thread(target=self._run, name='autosave', daemon=True)
+        self._thread.start()
+        return recover
+
+    def checkpoint(self, shapes):
+        """Grava já (na thread chamadora) o retrato da cena e abre o diário que o segue.
+
+        Chamado no início da sessão, depois da recuperação, para que os
+        diários desta sessão nunca sejam aplicados sobre um autosave antigo.
+        """
+        if self._thread is None:
+            return
+        snapshot = snapshot_shapes(shapes)
+        self._sequence += 1
+        try:
+            write_snapshot(os.path.join(self.directory, f'{self.PREFIX}{self._sequence:06d}.npz'), snapshot, self.app)
+            self.journal.rotate(self._sequence)
+            self._prune()
+        except OSError as exc:
+            self.error = exc
+        self._last_snapshot, self._last_time = snapshot, time.monotonic()
+
+    def maybe_save(self, shapes, now=None):
+        """Entrega um retrato à thread de gravação se o intervalo passou e a cena mudou.
+
+        Também entrega ao sistema operacional o que o diário acumulou no quadro.
+        """
+        if self._thread is None:
+            return False
+        self.journal.flush()
+        now = time.monotonic() if now is None else now
+        if now - self._last_time < self.interval:
+            return False
+        self._last_time = now
+        snapshot = snapshot_shapes(shapes)
+        if same_snapshot(snapshot, self._last_snapshot):
+            return False
+        self._last_snapshot = snapshot
+        self._sequence += 1
+        with self._condition:
+            self._pending = (self._sequence, snapshot)
+            self._condition.notify()
+        try:
+            self.journal.rotate(self._sequence)  # Alterações a partir daqui vão para o diário deste retrato
+        except OSError as exc:
+            self.error = exc
+        if self.stats is not None:
+            self.stats.add('autosave_snapshots')
+        return True
+
+    def _run(self):
+        while True:
+            with self._condition:
+                while self._pending is None and not self._closing:
+                    self._condition.wait()
+                pending, self._pending = self._pending, None
+                if pending is None:
+                    return
+            sequence, snapshot = pending
+            try:
+                write_snapshot(os.path.join(self.directory, f'{self.PREFIX}{sequence:06d}.npz'), snapshot, self.app)
+                self._prune()
+            except OSError as exc:
+                self.error = exc
+
+    def _prune(self):
+        """Mantém os `keep` autosaves mais novos e só os diários que ainda seguem algum deles."""
+        saves = self._numbered(self.PREFIX, '.npz')
+        for _, path in saves[:-self.keep]:
+            os.remove(path)
+        oldest = saves[-self.keep:][0][0] if saves else 0
+        for number, path in self._numbered(Journal.PREFIX, '.bin'):
+            if number < oldest:
+                os.remove(path)
+
+    def close(self):
+        """Grava o que estiver pendente, encerra a thread e apaga o marcador de sessão."""
+        if self._thread is None:
+            return
+        with self._condition:
+            self._closing = True
+            self._condition.notify()
+        self._thread.join()
+        self._thread = None
+        self.journal.close()
+        try:
+            os.remove(os.path.join(self.directory, self.MARKER))
+        except OSError:
+            pass
@@ -0,0 +1,207 @@
+"""Backends de rasterização escolhidos em tempo de execução: kernels de reta, círculo, trechos e preenchimento.
+
+Kernels (métodos públicos de `RasterBackend`), todos em coordenadas de tela:
+
+    line(x1, y1, x2, y2, algorithm)   pixels (N, 2) do traço, do primeiro ao último
+    circle(cx, cy, radius)             pixels (N, 2) do contorno
+    spans(centers, radius, color, area, clip, path=False)
+                                       operação com um carimbo de raio `radius` em cada
+                                       centro dentro de `area`, recortada a `clip`
+    fill(points, rule, color, clip)    operação com o interior do polígono, recortado a `clip`
+
+As operações seguem a composição dos aplicativos: ('stamps', trechos, cor),
+('spans', trechos, cor) ou ('call', função). Cada backend implementa os
+kernels que sabe fazer (`_line`, `_circle`, `_spans`, `_fill`); um kernel
+ausente, ou que devolve NotImplemented para um caso, é resolvido pelo
+`fallback` — por padrão, a referência em Python puro.
+"""
+import os
+
+import numpy as np
+
+from cgcore import reference
+from cgcore.fill import polygon_spans, polygon_spans_vectorized
+from cgcore.raster import circle_points, line_points, line_points_dda, stamp_spans
+
+KERNELS = ('line', 'circle', 'spans', 'fill')
+
+
+def square_stamp(radius):
+    """Carimbo quadrado [-r, r] × [-r, r] como (linhas, x inicial, x final); raio < 1 é um único pixel."""
+    radius = max(int(radius), 0)
+    rows = np.arange(-radius, radius + 1)
+    return rows, np.full(len(rows), -radius), np.full(len(rows), radius)
+
+
+def _inside(centers, area):
+    """Centros (N, 2) dentro de `area` = (esquerda, topo, direita, base; direita e base exclusivas)."""
+    centers = np.asarray(centers).reshape(-1, 2)
+    left, top, right, bottom = area
+    return centers[(centers[:, 0] >= left) & (centers[:, 0] < right) &
+                   (centers[:, 1] >= top) & (centers[:, 1] < bottom)]
+
+
+def _span_arrays(spans):
+    spans = np.asarray(spans, dtype=np.int64).reshape(-1, 3)
+    return spans[:, 0], spans[:, 1], spans[:, 2]
+
+
+class RasterBackend:
+    """Conjunto de kernels de rasterização com um backend de reserva para o que não implementa.
+
+    `stamp(raio)` dá o carimbo (linhas, x inicial, x final) do traço grosso; os
+    aplicativos passam o disco do pygame (`cgui.spans.disc_stamp`), e sem ele o
+    carimbo é quadrado. `native` indica que os kernels desenham pela biblioteca
+    gráfica (operações 'call') em vez de devolver pixels exatos.
+    """
+
+    name = None
+    native = False
+    _line = _circle = _spans = _fill = None
+
+    def __init__(self, fallback=None, stamp=None):
+        self.fallback = fallback
+        self.stamp = stamp or square_stamp
+
+    def implements(self, kernel):
+        return getattr(self, '_' + kernel) is not None
+
+    def _dispatch(self, kernel, *args, **kwargs):
+        backend = self
+        while backend is not None:
+            implementation = getattr(backend, '_' + kernel)
+            if implementation is not None:
+                result = implementation(*args, **kwargs)
+                if result is not NotImplemented:
+                    return result
+            backend = backend.fallback
+        raise NotImplementedError(f"nenhum backend implementa o kernel '{kernel}' para esses argumentos")
+
+    def line(self, x1, y1, x2, y2, algorithm='bresenham'):
+        return self._dispatch('line', x1, y1, x2, y2, algorithm)
+
+    def circle(self, cx, cy, radius):
+        return self._dispatch('circle', cx, cy, radius)
+
+    def spans(self, centers, radius, color, area, clip, path=False):
+        return self._dispatch('spans', centers, radius, color, area, clip, path)
+
+    def fill(self, points, rule, color, clip):
+        return self._dispatch('fill', points, rule, color, clip)
+
+    def __repr__(self):
+        return f'<{type(self).__name__} {self.name!r}>'
+
+
+class ReferenceBackend(RasterBackend):
+    """Os laços originais em Python puro (`cgcore.reference`): lento, mas a definição dos pixels certos."""
+
+    name = 'reference'
+
+    def _line(self, x1, y1, x2, y2, algorithm):
+        if algorithm == 'dda':  # O DDA aceita extremos fracionários, como o laço original
+            points = reference.line_dda(x1, y1, x2, y2)
+        else:
+            points = reference.line_bresenham(int(x1), int(y1), int(x2), int(y2))
+        return np.array(points, dtype=np.int64).reshape(-1, 2)
+
+    def _circle(self, cx, cy, radius):
+        return np.array(reference.circle_bresenham(int(cx), int(cy), int(radius)), dtype=np.int64).reshape(-1, 2)
+
+    def _spans(self, centers, radius, color, area, clip, path):
+        rows, x_lo, x_hi = (np.asarray(a).tolist() for a in self.stamp(radius))
+        spans = reference.stamp_spans(_inside(centers, area).tolist(), rows, x_lo, x_hi, clip)
+        return ('stamps', _span_arrays(spans), color)
+
+    def _fill(self, points, rule, color, clip):
+        # A lista de arestas ativas em Python é a implementação original do preenchimento
+        return ('spans', polygon_spans(points, rule, clip[1], clip[3]), color)
+
+
+class NumpyBackend(RasterBackend):
+    """Kernels vetorizados (`cgcore.raster`, `cgcore.fill`), com os mesmos pixels da referência."""
+
+    name = 'numpy'
+
+    def _line(self, x1, y1, x2, y2, algorithm):
+        return (line_points_dda if algorithm == 'dda' else line_points)(x1, y1, x2, y2)
+
+    def _circle(self, cx, cy, radius):
+        return circle_points(int(cx), int(cy), int(radius))
+
+    def _spans(self, centers, radius, color, area, clip, path):
+        return ('stamps', stamp_spans(_inside(centers, area), *self.stamp(radius), clip), color)
+
+    def _fill(self, points, rule, color, clip):
+        return ('spans', polygon_spans_vectorized(points, rule, clip[1], clip[3]), color)
+
+
+# Fábricas registradas: nome -> callable(fallback=..., stamp=...) que cria o backend
+BACKENDS = {}
+
+
+def register_backend(name, factory):
+    """Registra um backend (por exemplo, `cgui.backends` registra o de pré-visualização do pygame)."""
+    BACKENDS[name] = factory
+
+
+def backend_names():
+    return tuple(BACKENDS)
+
+
+register_backend(ReferenceBackend.name, ReferenceBackend)
+register_backend(NumpyBackend.name, NumpyBackend)
+
+
+def parse_zoom_rules(text):
+    """Regras 'zoom:backend' separadas por vírgula ('0.5:pygame' = abaixo de 0.5×, pygame); ignora as inválidas."""
+    rules = []
+    for item in (text or '').split(','):
+        limit, _, name = item.partition(':')
+        try:
+            rules.append((float(limit), name.strip()))
+        except ValueError:
+            continue
+    return sorted(rules)
+
+
+class BackendSelector:
+    """Escolhe o backend de cada quadro: o da sessão ou, se houver regra para a faixa de zoom, o da regra.
+
+    Os backends são criados sob demanda e reaproveitados; todos usam a mesma
+    instância da referência como reserva. Nomes não registrados são ignorados.
+    """
+
+    def __init__(self, session='numpy', zoom_rules=(), stamp=None):
+        self.stamp = stamp
+        self._instances = {}
+        self.reference = self._create(ReferenceBackend.name)
+        self.session = session if session in BACKENDS else NumpyBackend.name
+        self.zoom_rules = [(limit, name) for limit, name in sorted(zoom_rules) if name in BACKENDS]
+
+    @classmethod
+    def from_env(cls, stamp=None, session_var='PAINTCG_BACKEND', zoom_var='PAINTCG_BACKEND_ZOOM'):
+        """Backend da sessão e regras por zoom das variáveis de ambiente (padrão: numpy em qualquer zoom)."""
+        return cls(os.environ.get(session_var, 'numpy'), parse_zoom_rules(os.environ.get(zoom_var)), stamp)
+
+    def _create(self, name):
+        if name not in self._instances:
+            fallback = None if name == ReferenceBackend.name else self.reference
+            self._instances[name] = BACKENDS[name](fallback=fallback, stamp=self.stamp)
+        return self._instances[name]
+
+    def get(self, name):
+        return self._create(name)
+
+    def select(self, zoom):
+        """Backend para o zoom atual: a primeira regra cujo limite é maior que o zoom, senão o da sessão."""
+        for limit, name in self.zoom_rules:
+            if zoom < limit:
+                return self._create(name)
+        return self._create(self.session)
+
+    def cycle_session(self):
+        """Passa a sessão para o próximo backend registrado; devolve o nome escolhido."""
+        names = backend_names()
+        self.session = names[(names.index(self.session) + 1) % len(names)]
+        return self.session
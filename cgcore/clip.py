@@ -0,0 +1,509 @@
+"""Recorte: posição de curvas em relação a janelas, Cohen-Sutherland, Liang-Barsky, Cyrus-Beck e Sutherland-Hodgman (sem pygame).
+
+Janelas de recorte são retângulos (esquerda, topo, direita, base) ou polígonos
+convexos (M, 2), em qualquer sentido; `clip_polyline` e `sutherland_hodgman`
+aceitam os dois e usam o caminho próprio de cada um.
+"""
+import math
+
+import numpy as np
+
+OUTSIDE = 'outside'    # A curva não toca o retângulo
+INSIDE = 'inside'      # A curva está inteira dentro do retângulo
+CROSSING = 'crossing'  # A curva cruza a borda do retângulo
+
+
+def circle_rect_relation(center, radius, rect, filled=False):
+    """Posição do contorno de um círculo em relação a `rect` = (esquerda, topo, direita, base).
+
+    Compara o raio com a menor distância do centro ao retângulo (dmin) e com a
+    distância ao canto mais afastado (dmax): fora de [dmin, dmax] o contorno não
+    toca o retângulo; com o centro dentro e o raio até a borda mais próxima, o
+    contorno cabe inteiro nele. Só o caso CROSSING precisa ser tesselado.
+    Com `filled`, o disco conta: o retângulo inteiro dentro dele (raio > dmax)
+    é CROSSING, e não OUTSIDE.
+    """
+    cx, cy = center[0], center[1]
+    left, top, right, bottom = rect
+    dmin = math.hypot(max(left - cx, 0, cx - right), max(top - cy, 0, cy - bottom))
+    dmax = math.hypot(max(cx - left, right - cx), max(cy - top, bottom - cy))
+    if radius > dmax:
+        return CROSSING if filled else OUTSIDE
+    if radius < dmin:
+        return OUTSIDE
+    if dmin == 0 and radius <= min(cx - left, right - cx, cy - top, bottom - cy):
+        return INSIDE
+    return CROSSING
+
+
+def bounds_rect_relation(lo, hi, rect):
+    """Posição de uma caixa envolvente (cantos `lo`, `hi`) em relação a `rect`.
+
+    Teste conservador para curvas sem forma fechada: CROSSING significa apenas
+    que a caixa cruza a borda, não que a curva cruze.
+    """
+    left, top, right, bottom = rect
+    if hi[0] < left or lo[0] > right or hi[1] < top or lo[1] > bottom:
+        return OUTSIDE
+    if lo[0] >= left and hi[0] <= right and lo[1] >= top and hi[1] <= bottom:
+        return INSIDE
+    return CROSSING
+
+
+# Códigos de região do Cohen-Sutherland (BOTTOM é y < topo: a tela cresce para baixo)
+CS_LEFT, CS_RIGHT, CS_BOTTOM, CS_TOP = 1, 2, 4, 8
+
+# Classificação de cada segmento, como nos contadores edges_*
+EDGE_ACCEPTED, EDGE_REJECTED, EDGE_CLIPPED = 0, 1, 2
+EDGE_COUNTERS = ('edges_accepted', 'edges_rejected', 'edges_clipped')  # Contador de RenderStats de cada classe
+
+
+def is_rect(window):
+    """Se a janela é um retângulo (esquerda, topo, direita, base), e não um polígono convexo (M, 2)."""
+    return np.ndim(window) == 1
+
+
+def window_planes(window):
+    """Semiplanos de uma janela convexa: normais internas unitárias (M, 2) e termos c, com dentro ⇔ n·p + c ≥ 0.
+
+    O sentido dos vértices (horário ou anti-horário) sai do sinal da área;
+    bordas de comprimento zero (vértices repetidos) são ignoradas.
+    """
+    w = np.asarray(window, dtype=float).reshape(-1, 2)
+    edges = _following(w) - w
+    area = np.sum(w[:, 0] * _following(w)[:, 1] - _following(w)[:, 0] * w[:, 1])
+    normals = np.column_stack([-edges[:, 1], edges[:, 0]]) * (1.0 if area > 0 else -1.0)
+    lengths = np.hypot(normals[:, 0], normals[:, 1])
+    keep = lengths > 0
+    normals = normals[keep] / lengths[keep, None]
+    return normals, -np.einsum('ij,ij->i', normals, w[keep])
+
+
+def window_bounds(window):
+    """Retângulo envolvente (esquerda, topo, direita, base) de uma janela."""
+    if is_rect(window):
+        return tuple(window)
+    w = np.asarray(window, dtype=float).reshape(-1, 2)
+    return (*w.min(axis=0).tolist(), *w.max(axis=0).tolist())
+
+
+def points_in_window(points, window):
+    """Máscara dos pontos (N, 2) dentro da janela (bordas inclusivas)."""
+    pts = np.asarray(points, dtype=float).reshape(-1, 2)
+    if is_rect(window):
+        return _region_codes(pts[:, 0], pts[:, 1], window) == 0
+    normals, offsets = window_planes(window)
+    return (pts @ normals.T + offsets >= 0).all(axis=1)
+
+
+def circle_window_relation(center, radius, window, filled=False):
+    """Posição do contorno de um círculo em relação a uma janela convexa (retângulos: `circle_rect_relation`).
+
+    Pela distância do centro à reta de cada borda: além de uma delas por mais
+    que o raio, o círculo está fora; o raio até todas elas, dentro. Perto de
+    um canto o resultado é CROSSING, mesmo que o contorno não toque a janela.
+    Uma janela inteira dentro do círculo também é CROSSING (o que importa
+    para os círculos preenchidos, `filled`, como no retângulo).
+    """
+    if is_rect(window):
+        return circle_rect_relation(center, radius, window, filled)
+    normals, offsets = window_planes(window)
+    distances = normals @ np.asarray(center, dtype=float) + offsets
+    if (distances < -radius).any():
+        return OUTSIDE
+    if (distances >= radius).all():
+        return INSIDE
+    return CROSSING
+
+
+def bounds_window_relation(lo, hi, window):
+    """Posição de uma caixa envolvente em relação a uma janela convexa (teste conservador, como `bounds_rect_relation`)."""
+    if is_rect(window):
+        return bounds_rect_relation(lo, hi, window)
+    if bounds_rect_relation(lo, hi, window_bounds(window)) == OUTSIDE:
+        return OUTSIDE
+    corners = np.array([(lo[0], lo[1]), (hi[0], lo[1]), (hi[0], hi[1]), (lo[0], hi[1])], dtype=float)
+    normals, offsets = window_planes(window)
+    sides = corners @ normals.T + offsets
+    if (sides < 0).all(axis=0).any():
+        return OUTSIDE  # Uma borda da janela separa a caixa
+    if (sides >= 0).all():
+        return INSIDE
+    return CROSSING
+
+
+def _region_code(x, y, rect):
+    left, top, right, bottom = rect
+    code = 0
+    if x < left: code |= CS_LEFT
+    elif x > right: code |= CS_RIGHT
+    if y < top: code |= CS_BOTTOM
+    elif y > bottom: code |= CS_TOP
+    return code
+
+
+def cohen_sutherland(x1, y1, x2, y2, rect):
+    """Cohen-Sutherland de um segmento contra `rect` (bordas inclusivas).
+
+    Retorna ((x1, y1, x2, y2) truncados, ou None se o segmento some, classe
+    inicial EDGE_*). Para muitos segmentos, `cohen_sutherland_segments`.
+    """
+    left, top, right, bottom = rect
+    code1, code2 = _region_code(x1, y1, rect), _region_code(x2, y2, rect)
+    kind = EDGE_ACCEPTED if not (code1 | code2) else EDGE_REJECTED if code1 & code2 else EDGE_CLIPPED
+    while code1 | code2:
+        if code1 & code2:  # Ambos do mesmo lado externo
+            return None, kind
+        code_out = code1 if code1 else code2
+        if code_out & CS_TOP:
+            x, y = x1 + (x2 - x1) * (bottom - y1) / (y2 - y1), bottom
+        elif code_out & CS_BOTTOM:
+            x, y = x1 + (x2 - x1) * (top - y1) / (y2 - y1), top
+        elif code_out & CS_RIGHT:
+            x, y = right, y1 + (y2 - y1) * (right - x1) / (x2 - x1)
+        else:
+            x, y = left, y1 + (y2 - y1) * (left - x1) / (x2 - x1)
+        if code_out == code1:
+            x1, y1 = x, y
+            code1 = _region_code(x1, y1, rect)
+        else:
+            x2, y2 = x, y
+            code2 = _region_code(x2, y2, rect)
+    return (int(x1), int(y1), int(x2), int(y2)), kind
+
+
+def liang_barsky(p1, p2, rect):
+    """Liang-Barsky: ((u1, u2) do trecho p1 + u·(p2 - p1) dentro de `rect`, ou None; classe EDGE_*).
+
+    Bordas paralelas ao segmento (|p| < 1e-6) só rejeitam se ele estiver fora delas.
+    """
+    x1, y1 = p1; x2, y2 = p2
+    xmin, ymin, xmax, ymax = rect
+    dx, dy = x2 - x1, y2 - y1
+    p = [-dx, dx, -dy, dy]; q = [x1 - xmin, xmax - x1, y1 - ymin, ymax - y1]
+    u1, u2 = 0.0, 1.0
+    for i in range(4):
+        if abs(p[i]) < 1e-6:  # Paralela a uma borda do retângulo
+            if q[i] < 0: return None, EDGE_REJECTED
+        else:
+            t = q[i] / p[i]
+            if p[i] < 0: u1 = max(u1, t)
+            else: u2 = min(u2, t)
+    if u1 > u2: return None, EDGE_REJECTED  # Completamente fora
+    return (u1, u2), EDGE_ACCEPTED if u1 == 0.0 and u2 == 1.0 else EDGE_CLIPPED
+
+
+def _region_codes(x, y, rect):
+    left, top, right, bottom = rect
+    return (np.where(x < left, CS_LEFT, np.where(x > right, CS_RIGHT, 0)) |
+            np.where(y < top, CS_BOTTOM, np.where(y > bottom, CS_TOP, 0)))
+
+
+def cohen_sutherland_segments(segments, rect):
+    """Cohen-Sutherland em lote: segmentos (N, 4) = x1, y1, x2, y2 contra `rect` (bordas inclusivas).
+
+    Retorna (aceitos, recortados, classes): máscara dos segmentos que sobram,
+    array (N, 4) de inteiros (truncados como no `int` do laço; só vale onde
+    aceito) e a classe inicial de cada um (EDGE_ACCEPTED, EDGE_REJECTED ou
+    EDGE_CLIPPED). Cada passada move, em todos os segmentos ainda indecisos,
+    um extremo de fora até a borda indicada pelo código, na mesma ordem de
+    prioridade e com as mesmas contas de `cgcore.reference.cohen_sutherland`;
+    no máximo oito passadas decidem qualquer segmento.
+    """
+    seg = np.asarray(segments, dtype=float).reshape(-1, 4)
+    x1, y1, x2, y2 = (seg[:, i].copy() for i in range(4))
+    left, top, right, bottom = rect
+    code1, code2 = _region_codes(x1, y1, rect), _region_codes(x2, y2, rect)
+    classes = np.where((code1 | code2) == 0, EDGE_ACCEPTED,
+                       np.where(code1 & code2, EDGE_REJECTED, EDGE_CLIPPED))
+    accepted = np.zeros(len(seg), dtype=bool)
+    active = np.ones(len(seg), dtype=bool)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        while True:
+            accepted |= active & ((code1 | code2) == 0)
+            active &= ((code1 | code2) != 0) & ((code1 & code2) == 0)
+            if not active.any():
+                break
+            first = active & (code1 != 0)
+            out = np.where(first, code1, code2)
+            # Interseções com cada borda; a escolhida segue a prioridade do laço
+            x = np.select([out & CS_TOP != 0, out & CS_BOTTOM != 0],
+                          [x1 + (x2 - x1) * (bottom - y1) / (y2 - y1), x1 + (x2 - x1) * (top - y1) / (y2 - y1)],
+                          np.where(out & CS_RIGHT != 0, right, left))
+            y = np.select([out & CS_TOP != 0, out & CS_BOTTOM != 0, out & CS_RIGHT != 0],
+                          [bottom, top, y1 + (y2 - y1) * (right - x1) / (x2 - x1)],
+                          y1 + (y2 - y1) * (left - x1) / (x2 - x1))
+            second = active & ~first
+            x1, y1 = np.where(first, x, x1), np.where(first, y, y1)
+            x2, y2 = np.where(second, x, x2), np.where(second, y, y2)
+            code1 = np.where(first, _region_codes(x1, y1, rect), code1)
+            code2 = np.where(second, _region_codes(x2, y2, rect), code2)
+    clipped = np.zeros((len(seg), 4), dtype=np.int64)
+    clipped[accepted] = np.trunc(np.stack([x1, y1, x2, y2], axis=1)[accepted]).astype(np.int64)
+    return accepted, clipped, classes
+
+
+def liang_barsky_segments(starts, ends, rect):
+    """Liang-Barsky em lote: (u1, u2, classes EDGE_*) de cada segmento starts[i] → ends[i].
+
+    Mesmos testes de `liang_barsky`, para todos os segmentos de uma vez; nos
+    rejeitados, u1 e u2 não têm significado.
+    """
+    starts = np.asarray(starts, dtype=float).reshape(-1, 2)
+    ends = np.asarray(ends, dtype=float).reshape(-1, 2)
+    xmin, ymin, xmax, ymax = rect
+    x1, y1 = starts[:, 0], starts[:, 1]
+    dx, dy = ends[:, 0] - x1, ends[:, 1] - y1
+    u1, u2 = np.zeros(len(starts)), np.ones(len(starts))
+    rejected = np.zeros(len(starts), dtype=bool)
+    for p, q in ((-dx, x1 - xmin), (dx, xmax - x1), (-dy, y1 - ymin), (dy, ymax - y1)):
+        parallel = np.abs(p) < 1e-6  # Paralelo a uma borda: só rejeita se estiver fora dela
+        rejected |= parallel & (q < 0)
+        with np.errstate(divide='ignore', invalid='ignore'):
+            t = q / np.where(parallel, 1.0, p)
+        u1 = np.where(~parallel & (p < 0), np.maximum(u1, t), u1)
+        u2 = np.where(~parallel & (p > 0), np.minimum(u2, t), u2)
+    rejected |= u1 > u2
+    classes = np.where(rejected, EDGE_REJECTED, np.where((u1 == 0.0) & (u2 == 1.0), EDGE_ACCEPTED, EDGE_CLIPPED))
+    return u1, u2, classes
+
+
+def cyrus_beck_segments(starts, ends, window):
+    """Cyrus-Beck em lote contra uma janela convexa (M, 2): (u1, u2, classes EDGE_*) de cada segmento.
+
+    Todos os segmentos contra todas as bordas numa passada: a matriz (N, M) de
+    n·(p1 - e) + u·n·(p2 - p1) dá, em cada borda, o parâmetro em que o
+    segmento entra (u1 é o maior) ou sai (u2 é o menor) da janela. Como no
+    Liang-Barsky, um segmento paralelo a uma borda (|n·d| < 1e-6) só é
+    rejeitado se estiver fora dela; nos rejeitados, u1 e u2 não têm significado.
+    """
+    starts = np.asarray(starts, dtype=float).reshape(-1, 2)
+    ends = np.asarray(ends, dtype=float).reshape(-1, 2)
+    normals, offsets = window_planes(window)
+    distance = starts @ normals.T + offsets      # (N, M): distância do início a cada borda (≥ 0 dentro)
+    rate = (ends - starts) @ normals.T           # (N, M): variação dessa distância ao longo do segmento
+    parallel = np.abs(rate) < 1e-6
+    with np.errstate(divide='ignore', invalid='ignore'):
+        t = -distance / np.where(parallel, 1.0, rate)
+    u1 = np.max(np.where(~parallel & (rate > 0), t, 0.0), axis=1, initial=0.0)
+    u2 = np.min(np.where(~parallel & (rate < 0), t, 1.0), axis=1, initial=1.0)
+    rejected = (parallel & (distance < 0)).any(axis=1) | (u1 > u2)
+    classes = np.where(rejected, EDGE_REJECTED, np.where((u1 == 0.0) & (u2 == 1.0), EDGE_ACCEPTED, EDGE_CLIPPED))
+    return u1, u2, classes
+
+
+def _window_codes(points, window):
+    """Códigos de região generalizados: um bit por borda da janela que deixa o ponto de fora."""
+    if is_rect(window):
+        return _region_codes(points[:, 0], points[:, 1], window)
+    normals, offsets = window_planes(window)
+    outside = points @ normals.T + offsets < 0
+    return outside.astype(np.int64) @ (np.int64(1) << np.arange(len(offsets), dtype=np.int64))
+
+
+def clip_polyline(points, window, parts=None, closed=False, inside=False, visible=None, eps=0.0001):
+    """Trechos contínuos de uma linha poligonal fora da janela (corte) ou, com `inside`, dentro (recorte).
+
+    `parts` são os offsets [0, ..., N] das partes em `points` (padrão: uma
+    parte só); `closed` liga o último vértice de cada parte ao primeiro. Cada
+    aresta passa pelo Liang-Barsky em lote (Cyrus-Beck, se a janela for um
+    polígono convexo); pedaços com até `eps` do comprimento da aresta somem, e
+    os que encostam num vértice continuam o trecho da aresta vizinha. Arestas
+    com `visible[i]` falso (a que começa no vértice i) não entram nos trechos.
+    Devolve ((vértices, offsets) dos trechos, ou None se nenhuma aresta perdeu
+    pedaço; classes EDGE_* das arestas).
+    """
+    pts = np.asarray(points, dtype=float).reshape(-1, 2)
+    offsets = np.array([0, len(pts)]) if parts is None else np.asarray(parts)
+    first, last, part = [], [], []  # Vértices de cada aresta e a parte a que ela pertence
+    for i, (a, b) in enumerate(zip(offsets[:-1].tolist(), offsets[1:].tolist())):
+        count = b - a if closed and b - a > 1 else b - a - 1
+        if count < 1:
+            continue
+        index = np.arange(a, a + count)
+        first.append(index); last.append(np.where(index + 1 < b, index + 1, a)); part.append(np.full(count, i))
+    if not first:
+        return None, np.empty(0, dtype=int)
+    first, last, part = np.concatenate(first), np.concatenate(last), np.concatenate(part)
+    u1, u2, classes = (liang_barsky_segments if is_rect(window) else cyrus_beck_segments)(pts[first], pts[last], window)
+    rejected = classes == EDGE_REJECTED
+
+    # Até dois pedaços por aresta, como intervalos [lo, hi] do parâmetro
+    if inside:
+        lo, hi, keep = u1[:, None], u2[:, None], ~rejected[:, None]
+    else:
+        lo = np.column_stack([np.zeros(len(u1)), np.where(rejected, 0.0, u2)])
+        hi = np.column_stack([np.where(rejected, 1.0, u1), np.ones(len(u1))])
+        keep = np.column_stack([np.ones(len(u1), dtype=bool), ~rejected])
+    lo = np.where(lo <= eps, 0.0, lo)
+    hi = np.where(hi >= 1 - eps, 1.0, hi)
+    keep &= hi - lo > eps
+    whole = keep & (lo == 0) & (hi == 1)
+    if (keep.sum(axis=1) == 1).all() and whole.any(axis=1).all():
+        return None, classes  # Todas as arestas inteiras: a forma não muda
+    if visible is not None:
+        keep &= np.asarray(visible, dtype=bool)[first][:, None]
+
+    edge = np.broadcast_to(np.arange(len(first))[:, None], keep.shape)[keep]
+    if not len(edge):
+        return (np.empty((0, 2)), np.zeros(1, dtype=int)), classes  # Nada sobrou
+    lo, hi = lo[keep], hi[keep]
+    start, end = pts[first[edge]], pts[last[edge]]
+    head = np.where((lo == 0)[:, None], start, start + lo[:, None] * (end - start))
+    tail = np.where((hi == 1)[:, None], end, start + hi[:, None] * (end - start))
+    # Um pedaço continua o anterior se os dois encostam no vértice que une arestas seguidas da mesma parte
+    joined = np.zeros(len(edge), dtype=bool)
+    joined[1:] = (hi[:-1] == 1) & (lo[1:] == 0) & (edge[1:] == edge[:-1] + 1) & (part[edge[1:]] == part[edge[:-1]])
+    vertices = np.stack([head, tail], axis=1)[np.column_stack([~joined, np.ones(len(edge), dtype=bool)])]
+    heads = np.flatnonzero(~joined)  # Primeiro pedaço de cada trecho
+    sizes = np.diff(np.append(heads, len(edge))) + 1
+    runs = np.split(vertices, np.cumsum(sizes)[:-1])
+    if closed:
+        # O trecho que passa pelo primeiro vértice de uma parte fechada começa no fim dela e continua no início
+        tails, run_part = np.append(heads[1:], len(edge)) - 1, part[edge[heads]]
+        merged = []
+        for i, run in enumerate(runs):
+            if i + 1 < len(runs) and run_part[i + 1] == run_part[i]:
+                merged.append(run); continue
+            j = np.searchsorted(run_part, run_part[i])  # Primeiro trecho da parte
+            a, b = heads[j], tails[i]
+            if j < i and lo[a] == 0 and hi[b] == 1 and first[edge[a]] == last[edge[b]]:
+                merged[j - i] = np.concatenate([run, merged[j - i][1:]])
+            else:
+                merged.append(run)
+        runs = merged
+    sizes = [len(run) for run in runs]
+    return (np.concatenate(runs), np.concatenate([[0], np.cumsum(sizes)])), classes
+
+
+def _following(values):
+    """O elemento seguinte de cada posição, dando a volta (np.roll(values, -1), sem o custo fixo do roll)."""
+    return np.concatenate((values[1:], values[:1]))
+
+
+def _clip_planes(window):
+    """Bordas da janela, uma por vez: (eixo, limite, acima) no retângulo, (normal, termo) no polígono convexo."""
+    if is_rect(window):
+        left, top, right, bottom = window
+        return ((0, left, True), (0, right, False), (1, top, True), (1, bottom, False))
+    return zip(*window_planes(window))
+
+
+def _plane_crossings(pts, plane):
+    """Lado de cada vértice (dentro ou sobre a borda) e interseção da aresta i → i+1 com a reta da borda.
+
+    Devolve (None, None) se todos os vértices estão do lado de dentro.
+    """
+    if len(plane) == 3:  # Borda de retângulo: compara só uma coordenada
+        axis, bound, above = plane
+        inside = pts[:, axis] >= bound if above else pts[:, axis] <= bound
+    else:
+        normal, offset = plane
+        side = pts @ normal + offset
+        inside = side >= 0
+    if inside.all():
+        return None, None
+    nxt = _following(pts)
+    with np.errstate(divide='ignore', invalid='ignore'):  # Arestas paralelas à borda não a cruzam
+        if len(plane) == 3:
+            t = (bound - pts[:, axis]) / (nxt[:, axis] - pts[:, axis])
+        else:
+            t = side / (side - _following(side))
+        cross = pts + t[:, None] * (nxt - pts)
+    if len(plane) == 3:
+        cross[:, axis] = bound  # Exatamente sobre a borda
+    return inside, cross
+
+
+def sutherland_hodgman(points, window, visible=None):
+    """Sutherland-Hodgman de um polígono fechado contra a janela, vetorizado sobre os vértices.
+
+    Recorta contra uma borda por vez; em cada passo, a aresta i → i+1 gera
+    até dois vértices de uma vez para todo o polígono: a interseção com a
+    borda, se a cruza, e o vértice i+1, se ele está dentro. `visible[i]` diz
+    se a aresta i é desenhada (padrão: todas); as arestas novas, sobre a borda
+    da janela (inclusive as pontes degeneradas entre pedaços de um polígono
+    côncavo), saem invisíveis, para que o contorno desenhado continue o
+    original. Vértices repetidos em seguida são fundidos.
+
+    Devolve ((vértices, visíveis) do polígono recortado, com menos de três
+    vértices se nada sobrou, ou None se ele está inteiro dentro; classes
+    EDGE_* das arestas originais).
+    """
+    pts = np.asarray(points, dtype=float).reshape(-1, 2)
+    vis = np.ones(len(pts), dtype=bool) if visible is None else np.asarray(visible, dtype=bool)
+    codes = _window_codes(pts, window)
+    following = _following(codes)
+    classes = np.where((codes | following) == 0, EDGE_ACCEPTED, np.where(codes & following, EDGE_REJECTED, EDGE_CLIPPED))
+    if not codes.any():
+        return None, classes
+    for plane in _clip_planes(window):
+        if not len(pts):
+            break
+        inside, cross = _plane_crossings(pts, plane)
+        if inside is None:
+            continue  # Nenhum vértice além desta borda
+        inside_next = _following(inside)
+        # A aresta que sai da interseção é a original se o polígono está entrando, e a borda se está saindo
+        keep = np.column_stack([inside != inside_next, inside_next])
+        pts = np.stack([cross, _following(pts)], axis=1)[keep]
+        vis = np.column_stack([vis & inside_next, _following(vis)])[keep]
+    distinct = (pts != _following(pts)).any(axis=1)  # Aresta i com comprimento
+    return (pts[distinct], vis[distinct]), classes
+
+
+def split_at_window(points, window):
+    """Os vértices de um polígono fechado com as interseções de suas arestas com as bordas da janela inseridas.
+
+    Corta as arestas borda a borda como `sutherland_hodgman`, sem descartar o
+    que fica de fora: as arestas do recorte que vêm do polígono são então
+    arestas desta lista, com os mesmos extremos bit a bit. Assim o polígono
+    menos o seu recorte (anel com ponte) se anula exatamente também depois
+    do arredondamento para a tela.
+    """
+    pts = np.asarray(points, dtype=float).reshape(-1, 2)
+    for plane in _clip_planes(window):
+        inside, cross = _plane_crossings(pts, plane)
+        if inside is None:
+            continue
+        crossing = inside != _following(inside)
+        pts = np.stack([pts, cross], axis=1)[np.column_stack([np.ones(len(pts), dtype=bool), crossing])]
+    return pts
+
+
+def visible_runs(points, visible):
+    """Linhas abertas formadas pelas arestas visíveis de um polígono fechado (aresta i: vértice i → i+1)."""
+    pts = np.asarray(points, dtype=float).reshape(-1, 2)
+    hidden = np.flatnonzero(~np.asarray(visible, dtype=bool))
+    if not len(hidden):
+        return [np.vstack([pts, pts[:1]])]
+    # Começa depois da última aresta invisível, para nenhuma linha dar a volta no fim do array
+    order = np.roll(np.arange(len(pts)), -(hidden[-1] + 1))
+    runs = np.split(pts[order], np.flatnonzero(~np.asarray(visible, dtype=bool)[order]) + 1)
+    return [run for run in runs if len(run) > 1]
+
+
+
+def clip_mask(mask, p0, p1, window, inside=True):
+    """Recorte de uma máscara raster [x, y] esticada entre os cantos `p0` e `p1` (invertidos = espelhada).
+
+    Ficam as células marcadas cujo centro está dentro da janela (`inside`) ou
+    fora dela (corte); a máscara é aparada à caixa das que sobraram e os cantos
+    são refeitos na grade original, no mesmo sentido. Devolve (máscara, p0, p1),
+    os argumentos como vieram se nenhuma célula saiu, ou None se nada sobrou.
+    """
+    mask = np.asarray(mask, dtype=bool)
+    p0, p1 = np.asarray(p0, dtype=float), np.asarray(p1, dtype=float)
+    step = (p1 - p0) / mask.shape
+    cols, rows = np.nonzero(mask)
+    centers = p0 + step * (np.column_stack([cols, rows]) + 0.5)
+    keep = points_in_window(centers, window) == inside
+    if keep.all():
+        return mask, p0, p1
+    if not keep.any():
+        return None
+    cols, rows = cols[keep], rows[keep]
+    x0, x1, y0, y1 = cols.min(), cols.max() + 1, rows.min(), rows.max() + 1
+    clipped = np.zeros((x1 - x0, y1 - y0), dtype=bool)
+    clipped[cols - x0, rows - y0] = True
+    return clipped, p0 + step * (x0, y0), p0 + step * (x1, y1)
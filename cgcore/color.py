@@ -0,0 +1,85 @@
+"""Conversão de cores vetorizada e geração do campo da roda cromática."""
+import os
+import tempfile
+
+import numpy as np
+
+# Versão do formato gravado em disco (mudar invalida os caches antigos)
+WHEEL_CACHE_VERSION = 1
+
+
+def hsv_to_rgb_array(h, s, v):
+    """Versão vetorizada de colorsys.hsv_to_rgb; devolve um array (..., 3) em [0, 1]."""
+    h, s, v = np.broadcast_arrays(np.asarray(h, dtype=float), np.asarray(s, dtype=float),
+                                  np.asarray(v, dtype=float))
+    i = (h * 6.0).astype(int)  # Mesmo truncamento de int() usado pelo colorsys
+    f = h * 6.0 - i
+    p = v * (1.0 - s)
+    q = v * (1.0 - s * f)
+    t = v * (1.0 - s * (1.0 - f))
+    i = i % 6
+    r = np.choose(i, [v, q, p, p, t, v])
+    g = np.choose(i, [t, v, v, q, p, p])
+    b = np.choose(i, [p, p, t, v, v, q])
+    rgb = np.stack([r, g, b], axis=-1)
+    # Saturação zero é cinza puro no colorsys
+    gray = s == 0.0
+    rgb[gray] = v[gray][:, None]
+    return rgb
+
+
+def color_wheel_field(radius, inner_radius=0.0):
+    """Calcula as cores da roda (hue pelo ângulo, saturação pela distância).
+
+    Devolve `(rgb, mask)` com formato (2r+1, 2r+1), indexados por [x, y] como
+    no pygame.surfarray; `mask` marca os pixels que pertencem ao anel.
+    """
+    offsets = np.arange(2 * radius + 1) - radius
+    dx, dy = np.meshgrid(offsets, offsets, indexing='ij')
+    distance = np.sqrt(dx * dx + dy * dy)
+    mask = (distance >= inner_radius) & (distance <= radius)
+
+    hue = (np.arctan2(dy, dx) + np.pi) / (2 * np.pi)
+    saturation = np.clip((distance - inner_radius) / (radius - inner_radius), 0.0, 1.0)
+    rgb = (hsv_to_rgb_array(hue, saturation, 1.0) * 255).astype(np.uint8)
+    rgb[~mask] = 0
+    return rgb, mask
+
+
+def default_cache_dir():
+    """Pasta de cache do usuário (pode ser trocada pela variável PAINTCG_CACHE_DIR)."""
+    return os.environ.get('PAINTCG_CACHE_DIR') or os.path.join(os.path.expanduser('~'), '.cache', 'paintcg')
+
+
+def load_color_wheel(radius, inner_radius=0.0, cache_dir=None, use_cache=True):
+    """Lê o campo da roda do cache em disco (chave: raios) ou calcula e grava."""
+    if not use_cache:
+        return color_wheel_field(radius, inner_radius)
+
+    cache_dir = cache_dir or default_cache_dir()
+    name = f"wheel_v{WHEEL_CACHE_VERSION}_r{radius}_i{inner_radius:g}.npz"
+    path = os.path.join(cache_dir, name)
+    try:
+        with np.load(path) as data:
+            rgb, mask = data['rgb'], data['mask']
+        if rgb.shape == (2 * radius + 1, 2 * radius + 1, 3):
+            return rgb, mask
+    except (OSError, KeyError, ValueError):
+        pass  # Cache ausente ou corrompido: recalcula
+
+    rgb, mask = color_wheel_field(radius, inner_radius)
+    try:
+        os.makedirs(cache_dir, exist_ok=True)
+        # Grava em arquivo temporário e renomeia para nunca deixar cache pela metade
+        fd, tmp_path = tempfile.mkstemp(dir=cache_dir, suffix='.tmp')
+        try:
+            with os.fdopen(fd, 'wb') as f:
+                np.savez(f, rgb=rgb, mask=mask)
+            os.replace(tmp_path, path)
+        except BaseException:
+            if os.path.exists(tmp_path):  # Disco cheio, por exemplo: não deixa um .tmp órfão a cada execução
+                os.remove(tmp_path)
+            raise
+    except OSError:
+        pass  # Sem permissão de escrita: segue apenas com o campo em memória
+    return rgb, mask
@@ -0,0 +1,79 @@
+"""Preenchimento por inundação (balde de tinta) com pilha de trechos."""
+from bisect import bisect_right
+
+import numpy as np
+
+
+def region_runs(region):
+    """Trechos horizontais de uma região booleana [y, x]: arrays (linha, início, fim exclusivo).
+
+    Calculados para a imagem inteira de uma vez; ficam ordenados por linha e,
+    dentro da linha, por início.
+    """
+    height, width = region.shape
+    padded = np.zeros((height, width + 2), dtype=bool)
+    padded[:, 1:-1] = region
+    rows, cols = np.nonzero(padded[:, 1:] != padded[:, :-1])
+    return rows[::2], cols[::2], cols[1::2]
+
+
+def flood_fill_mask(region, seed):
+    """Componente 4-conexa de `region` (booleano [y, x]) que contém `seed` = (x, y).
+
+    Scanline com pilha explícita de trechos: os trechos de cada linha são
+    extraídos de uma vez com NumPy; a partir do trecho da semente, cada trecho
+    retirado da pilha empilha os trechos das linhas de cima e de baixo que o
+    tocam (encontrados por busca binária). Sem recursão, então regiões do
+    tamanho da janela não estouram a pilha do Python, e o custo é proporcional
+    ao número de trechos, não de pixels.
+    """
+    height, width = region.shape
+    mask = np.zeros((height, width), dtype=bool)
+    x, y = seed
+    if not (0 <= x < width and 0 <= y < height) or not region[y, x]:
+        return mask
+
+    rows, starts, ends = region_runs(region)
+    row_ptr = np.searchsorted(rows, np.arange(height + 1)).tolist()
+    rows, starts, ends = rows.tolist(), starts.tolist(), ends.tolist()
+    visited = bytearray(len(starts))
+
+    first = bisect_right(starts, x, row_ptr[y], row_ptr[y + 1]) - 1
+    stack = [first]
+    visited[first] = 1
+    while stack:
+        run = stack.pop()
+        ry = rows[run]
+        left, right = starts[run], ends[run]
+        mask[ry, left:right] = True
+        for ny in (ry - 1, ry + 1):
+            if not 0 <= ny < height:
+                continue
+            lo, hi = row_ptr[ny], row_ptr[ny + 1]
+            # Trechos da linha vizinha que começam antes de `right` e terminam depois de `left`
+            i = max(lo, bisect_right(ends, left, lo, hi))
+            while i < hi and starts[i] < right:
+                if not visited[i]:
+                    visited[i] = 1
+                    stack.append(i)
+                i += 1
+    return mask
+
+
+def flood_fill(image, seed, tolerance=0):
+    """Máscara [x, y] da região da cor do pixel `seed` conectada a ele.
+
+    `image` segue a convenção do pygame.surfarray: [x, y, canal] (array3d) ou
+    [x, y] com as cores já mapeadas em inteiros (array2d, a forma mais rápida).
+    Com `tolerance`, pixels cuja diferença para a cor da semente não passa
+    dela em cada canal pertencem à mesma região (só para imagens [x, y, canal]).
+    """
+    x, y = seed
+    if image.ndim == 2:
+        region = image == image[x, y]
+    elif tolerance:
+        target = image[x, y].astype(np.int16)
+        region = np.all(np.abs(image.astype(np.int16) - target) <= tolerance, axis=-1)
+    else:
+        region = np.all(image == image[x, y], axis=-1)
+    return flood_fill_mask(np.ascontiguousarray(region.T), (x, y)).T
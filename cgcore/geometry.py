@@ -0,0 +1,41 @@
+"""Grandezas derivadas dos pontos de uma forma (caixa, centroide, vértices), guardadas por versão."""
+import numpy as np
+
+from cgcore.raster import ellipse_terms
+
+
+class ShapeGeometry:
+    """Caixa envolvente, soma e centroide dos vértices e extensão da tinta de uma forma.
+
+    Calculada de uma vez sobre os pontos de uma `version` da forma; quem a
+    guarda (o `Shape.geometry` dos aplicativos) a refaz quando a versão ou o
+    tipo mudam. `lo`/`hi` são a caixa dos vértices; `extent` é a caixa do que
+    a forma desenha: centro ± raio no círculo, centro ± meias extensões na
+    elipse (pontos = centro e extremos de dois semieixos conjugados) e a
+    própria caixa dos vértices nas demais.
+    """
+
+    def __init__(self, shape_type, points, version=None):
+        pts = np.asarray(points, dtype=float).reshape(-1, 2)
+        self.type = shape_type
+        self.version = version
+        self.count = len(pts)
+        if self.count:
+            self.sum, self.lo, self.hi = pts.sum(axis=0), pts.min(axis=0), pts.max(axis=0)
+        else:
+            self.sum, self.lo, self.hi = np.zeros(2), np.full(2, np.inf), np.full(2, -np.inf)
+        self.centroid = self.sum / self.count if self.count else None
+        if shape_type == 'circle' and self.count >= 2:
+            radius = np.linalg.norm(pts[1] - pts[0])
+            self.extent = (pts[0] - radius, pts[0] + radius)
+        elif shape_type == 'ellipse' and self.count >= 3:
+            ex, ey, _, _ = ellipse_terms(pts[1] - pts[0], pts[2] - pts[0])
+            self.extent = (pts[0] - (ex, ey), pts[0] + (ex, ey))
+        else:
+            self.extent = (self.lo, self.hi)
+
+    def near(self, point, margin=0.0):
+        """Se `point` está na extensão da forma alargada por `margin` (filtro antes de um teste exato)."""
+        (lo_x, lo_y), (hi_x, hi_y) = self.extent
+        return lo_x - margin <= point[0] <= hi_x + margin and lo_y - margin <= point[1] <= hi_y + margin
+
@@ -0,0 +1,141 @@
+"""Teste de clique vetorizado: distância do cursor a todas as formas de uma vez."""
+import numpy as np
+
+
+class HitScene:
+    """Geometria da cena achatada em arrays NumPy para o teste de clique.
+
+    As formas entram com um índice (`owner`, normalmente a posição na lista de
+    formas) e viram segmentos, círculos e pontos. Uma consulta calcula a
+    distância do cursor a todos os candidatos de uma vez; a tinta da forma
+    (metade da espessura) é descontada da distância.
+    """
+
+    def __init__(self):
+        self._segments = []  # (owner, a, b, meia espessura, fechada)
+        self._circles = []   # (owner, centro, raio, meia espessura)
+        self._points = []    # (owner, posição, meia espessura)
+        self.count = 0       # Maior owner + 1
+        self._compiled = False
+
+    def add_polyline(self, owner, points, thickness=1, closed=False):
+        """Adiciona uma linha poligonal; `closed` liga o último ponto ao primeiro."""
+        pts = np.asarray(points, dtype=float).reshape(-1, 2)
+        if len(pts) == 1:
+            self.add_point(owner, pts[0], thickness)
+            return
+        if closed and len(pts) > 2:
+            a, b = pts, np.roll(pts, -1, axis=0)
+        else:
+            a, b = pts[:-1], pts[1:]
+            closed = False
+        self._segments.append((owner, a, b, thickness / 2, closed))
+        self._touch(owner)
+
+    def add_circle(self, owner, center, radius, thickness=1):
+        self._circles.append((owner, center, radius, thickness / 2))
+        self._touch(owner)
+
+    def add_point(self, owner, position, thickness=1):
+        self._points.append((owner, position, thickness / 2))
+        self._touch(owner)
+
+    def _touch(self, owner):
+        self.count = max(self.count, owner + 1)
+        self._compiled = False
+
+    def _compile(self):
+        """Concatena os blocos de cada tipo em arrays únicos."""
+        if self._compiled:
+            return
+        if self._segments:
+            sizes = [len(a) for _, a, _, _, _ in self._segments]
+            self.seg_a = np.concatenate([a for _, a, _, _, _ in self._segments])
+            self.seg_b = np.concatenate([b for _, _, b, _, _ in self._segments])
+            self.seg_owner = np.repeat([o for o, _, _, _, _ in self._segments], sizes)
+            self.seg_half = np.repeat([h for _, _, _, h, _ in self._segments], sizes)
+            self.seg_closed = np.repeat([c for _, _, _, _, c in self._segments], sizes)
+        else:
+            self.seg_a = self.seg_b = np.empty((0, 2))
+            self.seg_owner = np.empty(0, dtype=int)
+            self.seg_half = np.empty(0)
+            self.seg_closed = np.empty(0, dtype=bool)
+        # Retângulos envolventes (com a tinta) em colunas contíguas: o filtro grosso
+        # compara quatro vetores 1D, bem mais barato que operar sobre arrays (M, 2)
+        lo = np.minimum(self.seg_a, self.seg_b) - self.seg_half[:, None]
+        hi = np.maximum(self.seg_a, self.seg_b) + self.seg_half[:, None]
+        self.seg_bounds = [np.ascontiguousarray(c) for c in (lo[:, 0], lo[:, 1], hi[:, 0], hi[:, 1])]
+        # Arestas dos polígonos fechados, separadas para o teste de interior
+        self.closed_a = self.seg_a[self.seg_closed]
+        self.closed_b = self.seg_b[self.seg_closed]
+        self.closed_owner = self.seg_owner[self.seg_closed]
+        self.circ_owner = np.array([c[0] for c in self._circles], dtype=int)
+        self.circ_center = np.array([c[1] for c in self._circles], dtype=float).reshape(-1, 2)
+        self.circ_radius = np.array([c[2] for c in self._circles], dtype=float)
+        self.circ_half = np.array([c[3] for c in self._circles], dtype=float)
+        self.pt_owner = np.array([p[0] for p in self._points], dtype=int)
+        self.pt_pos = np.array([p[1] for p in self._points], dtype=float).reshape(-1, 2)
+        self.pt_half = np.array([p[2] for p in self._points], dtype=float)
+        self._compiled = True
+
+    def distances(self, pos, limit=np.inf):
+        """Distância de `pos` à tinta de cada owner (inf para quem está além de `limit`).
+
+        O interior de polígonos fechados conta como distância `limit`: um clique
+        dentro do polígono o seleciona, mas a tinta de outra forma mais próxima vence.
+        """
+        self._compile()
+        p = np.asarray(pos, dtype=float)
+        best = np.full(self.count, np.inf)
+
+        # Segmentos: descarta pelo retângulo envolvente antes da conta exata
+        lo_x, lo_y, hi_x, hi_y = self.seg_bounds
+        px, py = p
+        near = np.flatnonzero((lo_x <= px + limit) & (hi_x >= px - limit) &
+                              (lo_y <= py + limit) & (hi_y >= py - limit))
+        if len(near):
+            a, b = self.seg_a[near], self.seg_b[near]
+            ab = b - a
+            length2 = np.einsum('ij,ij->i', ab, ab)
+            t = np.einsum('ij,ij->i', p - a, ab) / np.where(length2 > 0, length2, 1)
+            closest = a + np.clip(t, 0, 1)[:, None] * ab
+            d = np.hypot(*(p - closest).T) - self.seg_half[near]
+            np.minimum.at(best, self.seg_owner[near], np.maximum(d, 0))
+
+        if len(self.circ_owner):
+            d = np.abs(np.hypot(*(p - self.circ_center).T) - self.circ_radius) - self.circ_half
+            np.minimum.at(best, self.circ_owner, np.maximum(d, 0))
+
+        if len(self.pt_owner):
+            d = np.hypot(*(p - self.pt_pos).T) - self.pt_half
+            np.minimum.at(best, self.pt_owner, np.maximum(d, 0))
+
+        if np.isfinite(limit):
+            inside = self.inside_polygons(p)
+            best[inside] = np.minimum(best[inside], limit)
+            best[best > limit] = np.inf
+        return best
+
+    def inside_polygons(self, pos):
+        """Máscara dos owners cujo polígono fechado contém `pos` (regra par-ímpar)."""
+        self._compile()
+        px, py = pos
+        a, b = self.closed_a, self.closed_b
+        crosses = np.flatnonzero((a[:, 1] > py) != (b[:, 1] > py))
+        a, b = a[crosses], b[crosses]
+        x_hit = a[:, 0] + (py - a[:, 1]) * (b[:, 0] - a[:, 0]) / (b[:, 1] - a[:, 1])
+        owners = self.closed_owner[crosses][px < x_hit]
+        return np.bincount(owners, minlength=self.count) % 2 == 1
+
+    def pick(self, pos, tolerance):
+        """Owner mais próximo de `pos` dentro da tolerância, ou None.
+
+        Empates ficam com o owner de maior índice (a forma desenhada por cima).
+        """
+        if not self.count:
+            return None
+        best = self.distances(pos, tolerance)
+        nearest = best.min()
+        if not np.isfinite(nearest):
+            return None
+        return int(np.flatnonzero(best == nearest)[-1])
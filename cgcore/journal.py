@@ -0,0 +1,277 @@
+"""Diário binário das alterações da cena entre dois autosaves, para recuperação após falha.
+
+Cada registro é `op (1 byte) + tamanho (4 bytes) + dados + crc32`; um
+registro truncado ou corrompido no fim do arquivo (queda no meio da
+gravação) encerra a leitura. O custo de cada registro é proporcional à
+alteração: uma transformação grava a matriz e os uids, não os pontos.
+As formas são identificadas pelo atributo `uid`.
+"""
+import itertools
+import os
+import struct
+import zlib
+
+import numpy as np
+
+from cgcore.fill import EVEN_ODD, NONZERO
+
+# Operações do diário
+ADD = 1        # Forma nova no fim da lista
+DELETE = 2     # Formas removidas (uids)
+REPLACE = 3    # Uma forma trocada, no mesmo lugar da lista, por outras (corte/recorte)
+TRANSFORM = 4  # Matriz homogênea 3×3 aplicada às formas (uids)
+MOVE = 5       # Translação somada aos pontos das formas (uids)
+FILL = 6       # Preenchimento e regra de cada forma (uid, preenchida, regra)
+CLEAR = 7      # Canvas limpo
+
+SHAPE_TYPES = ('point', 'line', 'circle', 'ellipse', 'polygon', 'freehand', 'fill', 'polyline')
+FILL_RULES = (EVEN_ODD, NONZERO)
+
+_RECORD = struct.Struct('<BI')
+_CRC = struct.Struct('<I')
+_SHAPE = struct.Struct('<QB3BdBBIII')  # uid, tipo, cor, espessura, preenchida, regra, pontos, máscara (l × a)
+_COUNT = struct.Struct('<I')
+_FILL = struct.Struct('<QBB')
+_VISIBLE_EDGES = 0x80  # Bit no byte do tipo: a visibilidade das arestas (1 bit por vértice) vem no fim do registro
+
+
+def _uids(shapes):
+    uids = np.fromiter((shape.uid for shape in shapes), dtype='<u8')
+    return _COUNT.pack(len(uids)) + uids.tobytes()
+
+
+def _encode_shape(shape):
+    points = shape.points
+    if not isinstance(points, np.ndarray):  # Lista de tuplas: fromiter evita um objeto por ponto
+        points = np.fromiter(itertools.chain.from_iterable(points), dtype=float, count=2 * len(points))
+    points = np.ascontiguousarray(points, dtype='<f8').reshape(-1, 2)
+    mask = shape.patch.mask if getattr(shape, 'patch', None) is not None else None
+    width, height = mask.shape if mask is not None else (0, 0)
+    visible = getattr(shape, 'visible_edges', None)
+    kind = SHAPE_TYPES.index(shape.type) | (_VISIBLE_EDGES if visible is not None else 0)
+    header = _SHAPE.pack(shape.uid, kind, *tuple(shape.color)[:3], shape.thickness,
+                         bool(shape.filled), FILL_RULES.index(shape.fill_rule), len(points), width, height)
+    bits = np.packbits(mask).tobytes() if mask is not None else b''
+    if shape.type == 'polyline':  # Offsets das partes, depois dos pontos (só neste tipo; os demais registros não mudam)
+        parts = np.asarray(shape.parts, dtype='<u4')
+        bits += _COUNT.pack(len(parts)) + parts.tobytes()
+    if visible is not None:
+        bits += np.packbits(np.asarray(visible, dtype=bool)).tobytes()
+    return header + points.tobytes() + bits
+
+
+def _decode_shape(data, offset):
+    uid, kind, r, g, b, thickness, filled, rule, count, width, height = _SHAPE.unpack_from(data, offset)
+    has_visible, kind = kind & _VISIBLE_EDGES, kind & ~_VISIBLE_EDGES
+    offset += _SHAPE.size
+    points = np.frombuffer(data, dtype='<f8', count=2 * count, offset=offset).reshape(-1, 2).astype(float)
+    offset += 16 * count
+    mask = None
+    if width and height:
+        size = (width * height + 7) // 8
+        bits = np.frombuffer(data, dtype=np.uint8, count=size, offset=offset)
+        mask = np.unpackbits(bits, count=width * height).reshape(width, height).astype(bool)
+        offset += size
+    parts = None
+    if SHAPE_TYPES[kind] == 'polyline':
+        (size,) = _COUNT.unpack_from(data, offset)
+        parts = np.frombuffer(data, dtype='<u4', count=size, offset=offset + _COUNT.size).astype(int)
+        offset += _COUNT.size + 4 * size
+    visible = None
+    if has_visible:
+        size = (count + 7) // 8
+        visible = np.unpackbits(np.frombuffer(data, dtype=np.uint8, count=size, offset=offset), count=count).astype(bool)
+        offset += size
+    record = {'uid': uid, 'type': SHAPE_TYPES[kind], 'points': points, 'color': (r, g, b),
+              'thickness': int(thickness) if thickness.is_integer() else thickness,
+              'filled': bool(filled), 'fill_rule': FILL_RULES[rule], 'mask': mask, 'parts': parts,
+              'visible_edges': visible}
+    return record, offset
+
+
+def _decode_uids(data, offset=0):
+    (count,) = _COUNT.unpack_from(data, offset)
+    offset += _COUNT.size
+    return np.frombuffer(data, dtype='<u8', count=count, offset=offset).tolist(), offset + 8 * count
+
+
+def read_journal(path):
+    """Registros (op, dados) de um arquivo do diário, até o primeiro registro incompleto ou corrompido."""
+    try:
+        with open(path, 'rb') as f:
+            data = f.read()
+    except OSError:
+        return
+    offset = 0
+    while offset + _RECORD.size <= len(data):
+        op, size = _RECORD.unpack_from(data, offset)
+        start, end = offset + _RECORD.size, offset + _RECORD.size + size
+        if end + _CRC.size > len(data) or _CRC.unpack_from(data, end)[0] != zlib.crc32(data[offset:end]):
+            return
+        payload = data[start:end]
+        offset = end + _CRC.size
+        if op == ADD:
+            yield op, _decode_shape(payload, 0)[0]
+        elif op == DELETE:
+            yield op, _decode_uids(payload)[0]
+        elif op == REPLACE:
+            uid, count = struct.unpack_from('<QI', payload)
+            position, shapes = 12, []
+            for _ in range(count):
+                shape, position = _decode_shape(payload, position)
+                shapes.append(shape)
+            yield op, (uid, shapes)
+        elif op == TRANSFORM:
+            uids, position = _decode_uids(payload)
+            yield op, (uids, np.frombuffer(payload, dtype='<f8', count=9, offset=position).reshape(3, 3).astype(float))
+        elif op == MOVE:
+            uids, position = _decode_uids(payload)
+            yield op, (uids, np.frombuffer(payload, dtype='<f8', count=2, offset=position).astype(float))
+        elif op == FILL:
+            (count,) = _COUNT.unpack_from(payload)
+            yield op, [(uid, bool(filled), FILL_RULES[rule])
+                       for uid, filled, rule in _FILL.iter_unpack(payload[_COUNT.size:_COUNT.size + count * _FILL.size])]
+        elif op == CLEAR:
+            yield op, None
+
+
+def replay_journal(paths, shapes, make_shape, transform, move=None):
+    """Reaplica os registros dos arquivos `paths` (em ordem) sobre a lista `shapes`; devolve a lista nova.
+
+    `make_shape(registro)` recria uma forma (com o uid gravado);
+    `transform(formas, matriz)` e `move(formas, deslocamento)` são os mesmos
+    métodos usados pelo aplicativo ao vivo, para que o resultado seja idêntico.
+    """
+    shapes = list(shapes)
+    for path in paths:
+        for op, data in read_journal(path):
+            if op == ADD:
+                shapes.append(make_shape(data))
+            elif op == DELETE:
+                gone = set(data)
+                shapes = [s for s in shapes if s.uid not in gone]
+            elif op == REPLACE:
+                uid, records = data
+                index = next((i for i, s in enumerate(shapes) if s.uid == uid), None)
+                if index is not None:
+                    shapes[index:index + 1] = [make_shape(r) for r in records]
+            elif op in (TRANSFORM, MOVE):
+                uids, value = set(data[0]), data[1]
+                (transform if op == TRANSFORM else move)([s for s in shapes if s.uid in uids], value)
+            elif op == FILL:
+                styles = {uid: (filled, rule) for uid, filled, rule in data}
+                for s in shapes:
+                    if s.uid in styles:
+                        s.filled, s.fill_rule = styles[s.uid]
+            elif op == CLEAR:
+                shapes = []
+    return shapes
+
+
+class Journal:
+    """Arquivo do diário aberto para acréscimo, com buffer; um arquivo por autosave (`rotate`).
+
+    Os registros vão para o buffer do arquivo na hora da alteração e para o
+    sistema operacional em `flush` (uma vez por quadro). A troca de arquivo não
+    faz fsync, para não parar o quadro: o que ficou no arquivo anterior já está
+    no autosave que o sucede, gravado com fsync pela thread de autosave. Só o
+    fechamento faz fsync. Fechado, todos os métodos são no-ops.
+    """
+
+    PREFIX = 'journal-'
+
+    def __init__(self, directory, buffer_size=1 << 16):
+        self.directory = directory
+        self.buffer_size = buffer_size
+        self._file = None
+
+    def path(self, sequence):
+        return os.path.join(self.directory, f'{self.PREFIX}{sequence:06d}.bin')
+
+    def rotate(self, sequence):
+        """Fecha o arquivo atual e passa a gravar no arquivo que segue o autosave `sequence`."""
+        if self._file is not None:
+            self._file.close()
+        self._file = open(self.path(sequence), 'ab', buffering=self.buffer_size)
+
+    def _append(self, op, payload):
+        if self._file is None:
+            return
+        head = _RECORD.pack(op, len(payload))
+        self._file.write(head)
+        self._file.write(payload)
+        self._file.write(_CRC.pack(zlib.crc32(payload, zlib.crc32(head))))
+
+    def add(self, shape):
+        self._append(ADD, _encode_shape(shape))
+
+    def delete(self, shapes):
+        if shapes:
+            self._append(DELETE, _uids(shapes))
+
+    def replace(self, shape, replacements):
+        if self._file is not None:
+            self._append(REPLACE, struct.pack('<QI', shape.uid, len(replacements)) +
+                         b''.join(_encode_shape(s) for s in replacements))
+
+    def transform(self, shapes, matrix):
+        if shapes:
+            self._append(TRANSFORM, _uids(shapes) + np.asarray(matrix, dtype='<f8').reshape(9).tobytes())
+
+    def move(self, shapes, delta):
+        if shapes:
+            self._append(MOVE, _uids(shapes) + np.asarray(delta, dtype='<f8').reshape(2).tobytes())
+
+    def fill(self, shapes):
+        if shapes:
+            self._append(FILL, _COUNT.pack(len(shapes)) + b''.join(
+                _FILL.pack(s.uid, bool(s.filled), FILL_RULES.index(s.fill_rule)) for s in shapes))
+
+    def clear(self):
+        self._append(CLEAR, b'')
+
+    def splice(self, old, new):
+        """Registra a troca da lista `old` por `new` (mesma ordem das formas mantidas).
+
+        Formas novas entram no lugar da última forma removida antes delas
+        (REPLACE), como no corte e no recorte; as demais removidas viram um
+        DELETE. Formas novas sem nenhuma removida antes só podem estar no fim.
+        """
+        if self._file is None:
+            return
+        kept = {id(s) for s in new}
+        removed, index = [], 0
+        for shape in old:
+            if id(shape) not in kept:
+                removed.append(shape)
+                continue
+            run = []
+            while new[index] is not shape:
+                run.append(new[index])
+                index += 1
+            index += 1
+            self._splice_run(removed, run)
+            removed = []
+        self._splice_run(removed, new[index:])
+
+    def _splice_run(self, removed, run):
+        if not removed:
+            for shape in run:
+                self.add(shape)
+        elif not run:
+            self.delete(removed)
+        else:
+            self.delete(removed[:-1])
+            self.replace(removed[-1], run)
+
+    def flush(self):
+        """Entrega o buffer ao sistema operacional (sobrevive a uma falha do aplicativo)."""
+        if self._file is not None:
+            self._file.flush()
+
+    def close(self):
+        if self._file is not None:
+            self._file.flush()
+            os.fsync(self._file.fileno())
+            self._file.close()
+            self._file = None
@@ -0,0 +1,429 @@
+"""Oráculo de corretude: compara pixel a pixel os caminhos otimizados com as implementações de referência.
+
+Uso: python -m cgcore.oracle [--level N] [--seed S] [--show K]
+
+Cada verificação gera uma cena com casos de borda fixos (retas verticais,
+horizontais, diagonais, degeneradas, fora da tela, em coordenadas negativas,
+raio zero, segmentos que tocam a janela de recorte, polígonos que se cruzam)
+e casos aleatórios, e rasteriza cada caso pela referência (`cgcore.reference`
+e a lista de arestas ativas de `cgcore.fill`) e pelo caminho otimizado. Os
+pixels dos dois lados são comparados como posições numa tela comum, e a
+diferença aponta os primeiros pixels divergentes. O nível escala o tamanho
+da tela e o número de casos aleatórios (nível N: tela de 64·2^N pixels e
+25·2^N casos), até o regime de estresse. Sai com código 1 se algo divergir.
+"""
+import argparse
+import sys
+import time
+
+import numpy as np
+
+from cgcore import reference
+from cgcore.clip import (EDGE_ACCEPTED, EDGE_REJECTED, INSIDE, OUTSIDE, circle_window_relation, cohen_sutherland_segments,
+                         cyrus_beck_segments, liang_barsky, liang_barsky_segments, points_in_window, sutherland_hodgman,
+                         window_bounds)
+from cgcore.fill import EVEN_ODD, NONZERO, circle_spans, polygon_spans, polygon_spans_vectorized
+from cgcore.raster import box_spans, circle_points, line_points, line_points_dda, stamp_spans
+from cgcore.transform import apply_matrix, rotation_matrix
+
+
+def span_pixels(ys, x0s, x1s):
+    """Pixels (N, 2) cobertos por trechos (y, x inicial, x final; inclusivos)."""
+    ys, x0s, x1s = (np.asarray(a, dtype=np.int64).reshape(-1) for a in (ys, x0s, x1s))
+    widths = np.maximum(x1s - x0s + 1, 0)
+    starts = np.repeat(x0s - np.cumsum(widths) + widths, widths)
+    return np.stack([starts + np.arange(int(widths.sum())), np.repeat(ys, widths)], axis=1)
+
+
+def diff_pixels(expected, actual, limit=8):
+    """(total, primeiros `limit`) pixels que diferem entre dois conjuntos, como (x, y, na referência, no otimizado).
+
+    Cada pixel vira uma chave linear na caixa envolvente comum, como o índice
+    num array da tela; repetições não contam, como no framebuffer. Os
+    divergentes saem em ordem de linha e depois de coluna.
+    """
+    a = np.asarray(expected, dtype=np.int64).reshape(-1, 2)
+    b = np.asarray(actual, dtype=np.int64).reshape(-1, 2)
+    both = np.concatenate([a, b])
+    if not len(both):
+        return 0, []
+    lo = both.min(axis=0)
+    width = int(both[:, 0].max() - lo[0]) + 1
+    keys_a = np.unique((a[:, 1] - lo[1]) * width + a[:, 0] - lo[0])
+    keys_b = np.unique((b[:, 1] - lo[1]) * width + b[:, 0] - lo[0])
+    differ = np.setxor1d(keys_a, keys_b, assume_unique=True)
+    in_a = np.isin(differ[:limit], keys_a, assume_unique=True)
+    first = [(int(key % width + lo[0]), int(key // width + lo[1]), bool(ref), not ref)
+             for key, ref in zip(differ[:limit].tolist(), in_a.tolist())]
+    return len(differ), first
+
+
+class Scene:
+    """Casos de teste de um nível: tela, janela de recorte e os geradores de segmentos e círculos."""
+
+    def __init__(self, level, seed=0):
+        self.level = level
+        self.size = 64 << level
+        self.count = 25 << level
+        self.rng = np.random.default_rng(seed)
+        margin = self.size // 8
+        self.rect = (margin, margin, self.size - margin, self.size - margin)  # (esquerda, topo, direita, base)
+
+    def edge_segments(self):
+        s = self.size
+        left, top, right, bottom = self.rect
+        cases = [
+            (5, 5, 5, 5), (-3, -7, -3, -7), (s + 9, -4, s + 9, -4),       # Degenerados (um ponto)
+            (0, 10, s - 1, 10), (s - 1, 20, 0, 20), (-40, -2, 40, -2),      # Horizontais
+            (10, 0, 10, s - 1), (20, s - 1, 20, 0), (-2, -40, -2, 40),      # Verticais
+            (0, 0, 50, 50), (50, 50, 0, 0), (0, 50, 50, 0), (50, 0, 0, 50),  # Diagonais nos quatro sentidos
+            (0, 0, 50, 49), (0, 0, 49, 50), (3, 7, 4, 9), (3, 7, 5, 8),     # Inclinações perto de 1 e passos curtos
+            (-60, -30, -10, -80), (-5, -5, -300, -17),                       # Coordenadas negativas
+            (-50, 10, -10, 90), (10, -90, 90, -20),                          # Fora da tela
+            (2 * s, 2 * s, 3 * s, 5 * s), (-s, 3 * s, 3 * s, -s),            # Longe da tela / atravessando tudo
+            (left, top, right, bottom), (right, top, left, bottom),          # Cantos da janela
+            (left - 1, top, left - 1, bottom), (right, top - 20, right, bottom + 20),  # Na borda e por fora dela
+            (left - 30, top + 5, right + 30, top + 5), (left + 3, top - 50, left + 3, top + 1),
+            (left - 10, top - 5, left + 5, top - 20),                        # Canto: rejeição não trivial
+        ]
+        return np.array(cases, dtype=np.int64)
+
+    def random_segments(self, count=None):
+        """Extremos espalhados numa área maior que a tela, incluindo coordenadas negativas."""
+        count = self.count if count is None else count
+        s = self.size
+        return self.rng.integers(-s // 2, s + s // 2, size=(count, 4))
+
+    def windows(self):
+        """Janelas convexas: o retângulo como polígono, nos dois sentidos, girado e um hexágono regular."""
+        left, top, right, bottom = self.rect
+        corners = np.array([(left, top), (right, top), (right, bottom), (left, bottom)], dtype=float)
+        center = ((left + right) / 2, (top + bottom) / 2)
+        angles = np.radians(np.arange(6) * 60.0 + 15.0)
+        hexagon = np.column_stack([np.cos(angles), np.sin(angles)]) * (right - left) / 2 + center
+        return [corners, corners[::-1], apply_matrix(corners, rotation_matrix(30, *center)), hexagon]
+
+    def segments(self):
+        return np.concatenate([self.edge_segments(), self.random_segments()])
+
+    def circles(self):
+        """(cx, cy, raio): raio zero e pequenos, centros negativos e fora da tela, e aleatórios."""
+        s = self.size
+        cases = [(10, 10, 0), (-5, -5, 0), (20, 20, 1), (20, 20, 2), (20, 20, 3), (0, 0, 7),
+                 (-30, 40, 25), (s // 2, s // 2, s // 2), (s // 2, s // 2, s), (3 * s, -s, 10),
+                 (s - 1, s - 1, 33)]
+        random = np.stack([self.rng.integers(-s // 4, s + s // 4, self.count),
+                           self.rng.integers(-s // 4, s + s // 4, self.count),
+                           self.rng.integers(0, s // 2, self.count)], axis=1)
+        return np.concatenate([np.array(cases, dtype=np.int64), random])
+
+    def polygons(self):
+        """Polígonos de borda (arestas horizontais, estrela que se cruza, colineares, negativos,
+        vértices em meio pixel, fora da janela) e aleatórios, com até 4·2^N vértices."""
+        s = self.size
+        cases = [[(10, 10), (60, 10), (60, 40), (10, 40)], [(5, 5), (40, 12), (18, 50)],
+                 [(50, 0), (61, 35), (98, 35), (68, 57), (79, 91), (50, 70), (21, 91), (32, 57), (2, 35), (39, 35)],
+                 [(0, 0), (20, 20), (40, 40)], [(-40, -40), (-5, -30), (-20, -2)],
+                 [(10.5, 10.5), (30.5, 10.5), (20.5, 30.5)], [(-s, -s), (2 * s, -s), (2 * s, 2 * s), (-s, 2 * s)],
+                 [(3 * s, 3 * s), (4 * s, 3 * s), (4 * s, 4 * s)]]
+        polygons = [np.array(c, dtype=float) for c in cases]
+        for _ in range(self.count):
+            count = int(self.rng.integers(3, 4 << self.level))
+            polygons.append(self.rng.uniform(-s // 4, s + s // 4, (count, 2)))
+        return polygons
+
+
+class Check:
+    """Resultado de uma verificação: casos, divergências (com os primeiros pixels) e tempo de cada lado."""
+
+    def __init__(self, name):
+        self.name = name
+        self.cases = 0
+        self.failures = []
+        self.reference_time = 0.0
+        self.optimized_time = 0.0
+
+    def run(self, reference_fn, optimized_fn):
+        """Roda os dois lados de um caso, somando o tempo de cada um; devolve (referência, otimizado)."""
+        self.cases += 1
+        t = time.perf_counter()
+        expected = reference_fn()
+        self.reference_time += time.perf_counter() - t
+        t = time.perf_counter()
+        actual = optimized_fn()
+        self.optimized_time += time.perf_counter() - t
+        return expected, actual
+
+    def compare(self, case, expected, actual, limit, note=None):
+        total, first = diff_pixels(expected, actual, limit)
+        if total or note:
+            self.failures.append((case, note or f'{total} pixels divergentes', first))
+
+    @property
+    def ok(self):
+        return not self.failures
+
+
+def check_lines(name, scene, reference_fn, optimized_fn, limit):
+    check = Check(name)
+    for x1, y1, x2, y2 in scene.segments().tolist():
+        expected, actual = check.run(lambda: reference_fn(x1, y1, x2, y2), lambda: optimized_fn(x1, y1, x2, y2))
+        # A quantidade de pixels (com repetições) alimenta os contadores por quadro
+        note = f'{len(expected)} pixels na referência, {len(actual)} no otimizado' if len(expected) != len(actual) else None
+        check.compare(f'reta ({x1}, {y1}) -> ({x2}, {y2})', expected, actual, limit, note)
+    return check
+
+
+def check_circles(scene, limit):
+    check = Check('circulo_bresenham')
+    for cx, cy, radius in scene.circles().tolist():
+        expected, actual = check.run(lambda: reference.circle_bresenham(cx, cy, radius),
+                                     lambda: circle_points(cx, cy, radius))
+        note = f'{len(expected)} pixels na referência, {len(actual)} no otimizado' if len(expected) != len(actual) else None
+        check.compare(f'círculo centro ({cx}, {cy}) raio {radius}', expected, actual, limit, note)
+    return check
+
+
+def check_discs(scene, limit):
+    check = Check('disco_preenchido')
+    for cx, cy, radius in scene.circles().tolist():
+        expected, actual = check.run(lambda: np.array(reference.circle_disc(cx, cy, radius), dtype=np.int64).reshape(-1, 3),
+                                     lambda: np.stack(circle_spans(cx, cy, radius), axis=1))
+        if np.array_equal(expected, actual[np.argsort(actual[:, 0], kind='stable')]):
+            continue  # Mesmos trechos: não precisa expandir em pixels
+        check.compare(f'disco centro ({cx}, {cy}) raio {radius}', span_pixels(*expected.T), span_pixels(*actual.T), limit)
+    return check
+
+
+def check_clipping(scene, limit):
+    """Cohen-Sutherland em lote contra o laço, segmento a segmento, e as retas recortadas resultantes."""
+    check = Check('cohen_sutherland')
+    segments = scene.segments()
+    check.cases = len(segments)
+    t = time.perf_counter()
+    expected = [reference.cohen_sutherland(*seg, scene.rect) for seg in segments.tolist()]
+    check.reference_time = time.perf_counter() - t
+    t = time.perf_counter()
+    accepted, clipped, _ = cohen_sutherland_segments(segments, scene.rect)
+    check.optimized_time = time.perf_counter() - t
+    for seg, result, keep, out in zip(segments.tolist(), expected, accepted.tolist(), clipped.tolist()):
+        actual = tuple(out) if keep else None
+        if result == actual:
+            continue
+        pixels_ref = reference.line_bresenham(*result) if result else []
+        pixels_opt = line_points(*actual) if actual else np.empty((0, 2))
+        total, first = diff_pixels(pixels_ref, pixels_opt, limit)
+        check.failures.append((f'segmento {tuple(seg)}', f'referência {result}, otimizado {actual} '
+                               f'({total} pixels divergentes)', first))
+    return check
+
+
+def check_liang_barsky(scene, limit):
+    """Liang-Barsky em lote contra o escalar: parâmetros (u1, u2) e classe de cada segmento."""
+    check = Check('liang_barsky')
+    segments = scene.segments()
+    check.cases = len(segments)
+    t = time.perf_counter()
+    expected = [liang_barsky(seg[:2], seg[2:], scene.rect) for seg in segments.tolist()]
+    check.reference_time = time.perf_counter() - t
+    t = time.perf_counter()
+    u1, u2, classes = liang_barsky_segments(segments[:, :2], segments[:, 2:], scene.rect)
+    check.optimized_time = time.perf_counter() - t
+    for seg, result, a, b, kind in zip(segments.tolist(), expected, u1.tolist(), u2.tolist(), classes.tolist()):
+        actual = (None if kind == EDGE_REJECTED else (a, b), kind)
+        if result != actual:
+            check.failures.append((f'segmento {tuple(seg)}', f'escalar {result}, em lote {actual}', []))
+    return check
+
+
+def check_cyrus_beck(scene, limit):
+    """Cyrus-Beck em lote contra o escalar, em janelas convexas: parâmetros (u1, u2) e classe de cada segmento."""
+    check = Check('cyrus_beck')
+    segments = scene.segments()
+    for window in scene.windows():
+        check.cases += len(segments)
+        t = time.perf_counter()
+        expected = [reference.cyrus_beck(seg[:2], seg[2:], window.tolist()) for seg in segments.tolist()]
+        check.reference_time += time.perf_counter() - t
+        t = time.perf_counter()
+        u1, u2, classes = cyrus_beck_segments(segments[:, :2], segments[:, 2:], window)
+        check.optimized_time += time.perf_counter() - t
+        for seg, result, a, b, kind in zip(segments.tolist(), expected, u1.tolist(), u2.tolist(), classes.tolist()):
+            # A soma dos produtos pode arredondar diferente no lote: parâmetros comparados com tolerância
+            same = (result is None) == (kind == EDGE_REJECTED) and (
+                result is None or (np.allclose(result, (a, b), rtol=0, atol=1e-9)
+                                   and (result == (0.0, 1.0)) == (kind == EDGE_ACCEPTED)))
+            if not same:
+                check.failures.append((f'segmento {tuple(seg)}, janela de {len(window)} vértices',
+                                       f'escalar {result}, em lote {(a, b)} (classe {kind})', []))
+    return check
+
+
+def check_circle_relation(scene, limit):
+    """Classe do círculo contra a janela, contornos e discos, conferida em amostras do contorno e da janela.
+
+    OUTSIDE no contorno: nenhuma amostra do contorno na janela; OUTSIDE no
+    disco (preenchido): nenhuma amostra da janela no disco, o que pega o disco
+    que contém a janela inteira; INSIDE: todas as amostras do contorno na janela.
+    """
+    check = Check('circulo_janela')
+    angles = np.linspace(0, 2 * np.pi, 256, endpoint=False)
+    ring = np.column_stack([np.cos(angles), np.sin(angles)])
+    for window in [scene.rect] + scene.windows():
+        left, top, right, bottom = window_bounds(window)
+        grid = np.stack(np.meshgrid(np.linspace(left, right, 17), np.linspace(top, bottom, 17)), axis=-1).reshape(-1, 2)
+        samples = grid[points_in_window(grid, window)]
+        kind = 'retângulo' if window is scene.rect else f'janela de {len(window)} vértices'
+        for cx, cy, radius in scene.circles().tolist():
+            center = np.array([cx, cy], dtype=float)
+            outline = center + ring * radius * (1 - 1e-9)  # Um fio para dentro: o INSIDE vale até a borda
+            for filled in (False, True):
+                t = time.perf_counter()
+                touches = points_in_window(outline, window)
+                covers = np.hypot(*(samples - center).T) <= radius
+                check.reference_time += time.perf_counter() - t
+                t = time.perf_counter()
+                relation = circle_window_relation(center, radius, window, filled)
+                check.optimized_time += time.perf_counter() - t
+                check.cases += 1
+                wrong = (relation == INSIDE and not touches.all()) or (relation == OUTSIDE and (
+                    touches.any() or (filled and covers.any())))
+                if wrong:
+                    check.failures.append((f'círculo {(cx, cy, radius)}{" preenchido" if filled else ""}, {kind}',
+                                           f'classe {relation}', []))
+    return check
+
+
+def check_polygon_clipping(scene, limit):
+    """Sutherland-Hodgman vetorizado contra o laço vértice a vértice: vértices e visibilidade das arestas."""
+    check = Check('sutherland_hodgman')
+    left, top, right, bottom = scene.rect
+
+    def pixels(vertices):
+        return span_pixels(*polygon_spans(vertices, EVEN_ODD, top, bottom)) if len(vertices) > 2 else np.empty((0, 2))
+
+    for polygon in scene.polygons():
+        visible = scene.rng.random(len(polygon)) > 0.2
+        expected, (result, _) = check.run(lambda: reference.sutherland_hodgman(polygon.tolist(), scene.rect, visible),
+                                          lambda: sutherland_hodgman(polygon, scene.rect, visible))
+        if result is None:  # Inteiro dentro: nada a comparar se for verdade
+            if ((polygon >= (left, top)) & (polygon <= (right, bottom))).all():
+                continue
+            actual = [(tuple(p), bool(v)) for p, v in zip(polygon.tolist(), visible)]
+        else:
+            actual = [(tuple(p), v) for p, v in zip(result[0].tolist(), result[1].tolist())]
+            if actual == expected:
+                continue
+        check.compare(f'polígono de {len(polygon)} vértices', pixels([p for p, _ in expected]), pixels([p for p, _ in actual]),
+                      limit, f'referência {len(expected)} vértices, otimizado {len(actual)} (ou visibilidade diferente)')
+    return check
+
+
+def check_strokes(scene, limit):
+    """Traço grosso: carimbos quadrados por pixel contra os trechos disjuntos de `box_spans`."""
+    check = Check('traco_grosso')
+    s = scene.size
+    screen = (0, 0, s, s)
+    segments = np.concatenate([scene.edge_segments(), scene.random_segments(max(1, scene.count // 4))])
+    thicknesses = scene.rng.integers(1, 9, len(segments))
+    thicknesses[:4] = (1, 2, 3, 8)
+    for (x1, y1, x2, y2), thickness in zip(segments.tolist(), thicknesses.tolist()):
+        lo, hi = -thickness // 2, thickness // 2
+
+        def optimized():
+            pixels = line_points(x1, y1, x2, y2)
+            inside = (pixels[:, 0] >= 0) & (pixels[:, 0] < s) & (pixels[:, 1] >= 0) & (pixels[:, 1] < s)
+            return span_pixels(*box_spans(pixels[inside], lo, hi, screen))
+
+        expected, actual = check.run(lambda: list(reference.thick_stroke(
+            reference.line_bresenham(x1, y1, x2, y2), thickness, s, s)), optimized)
+        check.compare(f'traço ({x1}, {y1}) -> ({x2}, {y2}) espessura {thickness}', expected, actual, limit)
+    return check
+
+
+def check_polygon_fill(scene, limit):
+    """Preenchimento vetorizado contra a lista de arestas ativas, nas duas regras, nas linhas da janela."""
+    check = Check('preenchimento_poligono')
+    top, bottom = scene.rect[1], scene.rect[3]
+    for polygon in scene.polygons():
+        for rule in (EVEN_ODD, NONZERO):
+            expected, actual = check.run(lambda: polygon_spans(polygon, rule, top, bottom),
+                                         lambda: polygon_spans_vectorized(polygon, rule, top, bottom))
+            if all(np.array_equal(a, b) for a, b in zip(expected, actual)):
+                continue
+            check.compare(f'polígono de {len(polygon)} vértices, regra {rule}', span_pixels(*expected),
+                          span_pixels(*actual), limit, None if len(expected[0]) == len(actual[0]) else
+                          f'{len(expected[0])} trechos na referência, {len(actual[0])} no otimizado')
+    return check
+
+
+def check_stamps(scene, limit):
+    """União de carimbos arbitrários (`stamp_spans`) contra a fusão de intervalos em Python."""
+    check = Check('uniao_carimbos')
+    s = scene.size
+    for _ in range(max(1, scene.count // 4)):
+        centers = scene.rng.integers(-s // 8, s + s // 8, (int(scene.rng.integers(1, 64)), 2))
+        height = int(scene.rng.integers(1, 12))
+        rows = np.arange(height) - height // 2
+        x_lo = -scene.rng.integers(0, 6, height)
+        x_hi = x_lo + scene.rng.integers(0, 12, height)
+        expected, actual = check.run(
+            lambda: reference.stamp_spans(centers.tolist(), rows.tolist(), x_lo.tolist(), x_hi.tolist(), scene.rect),
+            lambda: stamp_spans(centers, rows, x_lo, x_hi, scene.rect))
+        check.compare(f'{len(centers)} carimbos de {height} linhas', span_pixels(*zip(*expected)) if expected else [],
+                      span_pixels(*actual), limit)
+    return check
+
+
+def run_checks(level, seed=0, limit=8):
+    """Todas as verificações num nível; cada uma com sua própria cena (mesma semente)."""
+    return [
+        check_lines('reta_bresenham', Scene(level, seed), reference.line_bresenham, line_points, limit),
+        check_lines('reta_dda', Scene(level, seed), reference.line_dda, line_points_dda, limit),
+        check_circles(Scene(level, seed), limit),
+        check_discs(Scene(level, seed), limit),
+        check_clipping(Scene(level, seed), limit),
+        check_liang_barsky(Scene(level, seed), limit),
+        check_cyrus_beck(Scene(level, seed), limit),
+        check_circle_relation(Scene(level, seed), limit),
+        check_polygon_clipping(Scene(level, seed), limit),
+        check_strokes(Scene(level, seed), limit),
+        check_polygon_fill(Scene(level, seed), limit),
+        check_stamps(Scene(level, seed), limit),
+    ]
+
+
+def format_report(checks, show=3):
+    lines = [f"{'verificação':<24}{'casos':>8}{'falhas':>8}{'ref (ms)':>11}{'otim (ms)':>11}"]
+    for check in checks:
+        lines.append(f"{check.name:<24}{check.cases:>8}{len(check.failures):>8}"
+                     f"{check.reference_time * 1000:>11.1f}{check.optimized_time * 1000:>11.1f}")
+    for check in checks:
+        for case, message, first in check.failures[:show]:
+            lines.append(f"\n[{check.name}] {case}: {message}")
+            for x, y, in_ref, in_opt in first:
+                lines.append(f"    ({x}, {y}): referência={'sim' if in_ref else 'não'}, "
+                             f"otimizado={'sim' if in_opt else 'não'}")
+        if len(check.failures) > show:
+            lines.append(f"  ... mais {len(check.failures) - show} casos divergentes em {check.name}")
+    return '\n'.join(lines)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog='python -m cgcore.oracle', description=__doc__.splitlines()[0])
+    parser.add_argument('--level', type=int, default=2, help='nível da cena, de 1 em diante (padrão: 2)')
+    parser.add_argument('--seed', type=int, default=0, help='semente dos casos aleatórios')
+    parser.add_argument('--show', type=int, default=3, help='casos divergentes mostrados por verificação')
+    parser.add_argument('--pixels', type=int, default=8, help='pixels divergentes mostrados por caso')
+    args = parser.parse_args(argv)
+    if args.level < 1:
+        parser.error('--level deve ser pelo menos 1')
+
+    checks = run_checks(args.level, args.seed, args.pixels)
+    print(f"nível {args.level}: tela {Scene(args.level).size}², semente {args.seed}")
+    print(format_report(checks, args.show))
+    return 0 if all(check.ok for check in checks) else 1
+
+
+if __name__ == '__main__':
+    sys.exit(main())
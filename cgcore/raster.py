@@ -0,0 +1,275 @@
+"""Rasterização vetorizada: retas (Bresenham e DDA), círculo de ponto médio e elipses pela cônica implícita."""
+import math
+
+import numpy as np
+
+
+def _isqrt(values):
+    """Raiz quadrada inteira (piso) de um array de inteiros não negativos."""
+    root = np.sqrt(values.astype(float)).astype(np.int64)
+    root -= root * root > values          # Corrige o arredondamento do float
+    root += (root + 1) * (root + 1) <= values
+    return root
+
+
+def line_points(x1, y1, x2, y2):
+    """Pixels da reta de Bresenham (err = dx - dy) como array (N, 2), do primeiro ao último ponto.
+
+    O eixo maior avança um pixel por passo; o menor tem forma fechada,
+    ⌊(2·i·d_menor + d_maior - 1) / (2·d_maior)⌋, igual ao termo de erro do laço.
+    """
+    x1, y1, x2, y2 = int(x1), int(y1), int(x2), int(y2)
+    dx, dy = abs(x2 - x1), abs(y2 - y1)
+    sx = 1 if x1 < x2 else -1
+    sy = 1 if y1 < y2 else -1
+    steps = np.arange(max(dx, dy) + 1, dtype=np.int64)
+    if dx >= dy:
+        minor = (2 * steps * dy + dx - 1) // (2 * dx) if dx else steps
+        xs, ys = x1 + sx * steps, y1 + sy * minor
+    else:
+        minor = (2 * steps * dx + dy - 1) // (2 * dy)
+        xs, ys = x1 + sx * minor, y1 + sy * steps
+    return np.stack([xs, ys], axis=1)
+
+
+def line_points_dda(x1, y1, x2, y2):
+    """Pixels da reta pelo DDA como array (N, 2).
+
+    Os incrementos são acumulados em sequência (np.cumsum soma na ordem), como
+    no laço `x += x_inc`, e arredondados pela mesma regra do round do Python.
+    """
+    dx, dy = x2 - x1, y2 - y1
+    steps = max(abs(dx), abs(dy))
+    if steps == 0:
+        return np.array([[int(x1), int(y1)]], dtype=np.int64)
+    count = int(steps) + 1
+    xs = np.full(count, dx / steps)
+    ys = np.full(count, dy / steps)
+    xs[0], ys[0] = float(x1), float(y1)
+    return np.stack([np.round(np.cumsum(xs)), np.round(np.cumsum(ys))], axis=1).astype(np.int64)
+
+
+def stamp_spans(points, rows, x_lo, x_hi, rect=None):
+    """União dos carimbos centrados em cada ponto, como trechos disjuntos (y, x0, x1).
+
+    O carimbo é dado por linhas: na linha y + rows[i] ele cobre
+    [x + x_lo[i], x + x_hi[i]]. Os trechos de cada linha da tela são ordenados
+    e fundidos com um máximo acumulado do fim, então cada pixel sai uma vez
+    só. `rect` = (esquerda, topo, direita, base) recorta o resultado.
+    """
+    pts = np.asarray(points, dtype=np.int64).reshape(-1, 2)
+    if not len(pts) or not len(rows):
+        return np.empty(0, dtype=np.int64), np.empty(0, dtype=np.int64), np.empty(0, dtype=np.int64)
+    ys = (pts[:, 1, None] + np.asarray(rows, dtype=np.int64)).ravel()
+    starts = (pts[:, 0, None] + np.asarray(x_lo, dtype=np.int64)).ravel()
+    ends = (pts[:, 0, None] + np.asarray(x_hi, dtype=np.int64)).ravel()
+    order = np.lexsort((starts, ys))
+    ys, starts, ends = ys[order], starts[order], ends[order]
+    # Deslocamento por linha: o máximo acumulado não vaza de uma linha para a seguinte
+    base, width = int(starts.min()), int(ends.max() - starts.min()) + 2
+    shift = (ys - ys[0]) * width
+    reach = np.maximum.accumulate(ends - base + shift) - shift + base
+    first = np.ones(len(ys), dtype=bool)
+    first[1:] = (ys[1:] != ys[:-1]) | (starts[1:] > reach[:-1] + 1)
+    index = np.flatnonzero(first)
+    ys, x0, x1 = ys[index], starts[index], reach[np.r_[index[1:], len(ys)] - 1]
+    if rect is not None:
+        left, top, right, bottom = rect
+        x0, x1 = np.maximum(x0, left), np.minimum(x1, right - 1)
+        keep = (ys >= top) & (ys < bottom) & (x1 >= x0)
+        ys, x0, x1 = ys[keep], x0[keep], x1[keep]
+    return ys, x0, x1
+
+
+def box_spans(points, lo, hi, rect=None):
+    """`stamp_spans` com o carimbo quadrado [lo, hi] × [lo, hi] (o traço grosso por pixel)."""
+    size = hi - lo + 1
+    return stamp_spans(points, np.arange(lo, hi + 1), np.full(size, lo), np.full(size, hi), rect)
+
+
+def box_coverage(points, lo, hi, rect):
+    """Pixels dos quadrados de `box_spans` dentro e fora de `rect`, contando sobreposições."""
+    pts = np.asarray(points, dtype=np.int64).reshape(-1, 2)
+    left, top, right, bottom = rect
+    width = np.clip(np.minimum(pts[:, 0] + hi, right - 1) - np.maximum(pts[:, 0] + lo, left) + 1, 0, None)
+    height = np.clip(np.minimum(pts[:, 1] + hi, bottom - 1) - np.maximum(pts[:, 1] + lo, top) + 1, 0, None)
+    inside = int(np.sum(width * height))
+    return inside, len(pts) * (hi - lo + 1) ** 2 - inside
+
+
+def circle_octant(radius):
+    """Passos (x, y) do Bresenham de círculos (d = 3 - 2r) no primeiro octante, como arrays.
+
+    Em vez de avançar o termo de decisão um passo por vez, calcula para cada x
+    o maior y em que o laço ainda não teria decrementado: a condição d > 0 tem
+    forma fechada em (x, y), e o y de cada passo é o máximo acumulado dessas
+    fronteiras. O resultado é idêntico ao laço, passo a passo.
+    """
+    radius = int(radius)
+    if radius < 0:
+        return np.empty(0, dtype=np.int64), np.empty(0, dtype=np.int64)
+    steps = np.arange(radius + 2, dtype=np.int64)
+    x = steps - 1
+    # Q(x): forma fechada do termo de decisão; sua raiz limita o y de cada passo
+    q = np.maximum(4 * (radius - 1) ** 2 + 3 - 4 * (x + 1) ** 2 - 8 * x, -1)
+    root = _isqrt(np.maximum(q, 0))
+    bound = np.where(q >= 0, np.minimum((root + 3) // 2, radius), -2 * (radius + 2))
+    bound[0] = radius
+    y = np.maximum.accumulate(bound + steps) - steps
+    below = np.flatnonzero(y < steps)
+    count = below[0] if len(below) else len(steps)
+    return steps[:count], y[:count]
+
+
+def circle_points(cx, cy, radius):
+    """Pixels do círculo de Bresenham como array (N, 2), na ordem do laço original.
+
+    Cada passo do octante gera os oito pontos simétricos na mesma sequência do
+    laço em Python, incluindo as repetições nos eixos e na diagonal.
+    """
+    x, y = circle_octant(radius)
+    xs = np.stack([cx + x, cx - x, cx + x, cx - x, cx + y, cx - y, cx + y, cx - y], axis=1)
+    ys = np.stack([cy + y, cy + y, cy - y, cy - y, cy + x, cy + x, cy - x, cy - x], axis=1)
+    return np.stack([xs.ravel(), ys.ravel()], axis=1)
+
+
+def ellipse_terms(u, v):
+    """Termos da cônica ey²·dx² - 2k·dx·dy + ex²·dy² = det² da elipse de semieixos conjugados u, v.
+
+    Retorna (ex, ey, k, det): meias extensões horizontal e vertical, termo
+    cruzado e determinante [u v]. Vale para elipses alinhadas ou giradas.
+    """
+    ux, uy = float(u[0]), float(u[1])
+    vx, vy = float(v[0]), float(v[1])
+    return math.hypot(ux, vx), math.hypot(uy, vy), ux * uy + vx * vy, ux * vy - vx * uy
+
+
+def _ellipse_hits(c_main, c_other, extent, k, det):
+    """Interseções da elipse com as retas inteiras de uma direção: (coordenada, lado -, lado +)."""
+    lines = np.arange(math.ceil(c_main - extent), math.floor(c_main + extent) + 1)
+    offset = lines - c_main
+    spread = abs(det) * np.sqrt(np.maximum(extent * extent - offset * offset, 0))
+    middle = k * offset
+    scale = extent * extent
+    low = np.floor(c_other + (middle - spread) / scale + 0.5).astype(np.int64)
+    high = np.floor(c_other + (middle + spread) / scale + 0.5).astype(np.int64)
+    return lines.astype(np.int64), low, high
+
+
+def _unique_pixels(xs, ys):
+    """Pixels sem repetição, ordenados por x e depois y (chave linear, mais barata que unique por linha)."""
+    x0, y0 = xs.min(), ys.min()
+    height = int(ys.max() - y0) + 1
+    keys = np.unique((xs - x0) * height + (ys - y0))
+    return np.stack([keys // height + x0, keys % height + y0], axis=1)
+
+
+def ellipse_points(center, u, v):
+    """Pixels do contorno da elipse centro + u·cos t + v·sin t, como array (N, 2) sem repetições.
+
+    Resolve a equação implícita para cada linha (dois x) e para cada coluna
+    (dois y): as linhas cobrem os trechos íngremes e as colunas os trechos
+    planos, então o contorno fica sem falhas em qualquer rotação.
+    """
+    cx, cy = float(center[0]), float(center[1])
+    ex, ey, k, det = ellipse_terms(u, v)
+    if abs(det) < 1e-9 or not ex or not ey:
+        # Elipse degenerada (um segmento): amostra o contorno paramétrico
+        samples = max(8, int(2 * math.pi * max(math.hypot(*u), math.hypot(*v))) + 1)
+        pts = np.floor(ellipse_polyline(center, u, v, samples) + 0.5).astype(np.int64)
+        return _unique_pixels(pts[:, 0], pts[:, 1])
+    rows, row_lo, row_hi = _ellipse_hits(cy, cx, ey, k, det)
+    cols, col_lo, col_hi = _ellipse_hits(cx, cy, ex, k, det)
+    xs = np.concatenate([row_lo, row_hi, cols, cols])
+    ys = np.concatenate([rows, rows, col_lo, col_hi])
+    return _unique_pixels(xs, ys)
+
+
+def ellipse_spans(center, u, v):
+    """Trechos horizontais do interior da elipse (y, x inicial, x final; inclusivos).
+
+    Usa as mesmas interseções por linha do contorno, de modo que o
+    preenchimento encosta no traço.
+    """
+    cx, cy = float(center[0]), float(center[1])
+    ex, ey, k, det = ellipse_terms(u, v)
+    if abs(det) < 1e-9 or not ey:
+        return np.empty(0, dtype=np.int64), np.empty(0, dtype=np.int64), np.empty(0, dtype=np.int64)
+    return _ellipse_hits(cy, cx, ey, k, det)
+
+
+def ellipse_polyline(center, u, v, segments=64):
+    """Vértices de um polígono inscrito na elipse (o último repete o primeiro)."""
+    t = np.linspace(0, 2 * math.pi, segments + 1)
+    return np.asarray(center, dtype=float) + np.outer(np.cos(t), u) + np.outer(np.sin(t), v)
+
+
+def curve_segments(radius, max_error, minimum=8, maximum=4096):
+    """Número de segmentos para que nenhuma corda se afaste mais de `max_error` do arco.
+
+    A flecha de uma corda que subentende o ângulo θ é r·(1 - cos(θ/2)), então
+    n = ⌈π / acos(1 - erro/r)⌉; limitado a [minimum, maximum].
+    """
+    if radius <= max_error:
+        return minimum
+    count = math.ceil(math.pi / math.acos(1 - max_error / radius))
+    return int(min(max(count, minimum), maximum))
+
+
+def ellipse_radius(u, v):
+    """Semieixo maior da elipse de semieixos conjugados u, v (maior valor singular de [u v])."""
+    return float(np.linalg.norm(np.column_stack([u, v]).astype(float), 2))
+
+
+def circle_to_ellipse(center, edge):
+    """Centro e semieixos conjugados (alinhados aos eixos) do círculo centro/ponto da borda."""
+    radius = math.dist(center, edge)
+    cx, cy = center[0], center[1]
+    return [(cx, cy), (cx + radius, cy), (cx, cy + radius)]
+
+
+def preserves_circles(matrix):
+    """Se a parte linear da matriz homogênea leva círculos em círculos (semelhança)."""
+    linear = np.asarray(matrix, dtype=float)[:2, :2]
+    gram = linear.T @ linear
+    scale = gram[0, 0] + gram[1, 1]
+    return abs(gram[0, 1]) <= 1e-9 * scale and abs(gram[0, 0] - gram[1, 1]) <= 1e-9 * scale
+
+
+def preserves_axes(matrix):
+    """Se a parte linear da matriz homogênea leva caixas alinhadas aos eixos em caixas alinhadas (sem rotação nem cisalhamento)."""
+    linear = np.asarray(matrix, dtype=float)[:2, :2]
+    scale = np.abs(linear).sum()
+    return abs(linear[0, 1]) <= 1e-9 * scale and abs(linear[1, 0]) <= 1e-9 * scale
+
+
+def transform_mask(mask, p0, p1, matrix):
+    """Máscara raster [x, y] esticada entre os cantos `p0` e `p1`, reamostrada sob uma matriz homogênea qualquer.
+
+    A nova grade cobre a caixa dos quatro cantos transformados, com células
+    quadradas de área igual à das antigas vezes |det|; cada célula nova pega
+    o valor da antiga onde cai o seu centro levado de volta pela inversa
+    (vizinho mais próximo). Devolve (máscara, q0, q1), com q0 < q1, ou None se
+    a matriz é degenerada.
+    """
+    mask = np.asarray(mask, dtype=bool)
+    m = np.asarray(matrix, dtype=float)
+    det = np.linalg.det(m[:2, :2])
+    p0, p1 = np.asarray(p0, dtype=float), np.asarray(p1, dtype=float)
+    step = (p1 - p0) / mask.shape
+    cell = math.sqrt(abs(step[0] * step[1] * det))
+    if not cell:
+        return None
+    corners = np.array([p0, (p1[0], p0[1]), p1, (p0[0], p1[1])])
+    moved = corners @ m[:2, :2].T + m[:2, 2]
+    lo = moved.min(axis=0)
+    width, height = np.maximum(np.ceil((moved.max(axis=0) - lo) / cell), 1).astype(int)
+    xs, ys = np.meshgrid(lo[0] + cell * (np.arange(width) + 0.5), lo[1] + cell * (np.arange(height) + 0.5), indexing='ij')
+    inverse = np.linalg.inv(m)
+    sources = np.stack([inverse[0, 0] * xs + inverse[0, 1] * ys + inverse[0, 2],
+                        inverse[1, 0] * xs + inverse[1, 1] * ys + inverse[1, 2]], axis=-1)
+    cols, rows = np.moveaxis(np.floor((sources - p0) / step).astype(np.int64), -1, 0)
+    valid = (cols >= 0) & (cols < mask.shape[0]) & (rows >= 0) & (rows < mask.shape[1])
+    resampled = np.zeros((width, height), dtype=bool)
+    resampled[valid] = mask[cols[valid], rows[valid]]
+    return resampled, lo, lo + cell * np.array([width, height])
@@ -0,0 +1,240 @@
+"""Implementações de referência: os laços originais, em Python puro, dos rasterizadores e do recorte.
+
+São as versões anteriores à vetorização (`cgcore.raster`, `cgcore.clip`),
+mantidas sem otimização como oráculo de corretude: qualquer caminho rápido
+tem que gerar exatamente os mesmos pixels (veja `python -m cgcore.oracle`).
+Coordenadas em pixels inteiros; retângulos como (esquerda, topo, direita, base).
+"""
+import math
+
+
+def line_bresenham(x1, y1, x2, y2):
+    """Pixels da reta de Bresenham (err = dx - dy), do primeiro ao último ponto."""
+    points = []
+    dx = abs(x2 - x1)
+    dy = abs(y2 - y1)
+    sx = 1 if x1 < x2 else -1
+    sy = 1 if y1 < y2 else -1
+    err = dx - dy
+
+    x, y = x1, y1
+
+    while True:
+        points.append((x, y))
+        if x == x2 and y == y2:
+            break
+
+        e2 = 2 * err
+        if e2 > -dy:
+            err -= dy
+            x += sx
+        if e2 < dx:
+            err += dx
+            y += sy
+
+    return points
+
+
+def line_dda(x1, y1, x2, y2):
+    """Pixels da reta pelo DDA: incrementos somados passo a passo e arredondados."""
+    dx = x2 - x1
+    dy = y2 - y1
+    steps = max(abs(dx), abs(dy))
+
+    if steps == 0:
+        return [(x1, y1)]
+
+    x_inc = dx / steps
+    y_inc = dy / steps
+
+    points = []
+    x, y = float(x1), float(y1)
+
+    for _ in range(int(steps) + 1):
+        points.append((int(round(x)), int(round(y))))
+        x += x_inc
+        y += y_inc
+
+    return points
+
+
+def circle_bresenham(cx, cy, radius):
+    """Pixels do círculo de Bresenham (d = 3 - 2r), oito pontos simétricos por passo."""
+    points = []
+    x = 0
+    y = radius
+    d = 3 - 2 * radius
+
+    while y >= x:
+        points.extend([
+            (cx + x, cy + y), (cx - x, cy + y),
+            (cx + x, cy - y), (cx - x, cy - y),
+            (cx + y, cy + x), (cx - y, cy + x),
+            (cx + y, cy - x), (cx - y, cy - x)
+        ])
+
+        x += 1
+        if d > 0:
+            y -= 1
+            d = d + 4 * (x - y) + 10
+        else:
+            d = d + 4 * x + 6
+
+    return points
+
+
+def circle_disc(cx, cy, radius):
+    """Trechos (y, x0, x1) do disco limitado, em cada linha, pelos extremos do círculo de Bresenham."""
+    extent = {}
+    for x, y in circle_bresenham(cx, cy, radius):
+        extent[y] = max(extent.get(y, 0), abs(x - cx))
+    return [(y, cx - half, cx + half) for y, half in sorted(extent.items())]
+
+
+def cohen_sutherland(x1, y1, x2, y2, rect):
+    """Cohen-Sutherland contra `rect` (bordas inclusivas): (x1, y1, x2, y2) truncados, ou None."""
+    left, top, right, bottom = rect
+    INSIDE, LEFT, RIGHT, BOTTOM, TOP = 0, 1, 2, 4, 8
+
+    def compute_code(x, y):
+        code = INSIDE
+        if x < left: code |= LEFT
+        elif x > right: code |= RIGHT
+        if y < top: code |= BOTTOM
+        elif y > bottom: code |= TOP
+        return code
+
+    code1 = compute_code(x1, y1)
+    code2 = compute_code(x2, y2)
+    accept = False
+
+    while True:
+        if code1 == 0 and code2 == 0:
+            accept = True
+            break
+        elif code1 & code2:
+            break
+        else:
+            code_out = code1 if code1 != 0 else code2
+
+            if code_out & TOP:
+                x = x1 + (x2 - x1) * (bottom - y1) / (y2 - y1)
+                y = bottom
+            elif code_out & BOTTOM:
+                x = x1 + (x2 - x1) * (top - y1) / (y2 - y1)
+                y = top
+            elif code_out & RIGHT:
+                y = y1 + (y2 - y1) * (right - x1) / (x2 - x1)
+                x = right
+            elif code_out & LEFT:
+                y = y1 + (y2 - y1) * (left - x1) / (x2 - x1)
+                x = left
+
+            if code_out == code1:
+                x1, y1 = x, y
+                code1 = compute_code(x1, y1)
+            else:
+                x2, y2 = x, y
+                code2 = compute_code(x2, y2)
+
+    return (int(x1), int(y1), int(x2), int(y2)) if accept else None
+
+
+def cyrus_beck(p1, p2, window):
+    """Cyrus-Beck de um segmento contra um polígono convexo, uma borda por vez: (u1, u2) do trecho dentro, ou None.
+
+    Normal interna de cada borda pelo sentido dos vértices (sinal da área);
+    bordas de comprimento zero são puladas, e um segmento paralelo a uma
+    borda (|n·d| < 1e-6) só é rejeitado se estiver fora dela.
+    """
+    area = sum(window[i][0] * window[(i + 1) % len(window)][1] - window[(i + 1) % len(window)][0] * window[i][1]
+               for i in range(len(window)))
+    sign = 1.0 if area > 0 else -1.0
+    u1, u2 = 0.0, 1.0
+    for i, (ex, ey) in enumerate(window):
+        fx, fy = window[(i + 1) % len(window)]
+        nx, ny = -(fy - ey) * sign, (fx - ex) * sign
+        length = math.hypot(nx, ny)
+        if length == 0:
+            continue
+        nx, ny = nx / length, ny / length
+        distance = nx * p1[0] + ny * p1[1] - (nx * ex + ny * ey)
+        rate = nx * (p2[0] - p1[0]) + ny * (p2[1] - p1[1])
+        if abs(rate) < 1e-6:
+            if distance < 0:
+                return None
+            continue
+        t = -distance / rate
+        if rate > 0:
+            u1 = max(u1, t)
+        else:
+            u2 = min(u2, t)
+    return (u1, u2) if u1 <= u2 else None
+
+
+def sutherland_hodgman(points, rect, visible=None):
+    """Sutherland-Hodgman contra `rect`, uma borda e um vértice por vez: (vértices, visibilidade das arestas).
+
+    A aresta que sai de uma interseção é visível se o polígono está entrando
+    (é parte da aresta original) e invisível se está saindo (vai pela borda).
+    Vértices repetidos em seguida são fundidos no fim.
+    """
+    left, top, right, bottom = rect
+    polygon = [(tuple(p), True if visible is None else bool(visible[i])) for i, p in enumerate(points)]
+    for axis, bound, above in ((0, left, True), (0, right, False), (1, top, True), (1, bottom, False)):
+        def inside(p):
+            return p[axis] >= bound if above else p[axis] <= bound
+        if all(inside(p) for p, _ in polygon):
+            continue  # Nenhum vértice além desta borda: o polígono segue como está
+        output = []
+        for i, (current, current_visible) in enumerate(polygon):
+            following, following_visible = polygon[(i + 1) % len(polygon)]
+            if inside(current) != inside(following):
+                t = (bound - current[axis]) / (following[axis] - current[axis])
+                cross = [current[0] + t * (following[0] - current[0]), current[1] + t * (following[1] - current[1])]
+                cross[axis] = bound
+                output.append((tuple(cross), current_visible and inside(following)))
+            if inside(following):
+                output.append((following, following_visible))
+        polygon = output
+    return [(p, v) for i, (p, v) in enumerate(polygon) if p != polygon[(i + 1) % len(polygon)][0]]
+
+
+def thick_stroke(points, thickness, width, height):
+    """Pixels do traço grosso: um quadrado de lado `thickness` por pixel dentro da tela (width × height)."""
+    pixels = set()
+    for px, py in points:
+        if 0 <= px < width and 0 <= py < height:
+            for dy in range(-thickness//2, thickness//2 + 1):
+                for dx in range(-thickness//2, thickness//2 + 1):
+                    if 0 <= px+dx < width and 0 <= py+dy < height:
+                        pixels.add((px+dx, py+dy))
+    return pixels
+
+
+def stamp_spans(points, rows, x_lo, x_hi, rect=None):
+    """União dos carimbos (linha rows[i] de x_lo[i] a x_hi[i]) centrados nos pontos, como trechos disjuntos.
+
+    Junta os intervalos de cada linha da tela num dicionário, ordena e funde
+    os que se tocam; `rect` recorta o resultado. Lista de (y, x0, x1).
+    """
+    by_row = {}
+    for x, y in points:
+        for dy, lo, hi in zip(rows, x_lo, x_hi):
+            by_row.setdefault(y + dy, []).append((x + lo, x + hi))
+    spans = []
+    for y in sorted(by_row):
+        intervals = sorted(by_row[y])
+        start, end = intervals[0]
+        for lo, hi in intervals[1:]:
+            if lo > end + 1:
+                spans.append((y, start, end))
+                start, end = lo, hi
+            else:
+                end = max(end, hi)
+        spans.append((y, start, end))
+    if rect is not None:
+        left, top, right, bottom = rect
+        spans = [(y, max(x0, left), min(x1, right - 1)) for y, x0, x1 in spans
+                 if top <= y < bottom and max(x0, left) <= min(x1, right - 1)]
+    return spans
@@ -0,0 +1,125 @@
+"""Conjunto de formas selecionadas, com soma dos vértices e caixa envolvente mantidas a cada mudança."""
+import numpy as np
+
+
+class SelectionSet:
+    """Formas selecionadas, em ordem de seleção, com o centroide e a caixa envolvente da união.
+
+    Cada forma guarda a sua contribuição (soma das coordenadas, número de
+    vértices e caixa), tirada do `geometry` em cache da forma na `version` dos
+    pontos em que entrou; o atributo `selected` das formas acompanha o
+    conjunto. Selecionar ou desmarcar custa O(1) com a geometria em cache e as
+    consultas custam O(seleção): uma forma cujos pontos foram trocados
+    (transformação, arrasto, diário) é relida na consulta seguinte, comparando
+    versões. A caixa da união é refeita a partir das caixas das formas quando
+    alguma sai ou muda.
+    """
+
+    def __init__(self):
+        self._members = {}  # forma -> (versão, soma, vértices, mínimo, máximo)
+        self._sum = np.zeros(2)
+        self._count = 0
+        self._bounds = None  # (mínimo, máximo) da união; None = refazer na próxima consulta
+
+    def __len__(self):
+        return len(self._members)
+
+    def __iter__(self):
+        return iter(list(self._members))
+
+    def __contains__(self, shape):
+        return shape in self._members
+
+    @property
+    def shapes(self):
+        """Lista das formas selecionadas, na ordem em que foram selecionadas."""
+        return list(self._members)
+
+    @staticmethod
+    def _contribution(shape):
+        geometry = shape.geometry
+        return shape.version, geometry.sum, geometry.count, geometry.lo, geometry.hi
+
+    def _enter(self, shape, entry):
+        self._members[shape] = entry
+        self._sum = self._sum + entry[1]
+        self._count += entry[2]
+        if self._bounds is not None:
+            self._bounds = np.minimum(self._bounds[0], entry[3]), np.maximum(self._bounds[1], entry[4])
+
+    def _leave(self, shape):
+        entry = self._members.pop(shape)
+        self._count -= entry[2]
+        # Sem formas, a soma recomeça do zero (não acumula o arredondamento das subtrações)
+        self._sum = self._sum - entry[1] if self._members else np.zeros(2)
+        self._bounds = None
+
+    def add(self, shape):
+        if shape not in self._members:
+            self._enter(shape, self._contribution(shape))
+        shape.selected = True
+
+    def discard(self, shape):
+        if shape in self._members:
+            self._leave(shape)
+        shape.selected = False
+
+    def toggle(self, shape):
+        if shape in self._members: self.discard(shape)
+        else: self.add(shape)
+
+    def clear(self):
+        for shape in self._members:
+            shape.selected = False
+        self._members = {}
+        self._sum, self._count, self._bounds = np.zeros(2), 0, None
+
+    def replace(self, shapes):
+        """Seleciona exatamente `shapes` (as que já estavam selecionadas não são relidas)."""
+        shapes = list(shapes)
+        keep = set(shapes)
+        for shape in [s for s in self._members if s not in keep]:
+            self.discard(shape)
+        for shape in shapes:
+            self.add(shape)
+
+    def retain(self, shapes):
+        """Tira do conjunto as formas que não estão mais em `shapes` (a lista do canvas)."""
+        if self._members:
+            present = set(shapes)
+            for shape in [s for s in self._members if s not in present]:
+                self.discard(shape)
+
+    def _refresh(self):
+        """Relê as formas cujos pontos foram trocados desde a última leitura."""
+        for shape, old in [(s, entry) for s, entry in self._members.items() if entry[0] != s.version]:
+            entry = self._members[shape] = self._contribution(shape)  # Mesma chave: a ordem não muda
+            self._sum = self._sum - old[1] + entry[1]
+            self._count += entry[2] - old[2]
+            self._bounds = None
+
+    @property
+    def vertex_count(self):
+        self._refresh()
+        return self._count
+
+    @property
+    def sum(self):
+        """Soma (x, y) de todos os vértices selecionados."""
+        self._refresh()
+        return self._sum
+
+    def centroid(self):
+        """Média dos vértices selecionados, ou None se não há nenhum."""
+        self._refresh()
+        return self._sum / self._count if self._count else None
+
+    def bounds(self):
+        """Caixa envolvente (mínimo, máximo) dos vértices selecionados, ou None se não há nenhum."""
+        self._refresh()
+        if not self._count:
+            return None
+        if self._bounds is None:
+            entries = list(self._members.values())
+            self._bounds = (np.min([e[3] for e in entries], axis=0), np.max([e[4] for e in entries], axis=0))
+        return self._bounds
@@ -0,0 +1,93 @@
+"""Simplificação de linhas poligonais (Douglas–Peucker) e pirâmide de níveis de detalhe."""
+import numpy as np
+
+
+def vertex_importance(points):
+    """Tolerância a partir da qual o Douglas–Peucker descartaria cada vértice.
+
+    Uma única passada do algoritmo (com pilha explícita) guarda, para cada
+    vértice escolhido como ponto de divisão, a distância dele à corda, limitada
+    pela do vértice que o originou. Assim `points[importance > tol]` é
+    exatamente o resultado do Douglas–Peucker com tolerância `tol`, para
+    qualquer tol, sem refazer a recursão. As extremidades valem infinito.
+    """
+    pts = np.asarray(points, dtype=float).reshape(-1, 2)
+    n = len(pts)
+    importance = np.full(n, np.inf)
+    stack = [(0, n - 1, np.inf)] if n > 2 else []
+    while stack:
+        first, last, cap = stack.pop()
+        a, b = pts[first], pts[last]
+        inner = pts[first + 1:last] - a
+        chord = b - a
+        length = np.hypot(*chord)
+        if length > 0:
+            dist = np.abs(chord[0] * inner[:, 1] - chord[1] * inner[:, 0]) / length
+        else:
+            dist = np.hypot(inner[:, 0], inner[:, 1])
+        k = int(np.argmax(dist))
+        split = first + 1 + k
+        value = min(float(dist[k]), cap)
+        importance[split] = value
+        if split - first > 1:
+            stack.append((first, split, value))
+        if last - split > 1:
+            stack.append((split, last, value))
+    return importance
+
+
+def douglas_peucker(points, tolerance):
+    """Vértices que o Douglas–Peucker mantém com a tolerância dada."""
+    pts = np.asarray(points, dtype=float).reshape(-1, 2)
+    return pts[vertex_importance(pts) > tolerance]
+
+
+class LodPyramid:
+    """Versões simplificadas de uma linha poligonal em tolerâncias que dobram a cada nível.
+
+    O nível k tem tolerância `base * 2**k` (unidades do mundo). Para polígonos
+    (`closed`), o primeiro vértice é repetido no fim durante a simplificação,
+    e níveis com menos de 3 vértices são ignorados. A importância dos vértices
+    é reaproveitada quando a linha só foi transladada. Abaixo de `BASE` nenhum
+    nível serve: quem desenha pode devolver os pontos originais sem montar a pirâmide.
+    """
+
+    BASE = 1.0  # Tolerância do nível 0 (padrão)
+
+    def __init__(self, points, closed=False, base=BASE, levels=8):
+        self.closed = closed
+        self.tolerances = base * 2.0 ** np.arange(levels)
+        self.minimum = 3 if closed else 2
+        self._points = None
+        self._importance = None
+        self.update(points)
+
+    def update(self, points):
+        """Recalcula os níveis para `points` (barato se for só uma translação)."""
+        pts = np.asarray(points, dtype=float).reshape(-1, 2)
+        if self.closed and len(pts):
+            pts = np.vstack([pts, pts[:1]])
+        previous = self._points
+        if previous is None or previous.shape != pts.shape or not np.allclose(pts - pts[0], previous - previous[0]):
+            self._importance = vertex_importance(pts)
+        self._points = pts
+        self.levels = []
+        for tolerance in self.tolerances:
+            level = pts[self._importance > tolerance]
+            if self.closed:
+                level = level[:-1]
+            self.levels.append(level)
+
+    def level_index(self, tolerance):
+        """Índice do nível mais simples cuja tolerância não passa de `tolerance` (None = use os pontos originais)."""
+        best = None
+        for index, (level_tolerance, level) in enumerate(zip(self.tolerances, self.levels)):
+            if level_tolerance > tolerance or len(level) < self.minimum:
+                break
+            best = index
+        return best
+
+    def select(self, tolerance):
+        """Nível mais simples cuja tolerância não passa de `tolerance` (None = use os pontos originais)."""
+        index = self.level_index(tolerance)
+        return None if index is None else self.levels[index]
@@ -0,0 +1,139 @@
+"""Contadores de trabalho do pipeline de rasterização e recorte."""
+import json
+import os
+import threading
+import time
+from collections import defaultdict, deque
+
+
+class RenderStats:
+    """Acumula contadores por quadro e mantém um histórico curto para consulta."""
+
+    # Contadores conhecidos (ordem usada nos relatórios)
+    COUNTERS = (
+        'pixels_bresenham',   # Pixels gerados pelo Bresenham de linhas
+        'pixels_dda',         # Pixels gerados pelo DDA
+        'pixels_circle',      # Pixels gerados pelo Bresenham de círculos
+        'pixels_written',     # Escritas aceitas pelo teste de limites
+        'pixels_rejected',    # Escritas descartadas pelo teste de limites
+        'edges_accepted',     # Arestas aceitas trivialmente pelo recorte
+        'edges_rejected',     # Arestas rejeitadas trivialmente pelo recorte
+        'edges_clipped',      # Arestas que precisaram de interseção
+        'curve_segments',     # Segmentos gerados ao tesselar curvas para o corte
+        'shapes_drawn',       # Formas enviadas à rasterização
+        'shapes_culled',      # Formas descartadas por estarem fora da tela
+        'vertices_simplified', # Vértices omitidos pelo nível de detalhe do zoom
+        'panel_cache_hits',   # Seções do painel reaproveitadas
+        'panel_cache_misses', # Seções do painel redesenhadas
+        'text_cache_hits',    # Textos servidos pelo cache LRU
+        'text_cache_misses',  # Textos renderizados com font.render
+        'motion_events_merged', # Movimentos do mouse absorvidos pelo agrupamento
+        'autosave_snapshots', # Retratos da cena entregues à thread de autosave
+    )
+
+    def __init__(self, history=120):
+        self.enabled = True
+        self.frame_index = 0
+        self.current = defaultdict(int)       # Quadro em andamento
+        self.last_frame = {}                  # Último quadro concluído
+        self.totals = defaultdict(int)        # Acumulado desde o início
+        self.history = deque(maxlen=history)  # Quadros recentes
+        self._lock = threading.Lock()
+
+    def add(self, name, amount=1):
+        """Soma `amount` ao contador `name` do quadro atual."""
+        if self.enabled and amount:
+            with self._lock:
+                self.current[name] += amount
+
+    def get(self, name):
+        """Valor do contador no último quadro concluído."""
+        return self.last_frame.get(name, 0)
+
+    def end_frame(self):
+        """Fecha o quadro atual e devolve seus contadores."""
+        with self._lock:
+            frame = dict(self.current)
+            self.current.clear()
+        for name, value in frame.items():
+            self.totals[name] += value
+        self.last_frame = frame
+        self.history.append(frame)
+        self.frame_index += 1
+        return frame
+
+    def average(self, name):
+        """Média do contador nos quadros do histórico."""
+        if not self.history:
+            return 0.0
+        return sum(f.get(name, 0) for f in self.history) / len(self.history)
+
+    def reset(self):
+        """Zera todos os contadores e o histórico."""
+        with self._lock:
+            self.current.clear()
+        self.last_frame = {}
+        self.totals.clear()
+        self.history.clear()
+        self.frame_index = 0
+
+    def report_lines(self, frame=None):
+        """Linhas de texto com os contadores não nulos de um quadro."""
+        frame = self.last_frame if frame is None else frame
+        names = [n for n in self.COUNTERS if frame.get(n)]
+        names += sorted(n for n in frame if n not in self.COUNTERS and frame[n])
+        return [f"{name}: {frame[name]}" for name in names]
+
+    def report(self, frame=None):
+        """Relatório de um quadro em texto corrido."""
+        return f"Quadro {self.frame_index}: " + ", ".join(self.report_lines(frame))
+
+
+class StartupTimer:
+    """Marca as fases da inicialização para medir o tempo até o primeiro quadro."""
+
+    def __init__(self, origin=None):
+        self.origin = time.perf_counter() if origin is None else origin
+        self.phases = []  # Lista de (fase, segundos desde a origem)
+
+    def mark(self, phase):
+        """Registra o instante em que `phase` terminou."""
+        self.phases.append((phase, time.perf_counter() - self.origin))
+
+    def elapsed(self, phase):
+        """Segundos da origem até `phase`, ou None se a fase não foi marcada."""
+        for name, seconds in self.phases:
+            if name == phase:
+                return seconds
+        return None
+
+    @property
+    def time_to_first_frame(self):
+        return self.elapsed('primeiro_quadro')
+
+    def as_dict(self):
+        """Fases em milissegundos (formato usado no relatório JSON)."""
+        return {name: round(seconds * 1000, 2) for name, seconds in self.phases}
+
+    def report(self):
+        """Resumo legível: 'janela 35.2 ms | primeiro_quadro 41.0 ms | ...'."""
+        return "Inicialização: " + " | ".join(f"{name} {ms:.1f} ms" for name, ms in self.as_dict().items())
+
+    def publish(self, env_var='PAINTCG_STARTUP_REPORT'):
+        """Publica o relatório conforme a variável de ambiente.
+
+        Um caminho terminado em .jsonl recebe uma linha JSON por execução (para
+        acompanhar a métrica ao longo do tempo); qualquer outro valor imprime o resumo.
+        """
+        target = os.environ.get(env_var)
+        if not target:
+            return
+        if target.endswith('.jsonl'):
+            record = dict(self.as_dict(), timestamp=time.time())
+            try:
+                with open(target, 'a', encoding='utf-8') as f:
+                    f.write(json.dumps(record) + '\n')
+            except OSError:
+                print(self.report())
+        else:
+            print(self.report())
@@ -0,0 +1,62 @@
+"""Matrizes homogêneas 3×3 das transformações 2D e sua aplicação a pontos (apenas NumPy, sem pygame)."""
+import math
+
+import numpy as np
+
+# Eixos de reflexão
+REFLECT_X = 'x'    # Espelha verticalmente (y' = 2·cy - y)
+REFLECT_Y = 'y'    # Espelha horizontalmente (x' = 2·cx - x)
+REFLECT_XY = 'xy'  # Os dois eixos (meia-volta em torno de (cx, cy))
+
+
+def translation_matrix(dx, dy):
+    """Translação por (dx, dy)."""
+    return np.array([
+        [1, 0, dx],
+        [0, 1, dy],
+        [0, 0, 1]
+    ], dtype=float)
+
+
+def rotation_matrix(angle, cx=0, cy=0):
+    """Rotação de `angle` graus em torno de (cx, cy), em forma fechada."""
+    cos_a = math.cos(math.radians(angle))
+    sin_a = math.sin(math.radians(angle))
+    return np.array([
+        [cos_a, -sin_a, -cx*cos_a + cy*sin_a + cx],
+        [sin_a, cos_a, -cx*sin_a - cy*cos_a + cy],
+        [0, 0, 1]
+    ])
+
+
+def scale_matrix(sx, sy, cx=0, cy=0):
+    """Escala (sx, sy) em torno de (cx, cy)."""
+    return np.array([
+        [sx, 0, cx*(1-sx)],
+        [0, sy, cy*(1-sy)],
+        [0, 0, 1]
+    ], dtype=float)
+
+
+def reflection_matrix(axis, cx=0, cy=0):
+    """Reflexão nas retas y = cy (REFLECT_X), x = cx (REFLECT_Y) ou em ambas (REFLECT_XY)."""
+    fx = -1 if axis in (REFLECT_Y, REFLECT_XY) else 1
+    fy = -1 if axis in (REFLECT_X, REFLECT_XY) else 1
+    return np.array([
+        [fx, 0, cx - fx*cx],
+        [0, fy, cy - fy*cy],
+        [0, 0, 1]
+    ], dtype=float)
+
+
+def apply_matrix(points, matrix):
+    """Pontos (N, 2) transformados pela matriz homogênea, como array de floats.
+
+    As duas coordenadas saem de m[i, 0]·x + m[i, 1]·y + m[i, 2], somados nessa
+    ordem para todos os pontos de uma vez: o mesmo resultado, bit a bit, do
+    produto matriz × (x, y, 1) feito ponto a ponto.
+    """
+    pts = np.asarray(points, dtype=float).reshape(-1, 2)
+    m = np.asarray(matrix, dtype=float)
+    x, y = pts[:, 0], pts[:, 1]
+    return np.stack([m[0, 0]*x + m[0, 1]*y + m[0, 2], m[1, 0]*x + m[1, 1]*y + m[1, 2]], axis=1)
@@ -0,0 +1,6 @@
+"""Componentes de interface compartilhados pelos aplicativos Paint (dependem do pygame)."""
+from cgui.events import coalesce_motion
+from cgui.panel import PanelCache
+from cgui.text import TextCache
+
+__all__ = ['PanelCache', 'TextCache', 'coalesce_motion']
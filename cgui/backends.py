@@ -0,0 +1,80 @@
+"""Backend de pré-visualização rápida: os kernels desenham com `pygame.draw`, em C, sem os pixels exatos.
+
+Reta e círculo não geram pixels: devolvem os vértices do caminho (os dois
+extremos, ou um polígono inscrito no círculo), e o kernel de trechos liga
+esses vértices com `pygame.draw.lines` na espessura do traço. O preenchimento
+usa `pygame.draw.polygon`, que só conhece a regra par-ímpar; a regra não-zero
+fica com a reserva (a referência). Importar este módulo registra o backend
+como 'pygame' em `cgcore.backends`.
+"""
+import numpy as np
+import pygame
+
+from cgcore.backends import RasterBackend, register_backend
+from cgcore.fill import EVEN_ODD
+from cgcore.raster import curve_segments, ellipse_polyline
+
+
+def _clipped_call(target, clip, draw):
+    """Operação 'call' que desenha em `target()` com o recorte `clip` = (esquerda, topo, direita, base)."""
+    left, top, right, bottom = clip
+
+    def call():
+        surface = target()
+        previous = surface.get_clip()
+        surface.set_clip(pygame.Rect(left, top, right - left, bottom - top).clip(previous))
+        try:
+            draw(surface)
+        finally:
+            surface.set_clip(previous)
+    return ('call', call)
+
+
+class PygameBackend(RasterBackend):
+    """Kernels nativos do pygame para pré-visualização (afastado, arrastando); o resultado é aproximado."""
+
+    name = 'pygame'
+    native = True
+
+    def __init__(self, fallback=None, stamp=None, target=None):
+        super().__init__(fallback, stamp)
+        self.target = target or pygame.display.get_surface
+
+    def _line(self, x1, y1, x2, y2, algorithm):
+        # O algoritmo escolhido não se aplica: quem rasteriza é o pygame.draw.lines
+        return np.array([[x1, y1], [x2, y2]], dtype=np.int64)
+
+    def _circle(self, cx, cy, radius):
+        vertices = ellipse_polyline((cx, cy), (radius, 0), (0, radius), curve_segments(radius, 0.5))
+        return np.floor(vertices + 0.5).astype(np.int64)
+
+    def _spans(self, centers, radius, color, area, clip, path):
+        points = np.asarray(centers, dtype=np.int64).reshape(-1, 2).tolist()
+        radius = int(radius)
+
+        def draw(surface):
+            if path and len(points) > 1:
+                pygame.draw.lines(surface, color, False, points, 2 * radius + 1)
+                if radius < 2:
+                    return
+                points_to_round = points[::max(1, len(points) // 64)]  # Juntas arredondadas nos vértices
+            else:
+                points_to_round = points
+            for point in points_to_round:
+                if radius < 1:
+                    surface.fill(color, (*point, 1, 1))
+                else:
+                    pygame.draw.circle(surface, color, point, radius)
+        # Os centros fora da área do canvas não carimbam: o recorte à área faz o mesmo papel
+        return _clipped_call(self.target, area, draw)
+
+    def _fill(self, points, rule, color, clip):
+        if rule != EVEN_ODD:
+            return NotImplemented
+        vertices = np.floor(np.asarray(points, dtype=float).reshape(-1, 2) + 0.5).astype(int).tolist()
+        if len(vertices) < 3:
+            return NotImplemented
+        return _clipped_call(self.target, clip, lambda surface: pygame.draw.polygon(surface, color, vertices))
+
+
+register_backend(PygameBackend.name, PygameBackend)
@@ -0,0 +1,37 @@
+"""Agrupamento de eventos de movimento do mouse antes do tratamento."""
+import pygame
+
+
+def coalesce_motion(events, stats=None):
+    """Funde cada sequência de MOUSEMOTION consecutivos em um único evento.
+
+    Um mouse de alta taxa gera dezenas de movimentos por quadro; arrastar,
+    transladar a vista e girar só precisam da última posição. O evento fundido
+    mantém `pos` e `buttons` do último movimento, soma os `rel` e guarda em
+    `samples` todas as posições do lote, para o traço livre não perder pontos.
+    Eventos de outros tipos (cliques, teclas) ficam na ordem original.
+    """
+    merged = []
+    run = []
+
+    def flush():
+        if not run:
+            return
+        last = run[-1]
+        rel = (sum(e.rel[0] for e in run), sum(e.rel[1] for e in run))
+        merged.append(pygame.event.Event(
+            pygame.MOUSEMOTION, pos=last.pos, rel=rel, buttons=last.buttons,
+            touch=getattr(last, 'touch', False),
+            samples=[e.pos for e in run]))
+        if stats is not None:
+            stats.add('motion_events_merged', len(run) - 1)
+        run.clear()
+
+    for event in events:
+        if event.type == pygame.MOUSEMOTION:
+            run.append(event)
+        else:
+            flush()
+            merged.append(event)
+    flush()
+    return merged
@@ -0,0 +1,70 @@
+"""Cache do painel de ferramentas: renderiza uma vez e redesenha só o que mudou."""
+import pygame
+
+_MISSING = object()  # Marca seções que ainda não foram desenhadas
+
+
+class PanelSection:
+    """Região do painel com a função que a desenha e a chave do estado que ela exibe."""
+
+    def __init__(self, name, rect, key, draw):
+        self.name = name
+        self.rect = pygame.Rect(rect)
+        self.key = key
+        self.draw = draw  # draw(surface) desenha a seção em coordenadas do painel
+
+
+class PanelCache:
+    """Mantém o painel pré-renderizado em uma Surface (pode ser mais alta que a janela).
+
+    A cada quadro o painel declara suas seções, na ordem de desenho, com a chave
+    do estado que cada uma mostra (modo ativo, espessura, texto digitado...).
+    Só as seções cuja chave mudou são apagadas e redesenhadas; seções vizinhas
+    que invadem a mesma região são redesenhadas recortadas a ela, preservando a
+    ordem de sobreposição original.
+    """
+
+    def __init__(self, size, background, stats=None):
+        self.background = background
+        self.stats = stats  # RenderStats opcional (conta acertos/falhas do cache)
+        self.surface = pygame.Surface(size)
+        self.surface.fill(background)
+        self.keys = {}  # Última chave desenhada de cada seção
+
+    def resize(self, size):
+        """Recria a Surface com outro tamanho (tudo será redesenhado)."""
+        self.surface = pygame.Surface(size)
+        self.surface.fill(self.background)
+        self.keys.clear()
+
+    def invalidate(self, name=None):
+        """Força o redesenho de uma seção (ou de todas)."""
+        if name is None:
+            self.keys.clear()
+        else:
+            self.keys.pop(name, None)
+
+    def update(self, sections):
+        """Redesenha as seções sujas; devolve quantas regiões foram refeitas."""
+        dirty = [s.rect for s in sections if self.keys.get(s.name, _MISSING) != s.key]
+        if self.stats is not None:
+            self.stats.add('panel_cache_hits', len(sections) - len(dirty))
+            self.stats.add('panel_cache_misses', len(dirty))
+
+        for region in dirty:
+            self.surface.set_clip(region)
+            self.surface.fill(self.background, region)
+            for section in sections:
+                if section.rect.colliderect(region):
+                    section.draw(self.surface)
+        self.surface.set_clip(None)
+
+        for section in sections:
+            self.keys[section.name] = section.key
+        return len(dirty)
+
+    def blit(self, screen, dest=(0, 0), scroll_y=0, height=None):
+        """Copia para a tela a janela visível do painel (deslocada por `scroll_y`)."""
+        width, total = self.surface.get_size()
+        height = total if height is None else height
+        screen.blit(self.surface, dest, pygame.Rect(0, int(scroll_y), width, height))
@@ -0,0 +1,63 @@
+"""Recortes raster (resultado do balde de tinta) com a Surface pronta em cache."""
+import numpy as np
+import pygame
+
+
+class RasterPatch:
+    """Máscara de pixels preenchidos, desenhada como uma Surface com transparência.
+
+    A máscara é calculada uma vez (no clique do balde); a Surface colorida e a
+    versão redimensionada para o zoom atual ficam em cache e só são refeitas
+    quando a cor, o tamanho na tela ou o espelhamento mudam.
+    """
+
+    def __init__(self, mask):
+        self.mask = np.asarray(mask, dtype=bool)  # [x, y], como no pygame.surfarray
+        self._base_key = self._base = None
+        self._scaled_key = self._scaled = None
+
+    @property
+    def size(self):
+        return self.mask.shape
+
+    def base(self, color):
+        """Surface no tamanho da máscara, na cor pedida e transparente fora dela."""
+        color = tuple(color)
+        if color != self._base_key:
+            surface = pygame.Surface(self.mask.shape, pygame.SRCALPHA)
+            surface.fill((*color[:3], 0))
+            alpha = pygame.surfarray.pixels_alpha(surface)
+            alpha[self.mask] = 255
+            del alpha  # Libera o travamento da Surface
+            self._base_key, self._base = color, surface
+            self._scaled_key = None
+        return self._base
+
+    def surface(self, size, color, flip_x=False, flip_y=False):
+        """Surface no tamanho de tela `size` (vizinho mais próximo, sem suavizar a borda)."""
+        key = (tuple(size), tuple(color), flip_x, flip_y)
+        if key != self._scaled_key:
+            surface = self.base(color)
+            if tuple(size) != self.mask.shape:
+                surface = pygame.transform.scale(surface, size)
+            if flip_x or flip_y:
+                surface = pygame.transform.flip(surface, flip_x, flip_y)
+            self._scaled_key, self._scaled = key, surface
+        return self._scaled
+
+    def draw(self, target, p0, p1, color, clip=None):
+        """Desenha o recorte entre os cantos de tela `p0` e `p1` (o inverso indica espelhamento)."""
+        (x0, y0), (x1, y1) = p0, p1
+        width, height = abs(int(x1) - int(x0)), abs(int(y1) - int(y0))
+        if not width or not height:
+            return False
+        rect = pygame.Rect(min(x0, x1), min(y0, y1), width, height)
+        if clip is not None and not rect.colliderect(clip):
+            return False
+        surface = self.surface((width, height), color, bool(x1 < x0), bool(y1 < y0))  # Cantos podem vir como escalares numpy
+        previous = target.get_clip()
+        if clip is not None:
+            target.set_clip(clip)
+        target.blit(surface, rect)
+        target.set_clip(previous)
+        return True
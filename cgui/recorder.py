@@ -0,0 +1,86 @@
+"""Gravação do fluxo de eventos do pygame em JSON lines, para repetir sessões (`python -m cgui.replay`)."""
+import json
+import os
+import time
+
+import pygame
+
+# Versão do formato da sessão gravada
+SESSION_VERSION = 1
+
+
+def encode_event(event):
+    """Evento como dicionário JSON: tipo numérico, nome e atributos simples (números, textos, tuplas)."""
+    attrs = {}
+    for name, value in event.dict.items():
+        if value is None or isinstance(value, (bool, int, float, str)):
+            attrs[name] = value
+        elif isinstance(value, (tuple, list)) and all(isinstance(v, (int, float)) for v in value):
+            attrs[name] = list(value)
+        # Outros valores (ex.: a janela de origem) não são necessários para repetir a sessão
+    return {'type': event.type, 'name': pygame.event.event_name(event.type), 'attrs': attrs}
+
+
+def decode_event(data):
+    """Reconstrói o pygame.event.Event gravado por `encode_event`."""
+    attrs = {name: tuple(value) if isinstance(value, list) else value for name, value in data['attrs'].items()}
+    return pygame.event.Event(data['type'], attrs)
+
+
+def read_session(path):
+    """(cabeçalho, quadros) de uma sessão gravada; cada quadro tem 't', 'mods' e 'events' (já decodificados)."""
+    with open(path, encoding='utf-8') as f:
+        header = json.loads(f.readline())
+        if header.get('paintcg_session') != SESSION_VERSION:
+            raise ValueError(f"{path} não é uma sessão gravada (versão {SESSION_VERSION})")
+        frames = []
+        for line in f:
+            if not line.strip():
+                continue
+            try:
+                frame = json.loads(line)
+            except ValueError:
+                break  # Última linha pela metade (o aplicativo caiu durante a gravação)
+            frame['events'] = [decode_event(e) for e in frame['events']]
+            frames.append(frame)
+    return header, frames
+
+
+class EventRecorder:
+    """Grava cada lote de eventos entregue a `handle_events`, uma linha JSON por quadro.
+
+    Sem caminho, fica desligado e `record` não faz nada. O lote é gravado
+    antes do agrupamento de movimentos, com o instante desde o início da
+    gravação e o estado dos modificadores (Shift/Ctrl), que a repetição
+    restaura com `pygame.key.set_mods`.
+    """
+
+    def __init__(self, path=None, app=None, size=None):
+        self._file = None
+        if path:
+            self._file = open(path, 'w', encoding='utf-8')
+            header = {'paintcg_session': SESSION_VERSION, 'app': app, 'size': list(size) if size else None}
+            self._file.write(json.dumps(header) + '\n')
+        self._t0 = time.perf_counter()
+
+    @classmethod
+    def from_env(cls, app, size, env_var='PAINTCG_RECORD'):
+        """Gravador ligado se a variável de ambiente tiver o caminho do arquivo da sessão."""
+        return cls(os.environ.get(env_var), app, size)
+
+    @property
+    def enabled(self):
+        return self._file is not None
+
+    def record(self, events):
+        if self._file is None:
+            return
+        frame = {'t': round(time.perf_counter() - self._t0, 6), 'mods': pygame.key.get_mods(),
+                 'events': [encode_event(e) for e in events]}
+        self._file.write(json.dumps(frame, separators=(',', ':')) + '\n')
+        self._file.flush()  # Uma queda do aplicativo não perde a sessão gravada até aqui
+
+    def close(self):
+        if self._file is not None:
+            self._file.close()
+            self._file = None
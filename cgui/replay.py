@@ -0,0 +1,95 @@
+"""Repete uma sessão gravada (PAINTCG_RECORD) num PaintCG sem janela, o mais rápido possível.
+
+Uso: python -m cgui.replay sessao.jsonl [--app TP1|Tp1_alt] [--json resultado.json]
+
+Cada quadro gravado é tratado como no loop principal: os eventos passam pelo
+agrupamento de movimentos e por `handle_event` (medido evento a evento), e
+depois o quadro é desenhado com `draw_frame` (medido como tempo de quadro).
+Os instantes gravados são ignorados; a sessão vira um benchmark reprodutível.
+"""
+import argparse
+import importlib
+import json
+import os
+import sys
+import time
+
+import numpy as np
+
+
+def summarize(samples):
+    """Contagem, média, p50, p95 e máximo (ms) de uma lista de durações em segundos."""
+    ms = np.asarray(samples, dtype=float) * 1000
+    if not len(ms):
+        return {'count': 0}
+    return {'count': int(len(ms)), 'mean': float(ms.mean()), 'p50': float(np.percentile(ms, 50)),
+            'p95': float(np.percentile(ms, 95)), 'max': float(ms.max())}
+
+
+def replay(app, frames):
+    """Repete os quadros em `app`; devolve (latências por tipo de evento, tempos de quadro), em segundos."""
+    import pygame
+    from cgui.events import coalesce_motion
+
+    latencies, frame_times = {}, []
+    for frame in frames:
+        start = time.perf_counter()
+        pygame.key.set_mods(frame.get('mods', 0))
+        running = True
+        # Mesmo caminho de handle_events, com o relógio em volta de cada evento
+        for event in coalesce_motion(frame['events'], app.stats):
+            t = time.perf_counter()
+            running = app.handle_event(event)
+            latencies.setdefault(pygame.event.event_name(event.type), []).append(time.perf_counter() - t)
+            if not running:
+                break  # Eventos depois do QUIT não importam
+        app.draw_frame()
+        pygame.display.flip()
+        app.stats.end_frame()
+        frame_times.append(time.perf_counter() - start)
+        if not running:
+            break  # Como no loop principal, o quadro do QUIT ainda é desenhado
+    return latencies, frame_times
+
+
+def format_report(report):
+    lines = [f"{'':<20}{'n':>7}{'média':>10}{'p50':>10}{'p95':>10}{'máx':>10}  (ms)"]
+    rows = [('quadro', report['frames'])] + sorted(report['events'].items())
+    for name, s in rows:
+        if s['count']:
+            lines.append(f"{name:<20}{s['count']:>7}{s['mean']:>10.3f}{s['p50']:>10.3f}{s['p95']:>10.3f}{s['max']:>10.3f}")
+    lines.append(f"total: {report['total_s']:.3f} s")
+    return '\n'.join(lines)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog='python -m cgui.replay', description=__doc__.splitlines()[0])
+    parser.add_argument('session', help='arquivo gravado com PAINTCG_RECORD')
+    parser.add_argument('--app', help='módulo do aplicativo (padrão: o do cabeçalho da sessão)')
+    parser.add_argument('--json', help='grava o relatório também em JSON')
+    args = parser.parse_args(argv)
+
+    os.environ.setdefault('SDL_VIDEODRIVER', 'dummy')  # Sem janela
+    os.environ.pop('PAINTCG_RECORD', None)              # A repetição não grava outra sessão
+    from cgui.recorder import read_session
+
+    header, frames = read_session(args.session)
+    module = importlib.import_module(args.app or header.get('app') or 'TP1')
+    app = module.PaintCG()
+    if not app.ui_ready:
+        app.finish_startup()  # Mede o regime, não a inicialização preguiçosa
+
+    start = time.perf_counter()
+    latencies, frame_times = replay(app, frames)
+    report = {'app': module.__name__, 'session': args.session, 'total_s': time.perf_counter() - start,
+              'frames': summarize(frame_times),
+              'events': {name: summarize(values) for name, values in latencies.items()}}
+    print(format_report(report))
+    if args.json:
+        with open(args.json, 'w', encoding='utf-8') as f:
+            json.dump(report, f, indent=2)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
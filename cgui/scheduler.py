@@ -0,0 +1,79 @@
+"""Agendador de quadros: taxa cheia só quando há interação ou animação."""
+import time
+
+import pygame
+
+
+class FrameScheduler:
+    """Decide quanto esperar entre um quadro e o próximo.
+
+    - Interagindo (eventos recentes) ou com animação na tela: `active_fps`.
+    - Parado: bloqueia em `pygame.event.wait` por até `1000 / idle_fps` ms,
+      acordando assim que chega qualquer evento.
+    - Janela sem foco: bloqueia por até `1000 / unfocused_fps` ms.
+
+    Cada quadro que deixou de ser desenhado (em relação a rodar sempre em
+    `active_fps`) conta como CPU poupada, estimada pelo custo médio dos quadros.
+    """
+
+    def __init__(self, clock, active_fps, idle_fps=2, unfocused_fps=1, linger=0.5, stats=None):
+        self.clock = clock
+        self.active_fps = active_fps
+        self.idle_fps = idle_fps
+        self.unfocused_fps = unfocused_fps
+        self.linger = linger            # Segundos em taxa cheia após o último evento
+        self.stats = stats              # RenderStats opcional
+        self.focused = True
+        self.last_input = time.perf_counter()
+        self.frame_start = None         # Instante em que o quadro atual começou
+        self.frame_cost = 0.0           # Média móvel do custo de um quadro (s)
+        self.frames_skipped = 0.0
+        self.cpu_saved = 0.0            # Segundos de CPU poupados (estimativa)
+
+    def next_events(self, animating=False):
+        """Espera o momento do próximo quadro e devolve os eventos pendentes."""
+        now = time.perf_counter()
+        if self.frame_start is not None:
+            cost = now - self.frame_start
+            self.frame_cost = cost if not self.frame_cost else 0.9 * self.frame_cost + 0.1 * cost
+
+        interacting = now - self.last_input < self.linger
+        if self.focused and (animating or interacting):
+            self.clock.tick(self.active_fps)
+            events = pygame.event.get()
+        else:
+            fps = self.idle_fps if self.focused else self.unfocused_fps
+            first = pygame.event.wait(int(1000 / fps))
+            events = [] if first.type == pygame.NOEVENT else [first]
+            events += pygame.event.get()
+            self.clock.tick()  # Recomeça a medição do relógio depois da espera
+            self.account_wait(time.perf_counter() - now)
+
+        if events:
+            self.observe(events)
+        self.frame_start = time.perf_counter()
+        return events
+
+    def observe(self, events):
+        """Atualiza foco e instante da última interação a partir dos eventos."""
+        for event in events:
+            if event.type == pygame.WINDOWFOCUSLOST:
+                self.focused = False
+            elif event.type == pygame.WINDOWFOCUSGAINED:
+                self.focused = True
+            elif event.type == pygame.ACTIVEEVENT and getattr(event, 'state', 0) & 2:
+                self.focused = bool(event.gain)  # Estado 2 = foco do teclado
+            elif event.type != pygame.NOEVENT:
+                self.last_input = time.perf_counter()
+
+    def account_wait(self, waited):
+        """Contabiliza os quadros que teriam sido desenhados durante `waited` segundos."""
+        skipped = max(0.0, waited * self.active_fps - 1)
+        self.frames_skipped += skipped
+        self.cpu_saved += skipped * self.frame_cost
+        if self.stats is not None:
+            self.stats.add('frames_skipped', int(skipped))
+
+    def report(self):
+        """Resumo para o overlay de estatísticas."""
+        return f"quadros poupados: {int(self.frames_skipped)} (~{self.cpu_saved * 1000:.0f} ms de CPU)"
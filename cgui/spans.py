@@ -0,0 +1,105 @@
+"""Escrita de trechos horizontais de pixels (spans) no framebuffer."""
+from functools import lru_cache
+
+import numpy as np
+import pygame
+
+
+@lru_cache(maxsize=64)
+def disc_stamp(radius):
+    """Carimbo (linhas, x inicial, x final) do disco que `pygame.draw.circle` pinta com esse raio.
+
+    O disco é desenhado uma vez numa Surface de rascunho e lido linha a linha,
+    então `stamp_spans` reproduz exatamente os pixels do pygame. Raio < 1 é um
+    único pixel, como no `set_at` do traço fino.
+    """
+    if radius < 1:
+        return np.zeros(1, dtype=np.int64), np.zeros(1, dtype=np.int64), np.zeros(1, dtype=np.int64)
+    size = 2 * radius + 3
+    scratch = pygame.Surface((size, size), depth=8)
+    pygame.draw.circle(scratch, 1, (radius + 1, radius + 1), radius)
+    mask = pygame.surfarray.array2d(scratch).T != 0  # Linhas × colunas
+    rows = np.flatnonzero(mask.any(axis=1))
+    cols = mask[rows]
+    x_lo = np.argmax(cols, axis=1)
+    x_hi = size - 1 - np.argmax(cols[:, ::-1], axis=1)
+    return rows - (radius + 1), x_lo - (radius + 1), x_hi - (radius + 1)
+
+
+class SpanWriter:
+    """Escreve trechos horizontais em uma Surface, recortados a um retângulo.
+
+    É o caminho comum do traço (carimbos quadrados de espessura) e do
+    preenchimento por linhas de varredura: cada trecho vira uma única chamada
+    `Surface.fill`, em vez de um `set_at` por pixel. Conta os pixels escritos e
+    os descartados pelo recorte, como o teste de limites fazia antes.
+    """
+
+    def __init__(self, surface, clip=None):
+        self.surface = surface
+        self.clip = pygame.Rect(clip) if clip is not None else surface.get_rect()
+        self.written = 0   # Pixels dentro do recorte
+        self.rejected = 0  # Pixels descartados pelo recorte
+
+    def pixel(self, x, y, color):
+        if self.clip.collidepoint(x, y):
+            self.surface.set_at((x, y), color)
+            self.written += 1
+        else:
+            self.rejected += 1
+
+    def points(self, xs, ys, color):
+        """Pixels isolados em lote (arrays x, y), escritos de uma vez no array da Surface."""
+        xs, ys = np.asarray(xs), np.asarray(ys)
+        clip = self.clip
+        keep = (xs >= clip.left) & (xs < clip.right) & (ys >= clip.top) & (ys < clip.bottom)
+        xs, ys = xs[keep], ys[keep]
+        if len(xs):
+            try:
+                target = pygame.surfarray.pixels2d(self.surface)
+            except ValueError:  # Formatos de 24 bits não expõem o array 2D
+                for x, y in zip(xs.tolist(), ys.tolist()):
+                    self.surface.set_at((x, y), color)
+            else:
+                target[xs, ys] = self.surface.map_rgb(color)
+                del target  # Libera o travamento da Surface
+        written = len(xs)
+        self.written += written
+        self.rejected += len(keep) - written
+        return written
+
+    def box(self, x0, y0, x1, y1, color):
+        """Trechos [x0, x1] nas linhas y0..y1 (extremos inclusivos), numa só chamada."""
+        rect = pygame.Rect(x0, y0, x1 - x0 + 1, y1 - y0 + 1)
+        visible = rect.clip(self.clip)
+        if visible.width and visible.height:
+            self.surface.fill(color, visible)
+        area = visible.width * visible.height
+        self.written += area
+        self.rejected += rect.width * rect.height - area
+
+    def spans(self, ys, x0s, x1s, color, clip=None):
+        """Escreve um lote de trechos (arrays y, x inicial, x final; inclusivos).
+
+        `clip` restringe este lote a um retângulo menor (por exemplo, a área de
+        desenho); sem ele vale o recorte do escritor.
+        """
+        clip = self.clip if clip is None else pygame.Rect(clip).clip(self.clip)
+        ys, x0s, x1s = np.asarray(ys), np.asarray(x0s), np.asarray(x1s)
+        total = int(np.sum(x1s - x0s + 1))
+        x0c = np.maximum(x0s, clip.left)
+        x1c = np.minimum(x1s, clip.right - 1)
+        keep = (ys >= clip.top) & (ys < clip.bottom) & (x1c >= x0c)
+        ys, x0c, x1c = ys[keep], x0c[keep], x1c[keep]
+        widths = x1c - x0c + 1
+        self.fill_spans(ys, x0c, x1c, color)
+        written = int(widths.sum())
+        self.written += written
+        self.rejected += total - written
+        return written
+
+    def fill_spans(self, ys, x0s, x1s, color):
+        """Escreve trechos já recortados, sem contar (a contagem fica com quem os gerou)."""
+        fill = self.surface.fill
+        for y, x0, x1 in zip(np.asarray(ys).tolist(), np.asarray(x0s).tolist(), np.asarray(x1s).tolist()):
+            fill(color, (x0, y, x1 - x0 + 1, 1))
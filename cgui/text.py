@@ -0,0 +1,51 @@
+"""Cache LRU de textos renderizados (botões, rótulos de vértices, overlays)."""
+from collections import OrderedDict
+
+import pygame
+
+
+class TextCache:
+    """Guarda as Surfaces de `font.render` chaveadas por (fonte, texto, cor, antialias).
+
+    Os textos da interface quase nunca mudam de um quadro para outro, então a
+    renderização acontece só na primeira vez; quando a capacidade estoura, o
+    texto usado há mais tempo é descartado.
+    """
+
+    def __init__(self, capacity=1024, stats=None):
+        self.capacity = capacity
+        self.stats = stats  # RenderStats opcional
+        self.entries = OrderedDict()
+        self.fonts = {}  # Fontes padrão por tamanho (evita pygame.font.Font a cada quadro)
+
+    def __len__(self):
+        return len(self.entries)
+
+    def font(self, size, name=None):
+        """Fonte `name` (None = fonte padrão do pygame) no tamanho pedido, criada uma única vez."""
+        key = (name, size)
+        font = self.fonts.get(key)
+        if font is None:
+            font = self.fonts[key] = pygame.font.Font(name, size)
+        return font
+
+    def render(self, font, text, color, antialias=True):
+        """Equivalente a `font.render(text, antialias, color)`, com cache."""
+        key = (font, text, tuple(color), antialias)
+        surface = self.entries.get(key)
+        if surface is not None:
+            self.entries.move_to_end(key)
+            if self.stats is not None:
+                self.stats.add('text_cache_hits')
+            return surface
+
+        surface = font.render(text, antialias, color)
+        self.entries[key] = surface
+        if len(self.entries) > self.capacity:
+            self.entries.popitem(last=False)
+        if self.stats is not None:
+            self.stats.add('text_cache_misses')
+        return surface
+
+    def clear(self):
+        self.entries.clear()